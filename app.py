@@ -1,9 +1,15 @@
 # app.py (O Maestro)
 import streamlit as st
-import pandas as pd
-from src.database.chroma_manager import initialize_chromadb
+from src.database.chroma_manager import load_collection
+from src.database.enriched_store import columnar_exists, EMBEDDINGS_PATH
+from src.database.shared_dataset import SHARED_DATASET
 # --- MUDANÇA CRÍTICA ---
-from src.chatbot.rag_chain import ManualRAGBot  # Importa nossa nova classe
+from src.chatbot.rag_chain import ManualRAGBot, RETRIEVAL_BACKEND, \
+    QUANTIZATION, RESCORE_CANDIDATES, RETRIEVAL_MODE, KEYWORD_SHORTCUT  # Importa nossa nova classe
+from src.chatbot.retrievers import build_retriever, LexicalRetriever
+from src.chatbot.query_filters import extract_known_values
+from src.analysis.aggregates import load_aggregates, build_aggregate_cube
+from src.analysis.keywords import load_keyword_index, build_keyword_index
 
 # --- FIM DA MUDANÇA ---
 
@@ -17,58 +23,131 @@ st.set_page_config(
 
 # --- 2. Funções de Cache ---
 
-@st.cache_data
 def load_processed_data():
+    """
+    Devolve os dados enriquecidos compartilhados pelo processo (um único
+    frame de metadados + matriz de embeddings em memory-map, sem cópia por
+    sessão). Se o pipeline publicou dados novos, a nova versão é carregada.
+    """
     try:
-        df_enriched = pd.read_json("data/processed/data_enriched.json", lines=True)
-        print("INFO: data_enriched.json carregado do cache.")
-        return df_enriched
+        return SHARED_DATASET.get()
     except FileNotFoundError:
         st.error("ERRO CRÍTICO: 'data/processed/data_enriched.json' não encontrado.")
         st.error("Por favor, rode o script 'scripts/run_pipeline.py' primeiro!")
         st.stop()
     except Exception as e:
-        st.error(f"Erro ao carregar data_enriched.json: {e}")
+        st.error(f"Erro ao carregar os dados enriquecidos: {e}")
         st.stop()
 
 
-@st.cache_resource
-def load_chromadb_collection(_df_enriched):
-    if _df_enriched is not None:
+@st.cache_data(max_entries=1)
+def load_aggregate_cube(version):
+    """
+    Carrega o cubo de agregados gerado pelo pipeline (contagens por
+    fornecedor/mês/sentimento). Se ele ainda não existir, é montado a
+    partir dos dados enriquecidos. Recarregado quando a versão dos dados muda.
+    """
+    try:
+        return load_aggregates()
+    except FileNotFoundError:
+        print("AVISO: Cubo de agregados não encontrado. Montando a partir dos dados enriquecidos...")
+        return build_aggregate_cube(load_processed_data().frame)
+
+
+@st.cache_data(max_entries=1)
+def load_keyword_frequencies(version):
+    """
+    Carrega o índice de palavras-chave (nuvem de palavras) gerado pelo
+    pipeline; se ele ainda não existir, é montado a partir dos dados enriquecidos.
+    """
+    try:
+        return load_keyword_index()
+    except FileNotFoundError:
+        print("AVISO: Índice de palavras-chave não encontrado. Montando a partir dos dados enriquecidos...")
+        return build_keyword_index(load_processed_data().frame)
+
+
+@st.cache_resource(max_entries=1)
+def load_chromadb_collection(_dataset, version):
+    if _dataset is not None:
         print("INFO: Carregando ChromaDB...")
-        collection = initialize_chromadb(_df_enriched)
+        collection = load_collection(_dataset.frame, _dataset.embeddings)
         return collection
     return None
 
 
-# --- MUDANÇA CRÍTICA ---
 @st.cache_resource
-def load_rag_bot(_chroma_collection):  # Renomeamos a função
+def lexical_index_holder():
+    """Guarda o índice BM25 do processo entre as versões dos dados (ver load_lexical_retriever)."""
+    return {"retriever": None}
+
+
+def load_lexical_retriever(frame):
+    """
+    Índice BM25 dos comentários. Quando a nova versão dos dados só acrescenta
+    linhas às já indexadas (o caso do pipeline em streaming), indexa só as
+    novas; se alguma linha antiga mudou, reconstrói o índice.
+    """
+    holder = lexical_index_holder()
+    lexical = holder["retriever"]
+    if lexical is not None and lexical.extends(frame):
+        added = lexical.add(frame.iloc[len(lexical):])
+        print(f"INFO: Índice BM25 atualizado com {added} comentários novos ({len(lexical)} no total).")
+        return lexical
+    lexical = LexicalRetriever(frame)
+    holder["retriever"] = lexical
+    print(f"INFO: Índice BM25 com {len(lexical)} comentários e {len(lexical.index.vocabulary)} termos.")
+    return lexical
+
+
+# --- MUDANÇA CRÍTICA ---
+@st.cache_resource(max_entries=1)
+def load_rag_bot(_chroma_collection, _dataset, version):  # Renomeamos a função
     """
-    Cria o nosso RAG Bot Manual.
-    Roda apenas uma vez.
+    Cria o nosso RAG Bot Manual com o backend de recuperação configurado
+    (ChromaDB ou índice NumPy em memória, opcionalmente sobre códigos
+    quantizados cacheados ao lado da matriz de embeddings).
+    Roda uma vez por versão dos dados (a anterior é descartada).
     """
-    if _chroma_collection is not None:
-        print("INFO: Carregando RAG Bot Manual...")
-        rag_bot = ManualRAGBot(_chroma_collection)  # Cria nossa classe
+    if _chroma_collection is not None or RETRIEVAL_BACKEND == "numpy":
+        print(f"INFO: Carregando RAG Bot Manual (backend: {RETRIEVAL_BACKEND}, quantização: {QUANTIZATION})...")
+        if QUANTIZATION != "none" and RETRIEVAL_BACKEND != "numpy":
+            print("AVISO: A quantização só se aplica ao backend 'numpy'; usando o ChromaDB sem quantização.")
+        retriever = build_retriever(RETRIEVAL_BACKEND, _chroma_collection, _dataset.frame, _dataset.embeddings,
+                                    quantization=QUANTIZATION, rescore_candidates=RESCORE_CANDIDATES,
+                                    embeddings_path=EMBEDDINGS_PATH if columnar_exists() else None)
+        # Índice BM25 dos comentários (modos "lexical"/"hybrid" e atalho por palavra-chave)
+        lexical = None
+        if RETRIEVAL_MODE != "vector" or KEYWORD_SHORTCUT:
+            lexical = load_lexical_retriever(_dataset.frame)
+        rag_bot = ManualRAGBot(_chroma_collection, retriever=retriever, lexical=lexical,
+                               known_values=extract_known_values(_dataset.frame),
+                               data_version=version)  # Cria nossa classe
         return rag_bot
     return None
 
 
 # --- 3. Execução do Carregamento (O "Maestro") ---
 with st.spinner("Carregando dados e inicializando IA..."):
-    if 'data_loaded' not in st.session_state:
-        print("INFO: Carregando dados pela primeira vez...")
-        df_enriched = load_processed_data()
-        chroma_collection = load_chromadb_collection(df_enriched)
-        rag_bot = load_rag_bot(chroma_collection)  # Chama a nova função
-        st.session_state.df_enriched = df_enriched
+    # A sessão guarda só referências aos recursos do processo (nenhuma cópia dos
+    # dados); elas são trocadas quando o pipeline publica uma nova versão
+    dataset = load_processed_data()
+    if st.session_state.get('data_version') != dataset.version:
+        print("INFO: Carregando dados para a sessão...")
+        # O backend NumPy não precisa do ChromaDB
+        chroma_collection = None
+        if RETRIEVAL_BACKEND == "chroma":
+            chroma_collection = load_chromadb_collection(dataset, dataset.version)
+        rag_bot = load_rag_bot(chroma_collection, dataset, dataset.version)  # Chama a nova função
+        st.session_state.data_version = dataset.version
+        st.session_state.aggregates = load_aggregate_cube(dataset.version)
+        st.session_state.keyword_index = load_keyword_frequencies(dataset.version)
         st.session_state.chroma_collection = chroma_collection
         st.session_state.rag_bot = rag_bot  # Salva o bot na sessão
         st.session_state.data_loaded = True
         # --- FIM DA MUDANÇA ---
 
-print("INFO: Dados e modelos carregados e salvos no session_state.")
+print("INFO: Dados e modelos carregados (compartilhados entre as sessões).")
 
 # --- 4. Renderização da "Home Page" (app.py) ---
 # Esta é a UI da página principal
@@ -0,0 +1,103 @@
+# ===== BENCHMARK: CARGA DO CHROMADB (LEGADO vs BULK EM LOTES) =====
+# Uso: python benchmarks/bench_chroma_ingest.py --rows 500000 --workers 1 4
+# Cada variante roda em um processo novo para medir o pico de memória (RSS) isoladamente.
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process, in MB (Linux reports KB)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_variant(variant: str, rows: int, dim: int, workers: int) -> dict:
+    import chromadb
+    import numpy as np
+    from src.database.chroma_manager import prepare_rows, bulk_load
+    from src.database.enriched_store import attach_embeddings
+    from synthetic import make_enriched_frame, make_embeddings
+
+    embeddings = make_embeddings(rows, dim)
+    df = attach_embeddings(make_enriched_frame(rows), embeddings)
+    baseline_mb = peak_rss_mb()
+
+    client = chromadb.Client()
+    collection = client.get_or_create_collection(name="bench_ingest")
+    start = time.perf_counter()
+
+    if variant == "legacy":
+        # Caminho antigo: apply linha a linha + cópias completas em listas Python.
+        # Sem lotes a chamada falha acima do limite do cliente, então as listas
+        # completas são fatiadas só no envio.
+        df_valid = df[df['embedding'].apply(lambda x: len(x) > 0 and not np.isnan(x).any())].copy()
+        df_valid['topico'] = df_valid['topico'].apply(lambda x: ', '.join(x) if isinstance(x, list) else x)
+        metadatas = df_valid.drop(columns=['Comentario_Cliente', 'embedding']).to_dict('records')
+        all_embeddings = [e.tolist() for e in df_valid['embedding']]
+        documents = df_valid['Comentario_Cliente'].tolist()
+        ids = [str(i) for i in df_valid['ID_Evento']]
+        batch_size = client.get_max_batch_size()
+        for i in range(0, len(ids), batch_size):
+            collection.add(ids=ids[i:i + batch_size], embeddings=all_embeddings[i:i + batch_size],
+                           documents=documents[i:i + batch_size], metadatas=metadatas[i:i + batch_size])
+    else:
+        frame, matrix, valid_rows = prepare_rows(df, embeddings)
+        bulk_load(collection.add, frame, matrix, valid_rows, client.get_max_batch_size(), workers)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "variant": variant,
+        "workers": workers,
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_s": rows / elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+        "ingest_extra_rss_mb": peak_rss_mb() - baseline_mb,
+        "count": collection.count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a carga do ChromaDB (legado vs bulk em lotes).")
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--skip-legacy", action="store_true")
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados.")
+    parser.add_argument("--variant", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Processo filho: roda uma variante e imprime o resultado em JSON
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.rows, args.dim, args.workers[0])))
+        return
+
+    variants = ([] if args.skip_legacy else [("legacy", 1)]) + [("bulk", w) for w in args.workers]
+    results = []
+    for variant, workers in variants:
+        output = subprocess.run(
+            [sys.executable, __file__, "--variant", variant, "--rows", str(args.rows),
+             "--dim", str(args.dim), "--workers", str(workers)],
+            capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        result = json.loads(output)
+        results.append(result)
+        print(f"{variant:>6} (workers={workers}): {result['seconds']:.1f}s | "
+              f"{result['rows_per_s']:,.0f} linhas/s | pico RSS {result['peak_rss_mb']:,.0f} MB "
+              f"(+{result['ingest_extra_rss_mb']:,.0f} MB na carga)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"INFO: Resultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
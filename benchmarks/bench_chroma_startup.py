@@ -0,0 +1,91 @@
+# ===== BENCHMARK: START DO APP COM CHROMA EM MEMÓRIA vs PERSISTENTE =====
+# Uso: python benchmarks/bench_chroma_startup.py --rows 100000
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import chromadb
+
+from src.database.chroma_manager import prepare_rows, bulk_load, sync_chromadb, COLLECTION_NAME
+from src.database.enriched_store import attach_embeddings
+from synthetic import make_enriched_frame, make_embeddings
+
+# Abre a coleção persistente em um processo novo (start "a frio" do app)
+COLD_OPEN_SNIPPET = """
+import time, sys
+import chromadb
+t0 = time.perf_counter()
+collection = chromadb.PersistentClient(path=sys.argv[1]).get_or_create_collection(name=sys.argv[2])
+n = collection.count()
+print(time.perf_counter() - t0, n)
+"""
+
+
+def rebuild_in_memory(df, embeddings):
+    """Startup atual: cliente em memória + carga completa da coleção."""
+    client = chromadb.Client()
+    name = f"bench_{int(time.time() * 1000)}"
+    collection = client.get_or_create_collection(name=name)
+    frame, matrix, rows = prepare_rows(df, embeddings)
+    bulk_load(collection.add, frame, matrix, rows, client.get_max_batch_size())
+    count = collection.count()
+    client.delete_collection(name)
+    return count
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara o tempo de start do ChromaDB em memória vs persistente.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--changed-fraction", type=float, default=0.01)
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados.")
+    args = parser.parse_args()
+
+    print(f"INFO: Gerando {args.rows} linhas sintéticas (dim={args.dim})...")
+    frame = make_enriched_frame(args.rows)
+    embeddings = make_embeddings(args.rows, args.dim)
+    df = attach_embeddings(frame, embeddings)
+
+    results = {"rows": args.rows, "dim": args.dim}
+    results["memory_startup_s"], _ = timed(rebuild_in_memory, df, embeddings)
+    print(f"Em memória (a cada start do app): {results['memory_startup_s']:.2f}s")
+
+    with tempfile.TemporaryDirectory() as persist_directory:
+        results["persistent_initial_sync_s"], _ = timed(sync_chromadb, df, persist_directory, embeddings)
+        print(f"Persistente, 1ª sincronização (pipeline, uma vez): {results['persistent_initial_sync_s']:.2f}s")
+
+        n_changed = int(args.rows * args.changed_fraction)
+        df.loc[df.index[:n_changed], 'sentimento'] = "Misto"
+        results["persistent_incremental_sync_s"], _ = timed(sync_chromadb, df, persist_directory, embeddings)
+        print(f"Persistente, sincronização incremental ({n_changed} linhas alteradas): "
+              f"{results['persistent_incremental_sync_s']:.2f}s")
+
+        output = subprocess.run(
+            [sys.executable, "-c", COLD_OPEN_SNIPPET, persist_directory, COLLECTION_NAME],
+            capture_output=True, text=True, check=True
+        ).stdout.split()
+        results["persistent_startup_s"] = float(output[0])
+        print(f"Persistente, start do app (processo novo, só abre a coleção com {output[1]} docs): "
+              f"{results['persistent_startup_s']:.2f}s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"INFO: Resultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# ===== BENCHMARK: SELEÇÃO DE CONTEXTO DO PROMPT (MMR + ORÇAMENTO DE TOKENS) =====
+# Uso: python benchmarks/bench_context.py --rows 50000 --queries 200
+# Usa a busca BM25 (sem API) para recuperar os candidatos de cada pergunta e
+# compara o prompt com os TOP_K documentos inteiros (como antes) e o prompt
+# montado pela seleção de contexto: tokens, trechos quase duplicados e
+# fornecedores distintos no contexto. Uma fração dos comentários é longa.
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from src.chatbot.context import _encoder, _jaccard, _shingles, build_context
+from src.chatbot.rag_chain import ManualRAGBot, TOP_K, CHAT_MODEL, CONTEXT_CANDIDATES, CONTEXT_TOKEN_BUDGET, \
+    CONTEXT_MAX_SNIPPETS, CONTEXT_MAX_SNIPPET_TOKENS
+from src.chatbot.retrievers import LexicalRetriever
+from src.chatbot.query_filters import extract_known_values
+from run_benchmarks import latency_stats
+from synthetic import make_enriched_frame
+
+QUESTIONS = ["comida fria", "DJ rude", "buffet delicioso", "som alto", "músicas repetitivas",
+             "pista cheia", "esqueceu as bebidas", "comida morna", "DJ atrasou", "buffet desastre"]
+
+
+def with_long_comments(frame, rate: float, seed: int = 3):
+    """Alguns comentários viram relatos longos (o mesmo texto com detalhes repetidos)."""
+    rng = np.random.default_rng(seed)
+    comments = frame['Comentario_Cliente'].tolist()
+    for i in np.flatnonzero(rng.random(len(comments)) < rate):
+        comments[i] = " ".join([comments[i]] + ["Detalhando melhor o que aconteceu: " + comments[i]] * 6)
+    frame = frame.copy()
+    frame['Comentario_Cliente'] = comments
+    return frame
+
+
+def duplicate_pairs(texts: list[str], threshold: float = 0.8) -> int:
+    shingles = [_shingles(t) for t in texts]
+    return sum(_jaccard(shingles[i], shingles[j]) >= threshold
+               for i in range(len(texts)) for j in range(i + 1, len(texts)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tokens do prompt com e sem a seleção de contexto.")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--long-rate", type=float, default=0.1, help="Fração de comentários longos.")
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados.")
+    args = parser.parse_args()
+
+    frame = with_long_comments(make_enriched_frame(args.rows), args.long_rate)
+    lexical = LexicalRetriever(frame)
+    bot = ManualRAGBot(retriever=lexical, lexical=lexical, known_values=extract_known_values(frame),
+                       api_key="fake-key", base_url="http://127.0.0.1:9", retrieval_mode="lexical")
+    tokenizer = "tiktoken" if _encoder(CHAT_MODEL) is not None else "estimativa (4 caracteres/token)"
+    print(f"INFO: {args.rows:,} comentários, {CONTEXT_CANDIDATES} candidatos por pergunta, "
+          f"orçamento de {CONTEXT_TOKEN_BUDGET} tokens, tokenizador: {tokenizer}.")
+
+    before, after, duplicates, suppliers, packing = [], [], {"antes": [], "depois": []}, {"antes": [], "depois": []}, []
+    for i in range(args.queries):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        hits = lexical.search(question, CONTEXT_CANDIDATES)
+        start = time.perf_counter()
+        pack = build_context(hits, CONTEXT_TOKEN_BUDGET, CONTEXT_MAX_SNIPPETS,
+                             max_snippet_tokens=CONTEXT_MAX_SNIPPET_TOKENS, model=CHAT_MODEL)
+        packing.append(time.perf_counter() - start)
+
+        report = {}
+        bot._select_context(question, hits, report)
+        before.append(report["prompt_tokens_unpacked"])
+        after.append(report["prompt_tokens"])
+        unpacked = hits[:TOP_K]
+        for name, chosen in (("antes", [h['document'] for h in unpacked]), ("depois", pack.snippets)):
+            duplicates[name].append(duplicate_pairs(chosen))
+        suppliers["antes"].append(len({h['metadata'].get('ID_Fornecedor_DJ') for h in unpacked}))
+        suppliers["depois"].append(len({s.split(" · ")[0] for s in pack.snippets}))
+
+    results = {
+        "rows": args.rows, "queries": args.queries, "top_k": TOP_K, "candidates": CONTEXT_CANDIDATES,
+        "token_budget": CONTEXT_TOKEN_BUDGET, "tokenizer": tokenizer,
+        "prompt_tokens": {"antes": {"mean": float(np.mean(before)), "p95": float(np.percentile(before, 95))},
+                          "depois": {"mean": float(np.mean(after)), "p95": float(np.percentile(after, 95))}},
+        "duplicate_pairs_per_prompt": {k: float(np.mean(v)) for k, v in duplicates.items()},
+        "distinct_djs_per_prompt": {k: float(np.mean(v)) for k, v in suppliers.items()},
+        "packing": latency_stats(packing),
+    }
+    print(f"{'':<8} {'tokens/prompt':>14} {'p95':>6} {'pares duplicados':>17} {'DJs distintos':>14}")
+    for name in ("antes", "depois"):
+        tokens = results["prompt_tokens"][name]
+        print(f"{name:<8} {tokens['mean']:>14.0f} {tokens['p95']:>6.0f} "
+              f"{results['duplicate_pairs_per_prompt'][name]:>17.2f} {results['distinct_djs_per_prompt'][name]:>14.2f}")
+    print(f"INFO: Seleção de contexto: p50 {results['packing']['p50_ms']:.2f} ms por pergunta.")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"INFO: Resultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
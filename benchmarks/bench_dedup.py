@@ -0,0 +1,109 @@
+# ===== BENCHMARK: DEDUPLICAÇÃO ANTES DAS CHAMADAS À API =====
+# Uso: python benchmarks/bench_dedup.py --rows 5000 --near-duplicate-rate 0.4 --latency-ms 20
+# Gera comentários sintéticos em que uma fração são variações de comentários
+# anteriores (caixa, espaços, pontuação, um caractere trocado), roda o pipeline
+# de enriquecimento contra o servidor local com e sem a deduplicação e compara
+# chamadas à API e tempo. Também mede o custo do agrupamento (MinHash + LSH).
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from src.analysis.analyzer import run_ai_pipeline, DEDUP_THRESHOLD
+from src.analysis.dedup import deduplicate
+from fake_openai_server import FakeOpenAIServer
+from synthetic import make_raw_dataset
+
+
+def perturb(text: str, rng: np.random.Generator) -> str:
+    """Variação superficial de um comentário, como nas respostas copiadas de pesquisas."""
+    choice = rng.integers(0, 4)
+    if choice == 0:
+        return text.upper()
+    if choice == 1:
+        return "  " + text.replace(" ", "  ") + " "
+    if choice == 2:
+        return text.replace(".", "!").replace(",", "")
+    i = int(rng.integers(0, len(text)))
+    return text[:i] + "x" + text[i + 1:]
+
+
+def make_dataset(n_rows: int, near_duplicate_rate: float, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    df = make_raw_dataset(n_rows, seed=seed)
+    comments = df['Comentario_Cliente'].tolist()
+    for i in np.flatnonzero(rng.random(n_rows) < near_duplicate_rate):
+        if i > 0:
+            comments[i] = perturb(comments[int(rng.integers(0, i))], rng)
+    df['Comentario_Cliente'] = comments
+    return df
+
+
+def run(df, server, dedup: bool) -> dict:
+    before = dict(server.stats)
+    start = time.perf_counter()
+    enriched = run_ai_pipeline(df, "sk-bench", engine="async", base_url=server.base_url, dedup=dedup)
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "chat_calls": server.stats["chat"] - before["chat"],
+            "embedding_inputs": server.stats["embedding_inputs"] - before["embedding_inputs"],
+            "enriched": enriched}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deduplicação de comentários antes da API.")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--near-duplicate-rate", type=float, default=0.4)
+    parser.add_argument("--threshold", type=float, default=DEDUP_THRESHOLD)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--scale-sizes", type=int, nargs="*", default=[10_000, 100_000],
+                        help="Tamanhos para medir só o agrupamento.")
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados.")
+    args = parser.parse_args()
+
+    df = make_dataset(args.rows, args.near_duplicate_rate)
+    unique = df['Comentario_Cliente'].nunique()
+    groups = deduplicate(list(dict.fromkeys(df['Comentario_Cliente'])), args.threshold)
+    print(f"INFO: {args.rows} linhas, {unique} comentários distintos, {groups.n_clusters} grupos "
+          f"({groups.exact_merged} exatos, {groups.near_merged} quase-duplicatas).")
+
+    server = FakeOpenAIServer(latency_ms=args.latency_ms, dim=256).start()
+    try:
+        plain = run(df, server, dedup=False)
+        collapsed = run(df, server, dedup=True)
+    finally:
+        server.stop()
+
+    agreement = float((plain["enriched"]["sentimento"].to_numpy()
+                       == collapsed["enriched"]["sentimento"].to_numpy()).mean())
+    results = {"rows": args.rows, "distinct_comments": unique, "clusters": groups.n_clusters,
+               "sentiment_agreement": agreement, "scaling": {}}
+    for name, result in (("sem_dedup", plain), ("com_dedup", collapsed)):
+        result.pop("enriched")
+        results[name] = result
+        print(f"{name:<10} {result['seconds']:>7.2f}s  {result['chat_calls']:>6} chamadas de chat  "
+              f"{result['embedding_inputs']:>6} textos enviados para embedding")
+    print(f"INFO: Sentimento igual ao da execução sem deduplicação em {agreement:.1%} das linhas.")
+
+    for size in args.scale_sizes:
+        comments = list(dict.fromkeys(make_dataset(size, args.near_duplicate_rate)['Comentario_Cliente']))
+        start = time.perf_counter()
+        deduplicate(comments, args.threshold)
+        elapsed = time.perf_counter() - start
+        results["scaling"][size] = {"seconds": elapsed, "comments_per_second": len(comments) / elapsed}
+        print(f"INFO: Agrupamento de {len(comments):,} comentários: {elapsed:.2f}s "
+              f"({len(comments) / elapsed:,.0f}/s)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"INFO: Resultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
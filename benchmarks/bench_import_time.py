@@ -0,0 +1,108 @@
+# ===== BENCHMARK: TEMPO DE IMPORTAÇÃO DO APP E DE CADA PÁGINA =====
+# Uso: python benchmarks/bench_import_time.py --repeat 5 --top 10 [--budget-ms 1500]
+# Para cada ponto de entrada (app.py e pages/*.py), roda os imports de nível de
+# módulo do arquivo em um processo novo com `python -X importtime` e reporta o
+# tempo total e os pacotes mais pesados. Com --budget-ms, termina com erro se
+# algum ponto de entrada passar do orçamento.
+import argparse
+import ast
+import glob
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def entry_points() -> dict:
+    """{nome: arquivo} para app.py e cada página do Streamlit."""
+    files = [os.path.join(REPO_ROOT, "app.py")] + sorted(glob.glob(os.path.join(REPO_ROOT, "pages", "*.py")))
+    return {os.path.relpath(path, REPO_ROOT): path for path in files}
+
+
+def module_imports(path: str) -> str:
+    """Código com os imports de nível de módulo do arquivo (sem executar o resto)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    nodes = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(node) for node in nodes) or "pass"
+
+
+def measure(code: str) -> dict:
+    """
+    Roda o código com -X importtime em um processo novo.
+    :return: {"total_ms", "packages": {pacote raiz: ms cumulativos}}.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": REPO_ROOT}
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    total_us, packages = 0, {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        root = name.split(".")[0]
+        if indent == 1:  # import de nível superior (a saída usa 1 espaço + 2 por nível)
+            total_us += cumulative
+        if name == root:
+            packages[root] = max(packages.get(root, 0), cumulative)
+    return {"total_ms": total_us / 1000, "packages": {k: v / 1000 for k, v in packages.items()}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatório de tempo de importação (python -X importtime).")
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções por ponto de entrada (usa a mediana).")
+    parser.add_argument("--top", type=int, default=8, help="Pacotes mais pesados a listar.")
+    parser.add_argument("--modules", nargs="*", default=[],
+                        help="Módulos extras para medir isoladamente (ex.: chromadb openai matplotlib.pyplot).")
+    parser.add_argument("--budget-ms", type=float, help="Orçamento de importação por ponto de entrada.")
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados.")
+    args = parser.parse_args()
+
+    targets = {name: module_imports(path) for name, path in entry_points().items()}
+    targets.update({f"import {module}": f"import {module}" for module in args.modules})
+
+    results, over_budget = {}, []
+    for name, code in targets.items():
+        try:
+            runs = [measure(code) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            # Ex.: dependência opcional não instalada neste ambiente
+            print(f"{name}: ERRO ao importar ({e})")
+            results[name] = {"error": str(e)}
+            continue
+        median_run = sorted(runs, key=lambda r: r["total_ms"])[len(runs) // 2]
+        total_ms = statistics.median(r["total_ms"] for r in runs)
+        heaviest = sorted(median_run["packages"].items(), key=lambda kv: kv[1], reverse=True)[:args.top]
+        results[name] = {"total_ms": total_ms, "heaviest": dict(heaviest)}
+
+        print(f"{name}: {total_ms:,.0f} ms")
+        for package, ms in heaviest:
+            print(f"    {package:<28} {ms:>8,.0f} ms")
+        if args.budget_ms is not None and total_ms > args.budget_ms:
+            over_budget.append(name)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"INFO: Resultados salvos em {args.output}")
+
+    if over_budget:
+        print(f"ERRO: Acima do orçamento de {args.budget_ms:.0f} ms: {', '.join(over_budget)}")
+        sys.exit(1)
+    if args.budget_ms is not None:
+        print(f"SUCESSO: Todos os pontos de entrada dentro do orçamento de {args.budget_ms:.0f} ms.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# ===== BENCHMARK: KPIs INCREMENTAIS vs RECÁLCULO EM LOTE =====
+# Uso: python benchmarks/bench_kpi_accumulator.py --rows 200000 --changes 10000
+# Aplica adições/atualizações/remoções aleatórias no KPIAccumulator, confere o
+# resultado contra calculate_kpis (cubo recalculado do zero) e mede o custo por registro.
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from src.analysis.aggregates import build_aggregate_cube, sentiment_counts
+from src.analysis.metrics import KPIAccumulator, calculate_kpis, kpis_from_counts
+from synthetic import make_enriched_frame, SENTIMENTS
+
+
+def check_against_batch(accumulator: KPIAccumulator, frame) -> list[str]:
+    """Compara o acumulador com o cálculo em lote; devolve as divergências."""
+    cube = build_aggregate_cube(frame)
+    incremental = accumulator.kpis()
+    errors = []
+    expected = calculate_kpis(cube)
+    for key, value in expected.items():
+        if not np.isclose(incremental[key], value):
+            errors.append(f"{key}: incremental={incremental[key]} lote={value}")
+    for supplier_type, suppliers in incremental["by_supplier"].items():
+        for supplier, kpis in suppliers.items():
+            batch = kpis_from_counts(sentiment_counts(cube, supplier_type, supplier))
+            if kpis != batch:
+                errors.append(f"{supplier_type}/{supplier}: incremental={kpis} lote={batch}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Confere e mede o KPIAccumulator contra calculate_kpis.")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--changes", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    frame = make_enriched_frame(args.rows, seed=args.seed)
+    new_rows = make_enriched_frame(args.changes, seed=args.seed + 1)
+    new_rows['ID_Evento'] += frame['ID_Evento'].max() + 1
+
+    start = time.perf_counter()
+    accumulator = KPIAccumulator.from_frame(frame)
+    load_s = time.perf_counter() - start
+
+    # Mudanças aleatórias: 1/3 adições, 1/3 atualizações de sentimento, 1/3 remoções
+    frame = frame.set_index('ID_Evento', drop=False)
+    ops = rng.integers(0, 3, args.changes)
+    timings = []
+    for i, op in enumerate(ops):
+        if op == 0:
+            record = new_rows.iloc[i].to_dict()
+            frame.loc[record['ID_Evento']] = record
+            start = time.perf_counter()
+            accumulator.add(record)
+        elif op == 1:
+            event_id = frame.index[rng.integers(len(frame))]
+            frame.loc[event_id, 'sentimento'] = rng.choice(SENTIMENTS)
+            record = frame.loc[event_id].to_dict()
+            start = time.perf_counter()
+            accumulator.update(record)
+        else:
+            event_id = frame.index[rng.integers(len(frame))]
+            frame = frame.drop(index=event_id)
+            start = time.perf_counter()
+            accumulator.remove(event_id)
+        timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    calculate_kpis(build_aggregate_cube(frame))
+    batch_s = time.perf_counter() - start
+
+    errors = check_against_batch(accumulator, frame)
+    restored = KPIAccumulator.from_dict(json.loads(json.dumps(accumulator.to_dict())))
+    if restored.kpis() != accumulator.kpis():
+        errors.append("estado restaurado de to_dict/from_dict diverge do original")
+
+    per_change_us = np.asarray(timings) * 1e6
+    results = {
+        "rows": args.rows,
+        "changes": args.changes,
+        "initial_load_s": load_s,
+        "per_change_p50_us": float(np.percentile(per_change_us, 50)),
+        "per_change_p99_us": float(np.percentile(per_change_us, 99)),
+        "batch_recompute_s": batch_s,
+        "mismatches": errors,
+    }
+    print(f"Carga inicial: {load_s:.2f}s | por mudança: p50 {results['per_change_p50_us']:.1f} µs, "
+          f"p99 {results['per_change_p99_us']:.1f} µs | recálculo em lote: {batch_s * 1000:.0f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"INFO: Resultados salvos em {args.output}")
+
+    if errors:
+        print("ERRO: KPIs incrementais divergem do cálculo em lote:")
+        for error in errors[:20]:
+            print(f"  {error}")
+        sys.exit(1)
+    print("SUCESSO: KPIs incrementais iguais ao cálculo em lote (inclusive após serializar).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# ===== BENCHMARK: BUSCA POR PALAVRA-CHAVE (BM25) vs EMBEDDING + BUSCA VETORIAL =====
+# Uso: python benchmarks/bench_lexical.py --rows 100000 --queries 200 --latency-ms 30
+# Mede a construção e a atualização incremental do índice BM25, a latência da
+# busca local e, com o ManualRAGBot contra o servidor local, o tempo de
+# recuperação de perguntas por palavra-chave com e sem o atalho lexical.
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.chatbot.lexical import is_keyword_query
+from src.chatbot.rag_chain import ManualRAGBot
+from src.chatbot.retrievers import NumpyRetriever, LexicalRetriever
+from src.chatbot.query_filters import extract_known_values
+from fake_openai_server import FakeOpenAIServer
+from run_benchmarks import latency_stats
+from synthetic import make_enriched_frame, make_embeddings
+
+KEYWORD_QUERIES = ["atrasado", "buffet frio", "DJ C som alto", "rude", "comida fria", "som alto",
+                   "músicas repetitivas", "esqueceu as bebidas", "pista cheia", "desastre"]
+OPEN_QUESTIONS = ["O que os clientes acharam da comida do Buffet X?", "Quais as principais reclamações do DJ A?",
+                  "Como foi a animação da pista nos eventos?", "Resuma os elogios ao Buffet Z."]
+
+
+def time_calls(function, items) -> dict:
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        function(item)
+        samples.append(time.perf_counter() - start)
+    return latency_stats(samples)
+
+
+def run_bot(bot, server, questions: list[str]) -> dict:
+    """Só a etapa de recuperação (embedding + busca), sem gerar respostas."""
+    bot.clear_cache()
+    embeddings_before = server.stats["embeddings"]
+    retrieval, routes = [], {}
+    for question in questions:
+        timings = {}
+        bot._prepare(question, timings)
+        retrieval.append(timings["retrieval_ms"] / 1000)
+        routes[timings["route"]] = routes.get(timings["route"], 0) + 1
+        bot.clear_cache()
+    return {"retrieval": latency_stats(retrieval), "embedding_calls": server.stats["embeddings"] - embeddings_before,
+            "routes": routes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BM25 local vs embedding + busca vetorial.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--add-rows", type=int, default=1_000, help="Linhas da atualização incremental.")
+    parser.add_argument("--latency-ms", type=float, default=30, help="Latência simulada da API de embeddings.")
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados.")
+    args = parser.parse_args()
+
+    frame = make_enriched_frame(args.rows + args.add_rows)
+    base, extra = frame.iloc[:args.rows], frame.iloc[args.rows:]
+
+    # 1. Construção e atualização incremental do índice
+    start = time.perf_counter()
+    lexical = LexicalRetriever(base)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    added = lexical.add(extra)
+    add_seconds = time.perf_counter() - start
+    print(f"INFO: Índice BM25 de {args.rows:,} comentários em {build_seconds:.2f}s "
+          f"({lexical.index.nbytes / 2**20:.1f} MiB, {len(lexical.index.vocabulary):,} termos); "
+          f"+{added:,} linhas incrementais em {add_seconds * 1000:.0f} ms.")
+
+    # 2. Busca local
+    keyword_questions = [KEYWORD_QUERIES[i % len(KEYWORD_QUERIES)] for i in range(args.queries)]
+    search = {
+        "sem_filtro": time_calls(lambda q: lexical.search(q, 5), keyword_questions),
+        "ID_Fornecedor_DJ=DJ_C": time_calls(lambda q: lexical.search(q, 5, {"ID_Fornecedor_DJ": "DJ_C"}),
+                                            keyword_questions),
+    }
+    for name, stats in search.items():
+        print(f"INFO: Busca BM25 [{name}]: p50 {stats['p50_ms']:.2f} ms | p99 {stats['p99_ms']:.2f} ms")
+
+    # 3. Recuperação no chatbot: com e sem o atalho por palavra-chave
+    frame = frame.reset_index(drop=True)
+    vector = NumpyRetriever(frame, make_embeddings(len(frame), args.dim))
+    server = FakeOpenAIServer(latency_ms=args.latency_ms, dim=args.dim).start()
+    bots = {}
+    try:
+        for name, shortcut in (("sem_atalho", False), ("com_atalho", True)):
+            bot = ManualRAGBot(retriever=vector, lexical=lexical, known_values=extract_known_values(frame),
+                               api_key="fake-key", base_url=server.base_url, keyword_shortcut=shortcut)
+            bots[name] = {"palavra_chave": run_bot(bot, server, keyword_questions),
+                          "perguntas_abertas": run_bot(bot, server, OPEN_QUESTIONS * 5)}
+    finally:
+        server.stop()
+
+    print(f"{'':<12} {'tipo':<18} {'p50 ms':>8} {'p95 ms':>8} {'embeddings':>11}  rotas")
+    for name, runs in bots.items():
+        for kind, run in runs.items():
+            print(f"{name:<12} {kind:<18} {run['retrieval']['p50_ms']:>8.2f} {run['retrieval']['p95_ms']:>8.2f} "
+                  f"{run['embedding_calls']:>11}  {run['routes']}")
+
+    classified = {q: is_keyword_query(q) for q in KEYWORD_QUERIES + OPEN_QUESTIONS}
+    results = {"rows": args.rows, "build_seconds": build_seconds, "index_bytes": lexical.index.nbytes,
+               "vocabulary": len(lexical.index.vocabulary), "incremental_rows": added,
+               "incremental_seconds": add_seconds, "search": search, "chatbot": bots,
+               "keyword_heuristic": classified}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"INFO: Resultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
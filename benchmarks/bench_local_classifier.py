@@ -0,0 +1,92 @@
+# ===== BENCHMARK: CLASSIFICADOR LOCAL + LLM vs. SÓ LLM =====
+# Uso: python benchmarks/bench_local_classifier.py --train-rows 20000 --rows 5000 --latency-ms 50
+# Treina o classificador local com dados sintéticos "rotulados pelo LLM", mede a
+# concordância em linhas não vistas e roda o pipeline de enriquecimento contra o
+# servidor local (fake_openai_server) com e sem a triagem, comparando chamadas
+# de chat, tokens e linhas/s.
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from src.analysis.analyzer import run_ai_pipeline
+from src.analysis.local_classifier import LocalClassifier, agreement_report, format_agreement_report
+from src.monitoring.instrumentation import METRICS
+from fake_openai_server import FakeOpenAIServer, fake_analysis
+from synthetic import make_raw_dataset
+
+
+def labelled_dataset(n_rows: int, seed: int):
+    """Dataset sintético com os rótulos que o servidor local devolveria (o "LLM")."""
+    df = make_raw_dataset(n_rows, seed=seed)
+    labels = [fake_analysis(text) for text in df['Comentario_Cliente']]
+    return df, np.array([l["sentimento"] for l in labels]), np.array([l["topico"] for l in labels])
+
+
+def run_pipeline(df, server, classifier) -> dict:
+    METRICS.reset()
+    chat_before = server.stats["chat"]
+    start = time.perf_counter()
+    enriched = run_ai_pipeline(df, "sk-bench", engine="async", base_url=server.base_url,
+                               local_classifier=classifier)
+    elapsed = time.perf_counter() - start
+    tokens = sum(c["value"] for c in METRICS.snapshot()["counters"]
+                 if c["name"] == "api_tokens_total" and c["labels"]["endpoint"] == "chat")
+    return {"seconds": elapsed, "rows_per_second": len(df) / elapsed,
+            "chat_calls": server.stats["chat"] - chat_before, "chat_tokens": tokens,
+            "enriched": enriched}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classificador local + LLM vs. só LLM.")
+    parser.add_argument("--train-rows", type=int, default=20_000)
+    parser.add_argument("--rows", type=int, default=5_000, help="Linhas novas enriquecidas pelo pipeline.")
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--latency-ms", type=float, default=50, help="Latência simulada por requisição.")
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados.")
+    args = parser.parse_args()
+
+    # 1. Treino e concordância em linhas não vistas
+    train_df, train_sentiments, train_topics = labelled_dataset(args.train_rows, seed=1)
+    start = time.perf_counter()
+    classifier = LocalClassifier(args.threshold).fit(train_df['Comentario_Cliente'], train_sentiments, train_topics)
+    train_seconds = time.perf_counter() - start
+    print(f"INFO: Treino com {args.train_rows} linhas em {train_seconds:.1f}s.")
+
+    df, sentiments, topics = labelled_dataset(args.rows, seed=2)
+    report = agreement_report(classifier, df['Comentario_Cliente'], sentiments, topics,
+                              sorted({0.5, 0.8, args.threshold, 0.95}))
+    print(format_agreement_report(report))
+
+    # 2. Pipeline com e sem a triagem local
+    server = FakeOpenAIServer(latency_ms=args.latency_ms, dim=256).start()
+    try:
+        llm_only = run_pipeline(df, server, None)
+        tiered = run_pipeline(df, server, classifier)
+    finally:
+        server.stop()
+
+    agreement = float((tiered["enriched"]["sentimento"].to_numpy() == llm_only["enriched"]["sentimento"].to_numpy()).mean())
+    results = {"train_rows": args.train_rows, "train_seconds": train_seconds, "agreement_report": report,
+               "tiered_vs_llm_sentiment_agreement": agreement}
+    for name, run in (("llm_only", llm_only), ("tiered", tiered)):
+        run.pop("enriched")
+        results[name] = run
+        print(f"{name:<9} {run['seconds']:>7.2f}s  {run['rows_per_second']:>9,.0f} linhas/s  "
+              f"{run['chat_calls']:>7} chamadas de chat  {run['chat_tokens']:>9,} tokens")
+    print(f"INFO: Concordância de sentimento (com triagem vs. só LLM): {agreement:.1%}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"INFO: Resultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
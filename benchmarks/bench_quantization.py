@@ -0,0 +1,111 @@
+# ===== BENCHMARK: ÍNDICE QUANTIZADO (float16 / int8 / binário) vs float32 =====
+# Uso: python benchmarks/bench_quantization.py --rows 200000 --queries 300
+# Gera embeddings sintéticos agrupados (vizinhos de verdade, ao contrário de
+# vetores aleatórios), grava a matriz em .npy e a abre em memory-map como o app.
+# Para cada modo compara o recall@k contra a busca exata float32, a latência
+# e a memória do índice, com e sem o reordenamento em precisão total.
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from src.chatbot.retrievers import NumpyRetriever, QuantizedRetriever
+from src.chatbot.quantization import quantize
+from bench_retrieval import latency_stats
+from synthetic import make_enriched_frame
+
+
+def clustered_embeddings(n_rows: int, dim: int, n_queries: int, rows_per_cluster: int = 50, seed: int = 42):
+    """
+    Embeddings em grupos (tópicos) com um componente comum a todos, como os
+    da OpenAI, e perguntas próximas de linhas existentes.
+    """
+    rng = np.random.default_rng(seed)
+    common = rng.standard_normal(dim, dtype=np.float32)
+    centers = rng.standard_normal((max(1, n_rows // rows_per_cluster), dim), dtype=np.float32)
+    matrix = np.empty((n_rows, dim), dtype=np.float32)
+    for start in range(0, n_rows, 50000):
+        size = min(50000, n_rows - start)
+        block = 0.5 * common + centers[rng.integers(0, len(centers), size)]
+        block += 0.8 * rng.standard_normal((size, dim), dtype=np.float32)
+        matrix[start:start + size] = block / np.linalg.norm(block, axis=1, keepdims=True)
+    queries = matrix[rng.integers(0, n_rows, n_queries)] + 0.04 * rng.standard_normal((n_queries, dim),
+                                                                                       dtype=np.float32)
+    return matrix, queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def evaluate(retriever, queries: np.ndarray, exact_ids: list, k: int, where: dict | None) -> dict:
+    samples, recalls = [], []
+    for query, expected in zip(queries, exact_ids):
+        start = time.perf_counter()
+        hits = retriever.search(query, k, where)
+        samples.append(time.perf_counter() - start)
+        recalls.append(len({hit['id'] for hit in hits} & set(expected)) / max(1, len(expected)))
+    return {**latency_stats(samples), f"recall@{k}": float(np.mean(recalls))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall e memória do índice quantizado vs float32.")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rescore-candidates", type=int, nargs="+", default=[0, 100, 400])
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados.")
+    args = parser.parse_args()
+
+    print(f"INFO: Gerando {args.rows} embeddings agrupados (dim={args.dim})...")
+    frame = make_enriched_frame(args.rows)
+    matrix, queries = clustered_embeddings(args.rows, args.dim, args.queries)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "embeddings.npy")
+        np.save(path, matrix)
+        del matrix
+        embeddings = np.load(path, mmap_mode='r')
+
+        exact = NumpyRetriever(frame, embeddings)
+        filters = {"sem_filtro": None, "ID_Fornecedor_DJ=DJ_C": {"ID_Fornecedor_DJ": "DJ_C"}}
+        exact_ids = {name: [[hit['id'] for hit in exact.search(q, args.k, where)] for q in queries]
+                     for name, where in filters.items()}
+
+        float32_bytes = exact.matrix.nbytes
+        results = {"rows": args.rows, "dim": args.dim, "queries": args.queries, "k": args.k,
+                   "float32_index_bytes": float32_bytes, "modes": {}}
+        stats = evaluate(exact, queries, exact_ids["sem_filtro"], args.k, None)
+        print(f"{'modo':<8} {'reord.':>6} {'MiB':>9} {'x menor':>8} {'p50 ms':>8} {'p99 ms':>8} "
+              f"{'recall':>7} {'recall c/ filtro':>17}")
+        print(f"{'float32':<8} {'-':>6} {float32_bytes / 2**20:>9.1f} {1:>8.1f} {stats['p50_ms']:>8.2f} "
+              f"{stats['p99_ms']:>8.2f} {1:>7.3f} {1:>17.3f}")
+
+        for mode in ("float16", "int8", "binary"):
+            start = time.perf_counter()
+            codes = quantize(embeddings, mode)
+            build_seconds = time.perf_counter() - start
+            results["modes"][mode] = {"index_bytes": codes.nbytes, "build_seconds": build_seconds,
+                                      "compression": float32_bytes / codes.nbytes, "rescore": {}}
+            for rescore in args.rescore_candidates:
+                retriever = QuantizedRetriever(frame, embeddings, mode, rescore, codes=codes)
+                run = {name: evaluate(retriever, queries, exact_ids[name], args.k, where)
+                       for name, where in filters.items()}
+                results["modes"][mode]["rescore"][rescore] = run
+                plain, filtered = run["sem_filtro"], run["ID_Fornecedor_DJ=DJ_C"]
+                print(f"{mode:<8} {rescore:>6} {codes.nbytes / 2**20:>9.1f} {float32_bytes / codes.nbytes:>8.1f} "
+                      f"{plain['p50_ms']:>8.2f} {plain['p99_ms']:>8.2f} {plain[f'recall@{args.k}']:>7.3f} "
+                      f"{filtered[f'recall@{args.k}']:>17.3f}")
+        del exact, embeddings
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"INFO: Resultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# ===== BENCHMARK: LATÊNCIA DE CONSULTA CHROMA vs ÍNDICE NUMPY =====
+# Uso: python benchmarks/bench_retrieval.py --rows 100000 --queries 500
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import chromadb
+import numpy as np
+
+from src.chatbot.retrievers import ChromaRetriever, NumpyRetriever
+from src.database.chroma_manager import prepare_rows, bulk_load
+from synthetic import make_enriched_frame, make_embeddings
+
+
+def latency_stats(samples: list[float]) -> dict:
+    ms = np.asarray(samples) * 1000
+    return {"p50_ms": float(np.percentile(ms, 50)), "p99_ms": float(np.percentile(ms, 99)),
+            "mean_ms": float(ms.mean())}
+
+
+def time_queries(retriever, queries: np.ndarray, k: int, where: dict | None) -> tuple[dict, list]:
+    samples, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = retriever.search(query, k, where)
+        samples.append(time.perf_counter() - start)
+        results.append([hit['id'] for hit in hits])
+    return latency_stats(samples), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a latência de consulta do ChromaDB e do índice NumPy.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados.")
+    args = parser.parse_args()
+
+    print(f"INFO: Gerando {args.rows} linhas sintéticas (dim={args.dim})...")
+    frame = make_enriched_frame(args.rows)
+    embeddings = make_embeddings(args.rows, args.dim)
+    queries = make_embeddings(args.queries, args.dim, seed=7)
+
+    client = chromadb.Client()
+    collection = client.get_or_create_collection(name="bench_retrieval")
+    valid_frame, matrix, rows = prepare_rows(frame, embeddings)
+    bulk_load(collection.add, valid_frame, matrix, rows, client.get_max_batch_size())
+
+    backends = {"chroma": ChromaRetriever(collection), "numpy": NumpyRetriever(frame, embeddings)}
+    filters = {"sem_filtro": None, "ID_Fornecedor_DJ=DJ_C": {"ID_Fornecedor_DJ": "DJ_C"}}
+
+    results = {"rows": args.rows, "dim": args.dim, "queries": args.queries, "k": args.k, "latency": {}}
+    for filter_name, where in filters.items():
+        ids = {}
+        for name, retriever in backends.items():
+            stats, ids[name] = time_queries(retriever, queries, args.k, where)
+            results["latency"][f"{name}/{filter_name}"] = stats
+            print(f"{name:>6} [{filter_name}]: p50 {stats['p50_ms']:.2f} ms | p99 {stats['p99_ms']:.2f} ms")
+        # Concordância do HNSW (aproximado) com a busca exata
+        overlap = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(ids["chroma"], ids["numpy"])])
+        results[f"chroma_recall_vs_exact/{filter_name}"] = float(overlap)
+        print(f"       recall@{args.k} do Chroma vs busca exata: {overlap:.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"INFO: Resultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
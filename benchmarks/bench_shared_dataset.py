@@ -0,0 +1,130 @@
+# ===== BENCHMARK: DADOS POR SESSÃO (st.cache_data + session_state) vs DADOS COMPARTILHADOS =====
+# Uso: python benchmarks/bench_shared_dataset.py --rows 100000 --sessions 1 10 40
+# Grava dados sintéticos no formato colunar (Parquet + .npy) e simula N sessões:
+# - antes: cada sessão recebe a cópia do frame que o st.cache_data devolve
+#   (desserializada a cada chamada) e a coluna 'embedding' com uma view por linha;
+# - depois: cada sessão guarda uma referência ao SharedDataset do processo.
+# Mede a memória alocada (tracemalloc + pool do Arrow), o custo por sessão e a
+# troca de versão quando o pipeline publica dados novos.
+import argparse
+import gc
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pyarrow as pa
+
+from src.database.enriched_store import attach_embeddings, load_frame, load_embeddings
+from src.database.shared_dataset import SharedDatasetHandle
+from run_benchmarks import latency_stats
+from synthetic import make_enriched_frame, make_embeddings
+
+
+def allocated_bytes() -> int:
+    """Memória do Python/NumPy (tracemalloc) + buffers do Arrow (strings do pandas)."""
+    return tracemalloc.get_traced_memory()[0] + pa.total_allocated_bytes()
+
+
+def per_session_copy(paths: tuple):
+    """Como o app fazia: st.cache_data devolve uma cópia do frame; attach_embeddings copia de novo."""
+    cached = pickle.dumps(load_frame(*paths))
+    embeddings = load_embeddings(*paths)
+
+    def open_session():
+        return {"df_enriched": attach_embeddings(pickle.loads(cached), embeddings)}
+    return open_session
+
+
+def shared(handle: SharedDatasetHandle):
+    def open_session():
+        return {"dataset": handle.get()}
+    return open_session
+
+
+def measure(open_session, n_sessions: int) -> dict:
+    """Memória retida por n_sessions sessões abertas ao mesmo tempo e o tempo de abertura de cada uma."""
+    gc.collect()
+    baseline = allocated_bytes()
+    sessions, samples = [], []
+    for _ in range(n_sessions):
+        start = time.perf_counter()
+        sessions.append(open_session())
+        samples.append(time.perf_counter() - start)
+    gc.collect()
+    retained = allocated_bytes() - baseline
+    del sessions
+    gc.collect()
+    return {"bytes": retained, "open_session": latency_stats(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memória de N sessões: cópia por sessão vs dados compartilhados.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 40])
+    parser.add_argument("--output", help="Arquivo JSON para salvar os resultados.")
+    args = parser.parse_args()
+
+    print(f"INFO: Gerando {args.rows} linhas sintéticas (dim={args.dim})...")
+    frame = make_enriched_frame(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = (os.path.join(tmp, "data_enriched.parquet"), os.path.join(tmp, "data_enriched_embeddings.npy"),
+                 os.path.join(tmp, "data_enriched.json"))
+        frame.to_parquet(paths[0], index=False)
+        np.save(paths[1], make_embeddings(args.rows, args.dim))
+        del frame
+
+        handle = SharedDatasetHandle(*paths)
+        dataset = handle.get()
+        print(f"INFO: Frame compartilhado: {dataset.frame.memory_usage(deep=True).sum() / 2**20:.1f} MiB; "
+              f"matriz em memory-map: {dataset.embeddings.nbytes / 2**20:.0f} MiB (páginas do arquivo, "
+              f"fora das contagens abaixo).")
+
+        tracemalloc.start()
+        strategies = {"antes": per_session_copy(paths), "depois": shared(handle)}
+        results = {"rows": args.rows, "dim": args.dim, "sessions": {}}
+        print(f"{'sessões':>8} {'antes MiB':>10} {'depois KiB':>11} {'abrir antes ms':>15} {'abrir depois ms':>16}")
+        for n in args.sessions:
+            run = {name: measure(open_session, n) for name, open_session in strategies.items()}
+            results["sessions"][n] = run
+            before, after = run["antes"], run["depois"]
+            print(f"{n:>8} {before['bytes'] / 2**20:>10.1f} {after['bytes'] / 2**10:>11.1f} "
+                  f"{before['open_session']['p50_ms']:>15.2f} {after['open_session']['p50_ms']:>16.4f}")
+        tracemalloc.stop()
+
+        # Checagem de versão a cada leitura (sem dados novos) e troca de versão
+        samples = []
+        for _ in range(1000):
+            start = time.perf_counter()
+            handle.get()
+            samples.append(time.perf_counter() - start)
+        results["get_unchanged"] = latency_stats(samples)
+
+        old = handle.get()
+        stat = os.stat(paths[0])
+        os.utime(paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))  # "pipeline publicou"
+        start = time.perf_counter()
+        new = handle.get()
+        results["reload_seconds"] = time.perf_counter() - start
+        results["reloaded"] = new is not old and new.version != old.version
+        print(f"INFO: get() sem dados novos: p50 {results['get_unchanged']['p50_ms'] * 1000:.1f} µs; "
+              f"nova versão carregada em {results['reload_seconds'] * 1000:.0f} ms "
+              f"(trocou: {results['reloaded']}, cargas: {handle.loads}).")
+        del dataset, old, new, handle
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"INFO: Resultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
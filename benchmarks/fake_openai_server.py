@@ -0,0 +1,253 @@
+# ===== SERVIDOR LOCAL QUE IMITA A API DA OPENAI =====
+# Uso: python benchmarks/fake_openai_server.py --port 8001 --latency-ms 200 --error-rate 0.2
+#      OPENAI_BASE_URL=http://127.0.0.1:8001/v1 python scripts/run_pipeline.py
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Server(ThreadingHTTPServer):
+    # O padrão (5) recusa conexões quando vários clientes abrem dezenas ao mesmo tempo
+    request_queue_size = 1024
+    daemon_threads = True
+
+import numpy as np
+
+SENTIMENTS = ["Positivo", "Negativo", "Misto"]
+TOPICS = ["Buffet", "DJ", "Atendimento", "Geral"]
+
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+
+
+def fake_embedding(text: str, dim: int) -> list[float]:
+    """Deterministic unit vector derived from the text hash."""
+    vector = np.random.default_rng(_seed(text)).standard_normal(dim).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+    return vector.tolist()
+
+
+# Pistas de sentimento/tópico nos textos de benchmarks/synthetic.py
+_SENTIMENT_CUES = (("Misto", (" mas ", "mediano", "razoável")),
+                   ("Negativo", ("fria", "péssimo", "horrível", "desastre")),
+                   ("Positivo", ("sensacional", "perfeito", "adorei", "delicioso")))
+_TOPIC_CUES = (("Buffet", ("comida", "bebidas")), ("DJ", ("pista", "músicas", "som ")))
+
+
+def fake_analysis(text: str) -> dict:
+    """
+    Deterministic sentiment/topic: read from cue words in the text, like a
+    real model would, except for ~10% of the texts (and texts without cues),
+    which get labels derived from the text hash (label noise).
+    """
+    seed = _seed(text)
+    sentiment, topic = SENTIMENTS[seed % 3], TOPICS[(seed // 3) % 4]
+    if seed % 10:
+        lowered = text.lower()
+        sentiment = next((label for label, cues in _SENTIMENT_CUES if any(c in lowered for c in cues)), sentiment)
+        topic = next((label for label, cues in _TOPIC_CUES if any(c in lowered for c in cues)), topic)
+    return {"sentimento": sentiment, "topico": topic}
+
+
+class FakeOpenAIServer:
+    """
+    Minimal OpenAI-compatible HTTP server (chat completions, streamed or not,
+    + embeddings) with deterministic outputs, configurable latency and
+    injected 429s.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0,
+                 latency_jitter_ms: float = 0, error_rate: float = 0.0, retry_after: float = 1.0,
+                 dim: int = 1536, seed: int = 42, token_latency_ms: float = 0, max_input_chars: int | None = None):
+        """
+        :param host: bind address.
+        :param port: bind port (0 picks a free port).
+        :param latency_ms: fixed latency added to every request.
+        :param latency_jitter_ms: uniform random latency added on top.
+        :param error_rate: fraction of requests answered with HTTP 429.
+        :param retry_after: value of the Retry-After header on 429s (seconds).
+        :param dim: embedding dimension.
+        :param seed: seed of the error/latency random generator.
+        :param token_latency_ms: delay between chunks of a streamed chat completion.
+        :param max_input_chars: embedding inputs longer than this are rejected with HTTP 400
+                                (like inputs over the model's token limit).
+        """
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.dim = dim
+        self.token_latency_ms = token_latency_ms
+        self.max_input_chars = max_input_chars
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"chat": 0, "embeddings": 0, "embedding_inputs": 0, "throttled": 0}
+        self.httpd = _Server((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload: dict, headers: dict | None = None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+
+                with server.lock:
+                    delay = server.latency_ms + server.random.uniform(0, server.latency_jitter_ms)
+                    throttle = server.random.random() < server.error_rate
+                    if throttle:
+                        server.stats["throttled"] += 1
+                time.sleep(delay / 1000)
+
+                if throttle:
+                    self._send(429, {"error": {"message": "Rate limit reached (fake)", "type": "requests",
+                                               "code": "rate_limit_exceeded"}},
+                               {"Retry-After": str(server.retry_after)})
+                    return
+
+                if self.path.endswith("/embeddings"):
+                    self._embeddings(request)
+                elif self.path.endswith("/chat/completions"):
+                    self._chat(request)
+                else:
+                    self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+            def _embeddings(self, request: dict):
+                inputs = request["input"]
+                inputs = [inputs] if isinstance(inputs, str) else inputs
+                with server.lock:
+                    server.stats["embeddings"] += 1
+                    server.stats["embedding_inputs"] += len(inputs)
+                if server.max_input_chars is not None and any(len(t) > server.max_input_chars for t in inputs):
+                    self._send(400, {"error": {"message": "Input too long (fake)", "type": "invalid_request_error",
+                                               "code": "context_length_exceeded"}})
+                    return
+                tokens = sum(len(t) // 4 + 1 for t in inputs)
+                self._send(200, {
+                    "object": "list",
+                    "model": request.get("model"),
+                    "data": [{"object": "embedding", "index": i, "embedding": fake_embedding(t, server.dim)}
+                             for i, t in enumerate(inputs)],
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+                })
+
+            def _chat(self, request: dict):
+                with server.lock:
+                    server.stats["chat"] += 1
+                text = request["messages"][-1]["content"]
+                if request.get("response_format", {}).get("type") == "json_object":
+                    content = json.dumps(fake_analysis(text), ensure_ascii=False)
+                else:
+                    content = f"Resposta simulada para: {text[-80:]}"
+                prompt_tokens = sum(len(m["content"]) // 4 + 1 for m in request["messages"])
+                completion_tokens = len(content) // 4 + 1
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                         "total_tokens": prompt_tokens + completion_tokens}
+                if request.get("stream"):
+                    self._stream_chat(request, content, usage)
+                    return
+                self._send(200, {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": usage,
+                })
+
+            def _stream_chat(self, request: dict, content: str, usage: dict):
+                """
+                Server-sent events: one chunk per word, then [DONE]. With
+                stream_options.include_usage, a last chunk carries the usage.
+                """
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                words = content.split(" ")
+                for i, word in enumerate(words):
+                    chunk = {
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": request.get("model"),
+                        "choices": [{"index": 0, "finish_reason": None,
+                                     "delta": {"content": word if i == 0 else " " + word}}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    time.sleep(server.token_latency_ms / 1000)
+                final = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": request.get("model"),
+                         "choices": [{"index": 0, "finish_reason": "stop", "delta": {}}]}
+                self.wfile.write(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+                if (request.get("stream_options") or {}).get("include_usage"):
+                    usage_chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk",
+                                   "created": int(time.time()), "model": request.get("model"),
+                                   "choices": [], "usage": usage}
+                    self.wfile.write(f"data: {json.dumps(usage_chunk)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+    def start(self) -> "FakeOpenAIServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local compatível com a API da OpenAI.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--token-latency-ms", type=float, default=0)
+    parser.add_argument("--max-input-chars", type=int, help="Rejeita (HTTP 400) embeddings de textos maiores.")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(args.host, args.port, args.latency_ms, args.latency_jitter_ms,
+                              args.error_rate, args.retry_after, args.dim,
+                              token_latency_ms=args.token_latency_ms, max_input_chars=args.max_input_chars)
+    print(f"INFO: Servidor falso da OpenAI ouvindo em {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
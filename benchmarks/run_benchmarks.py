@@ -0,0 +1,300 @@
+# ===== SUÍTE DE BENCHMARKS OFFLINE (SEM GASTAR API) =====
+# Uso: python benchmarks/run_benchmarks.py --sizes 1k 100k 1m --stages pipeline chroma rag dashboard
+#      python benchmarks/run_benchmarks.py --sizes 1k --compare benchmarks/results/antes.json
+# Sobe um servidor local compatível com a OpenAI (fake_openai_server.py), gera
+# datasets sintéticos no formato de data/raw/data.csv e mede cada estágio em um
+# processo novo: vazão, latência (p50/p95/p99) e pico de memória (RSS).
+# Os resultados vão para um JSON (benchmarks/results/) para comparar execuções.
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+STAGES = ["pipeline", "chroma", "rag", "dashboard"]
+
+
+def parse_size(value: str) -> int:
+    """'1k' -> 1000, '100k' -> 100000, '1m' -> 1000000."""
+    value = value.lower().replace("_", "")
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(value[-1], 1)
+    return int(float(value.rstrip("km")) * multiplier)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process, in MB (Linux reports KB)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def latency_stats(samples: list[float]) -> dict | None:
+    import numpy as np
+
+    if not samples:
+        return None
+    ms = np.asarray(samples) * 1000
+    return {"p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95)),
+            "p99_ms": float(np.percentile(ms, 99)), "mean_ms": float(ms.mean()), "n": len(samples)}
+
+
+def start_fake_server(args):
+    from fake_openai_server import FakeOpenAIServer
+
+    return FakeOpenAIServer(latency_ms=args.latency_ms, latency_jitter_ms=args.latency_jitter_ms,
+                            error_rate=args.error_rate, retry_after=args.retry_after, dim=args.dim,
+                            token_latency_ms=args.token_latency_ms).start()
+
+
+# ===== ESTÁGIOS (rodam no processo filho) =====
+
+def stage_pipeline(args, rows: int) -> dict:
+    """run_ai_pipeline contra o servidor falso, em blocos (como o modo --stream)."""
+    from src.analysis.analyzer import run_ai_pipeline, build_async_engine
+    from synthetic import make_raw_dataset
+
+    df_raw = make_raw_dataset(rows, duplicate_rate=args.duplicate_rate)
+    server = start_fake_server(args)
+    baseline_mb = peak_rss_mb()
+    # Um motor para todos os blocos: os limites por minuto valem para a execução inteira
+    async_engine = build_async_engine("fake-key", server.base_url)
+    samples = []
+    start = time.perf_counter()
+    try:
+        for offset in range(0, rows, args.chunk_size):
+            chunk_start = time.perf_counter()
+            run_ai_pipeline(df_raw.iloc[offset:offset + args.chunk_size], "fake-key", cache=None,
+                            base_url=server.base_url, engine="async", async_engine=async_engine)
+            samples.append(time.perf_counter() - chunk_start)
+    finally:
+        server.stop()
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "throughput_rows_s": rows / elapsed,
+            "latency": latency_stats(samples), "latency_unit": f"bloco de {args.chunk_size} linhas",
+            "extra_rss_mb": peak_rss_mb() - baseline_mb, "server": server.stats}
+
+
+def stage_chroma(args, rows: int) -> dict:
+    """initialize_chromadb (coleção em memória) a partir do frame + matriz de embeddings."""
+    from src.database.chroma_manager import initialize_chromadb
+    from synthetic import make_enriched_frame, make_embeddings
+
+    frame = make_enriched_frame(rows)
+    embeddings = make_embeddings(rows, args.dim)
+    baseline_mb = peak_rss_mb()
+    start = time.perf_counter()
+    collection = initialize_chromadb(frame, embeddings)
+    elapsed = time.perf_counter() - start
+    return {"seconds": elapsed, "throughput_rows_s": rows / elapsed, "latency": None,
+            "extra_rss_mb": peak_rss_mb() - baseline_mb, "count": collection.count()}
+
+
+def _rag_questions(n: int) -> list[str]:
+    from synthetic import DJS, BUFFETS
+
+    templates = ["Quais os piores feedbacks do {dj}?", "O que falaram de bom sobre o {buffet}?",
+                 "Como foi a comida do {buffet} no evento {i}?", "Resumo das críticas ao {dj} (pergunta {i})"]
+    return [templates[i % len(templates)].format(dj=DJS[i % len(DJS)].replace("_", " "),
+                                                 buffet=BUFFETS[i % len(BUFFETS)].replace("_", " "), i=i)
+            for i in range(n)]
+
+
+def stage_rag(args, rows: int) -> dict:
+    """ManualRAGBot.ask contra o servidor falso: perguntas novas (frio) e repetidas (cache)."""
+    from src.chatbot.rag_chain import ManualRAGBot
+    from src.chatbot.retrievers import build_retriever
+    from src.chatbot.query_filters import extract_known_values
+    from synthetic import make_enriched_frame, make_embeddings
+
+    frame = make_enriched_frame(rows)
+    embeddings = make_embeddings(rows, args.dim)
+    collection = None
+    if args.rag_backend == "chroma":
+        from src.database.chroma_manager import initialize_chromadb
+        collection = initialize_chromadb(frame, embeddings)
+    retriever = build_retriever(args.rag_backend, collection, frame, embeddings)
+
+    server = start_fake_server(args)
+    baseline_mb = peak_rss_mb()
+    try:
+        bot = ManualRAGBot(collection, retriever=retriever, known_values=extract_known_values(frame),
+                           api_key="fake-key", base_url=server.base_url)
+        questions = _rag_questions(args.queries)
+        runs = {}
+        for phase in ("cold", "warm"):
+            samples, breakdown = [], {"retrieval_ms": [], "generation_ms": []}
+            start = time.perf_counter()
+            for question in questions:
+                timings = {}
+                query_start = time.perf_counter()
+                bot.ask(question, timings)
+                samples.append(time.perf_counter() - query_start)
+                for key in breakdown:
+                    if key in timings:
+                        breakdown[key].append(timings[key] / 1000)
+            runs[phase] = {"seconds": time.perf_counter() - start, "latency": latency_stats(samples),
+                           **{key: latency_stats(values) for key, values in breakdown.items()}}
+    finally:
+        server.stop()
+
+    cold = runs["cold"]
+    return {"seconds": cold["seconds"], "throughput_rows_s": None,
+            "throughput_queries_s": len(questions) / cold["seconds"], "latency": cold["latency"],
+            "latency_unit": "pergunta", "warm": runs["warm"], "cold_breakdown": cold,
+            "extra_rss_mb": peak_rss_mb() - baseline_mb, "backend": args.rag_backend, "server": server.stats}
+
+
+def stage_dashboard(args, rows: int) -> dict:
+    """
+    Pré-cálculo do dashboard (cubo de agregados + índice de palavras-chave) e
+    o caminho de cada rerun (KPIs, tendência, pizza e frequências por fornecedor).
+    """
+    from src.analysis.aggregates import (
+        build_aggregate_cube, list_suppliers, monthly_sentiment_scores, sentiment_counts
+    )
+    from src.analysis.keywords import build_keyword_index, keyword_frequencies
+    from src.analysis.metrics import calculate_kpis
+    from synthetic import make_enriched_frame
+
+    frame = make_enriched_frame(rows)
+    baseline_mb = peak_rss_mb()
+    start = time.perf_counter()
+    cube = build_aggregate_cube(frame)
+    index = build_keyword_index(frame)
+    build_s = time.perf_counter() - start
+
+    suppliers = [("DJ", s) for s in list_suppliers(cube, "DJ")] + [("Buffet", s) for s in list_suppliers(cube, "Buffet")]
+    samples = []
+    for i in range(args.reruns):
+        supplier_type, supplier = suppliers[i % len(suppliers)]
+        rerun_start = time.perf_counter()
+        calculate_kpis(cube)
+        monthly_sentiment_scores(cube, supplier_type)
+        sentiment_counts(cube)
+        sentiment_counts(cube, supplier_type, supplier)
+        keyword_frequencies(index, supplier_type, supplier, None)
+        samples.append(time.perf_counter() - rerun_start)
+
+    return {"seconds": build_s, "throughput_rows_s": rows / build_s, "latency": latency_stats(samples),
+            "latency_unit": "rerun do dashboard", "extra_rss_mb": peak_rss_mb() - baseline_mb,
+            "cube_rows": len(cube), "keyword_index_rows": len(index)}
+
+
+STAGE_FUNCTIONS = {"pipeline": stage_pipeline, "chroma": stage_chroma, "rag": stage_rag, "dashboard": stage_dashboard}
+
+
+# ===== ORQUESTRAÇÃO (processo pai) =====
+
+def run_stage_subprocess(stage: str, rows: int, args) -> dict:
+    command = [sys.executable, os.path.abspath(__file__), "--stage", stage, "--rows", str(rows)]
+    for option in ("dim", "latency_ms", "latency_jitter_ms", "error_rate", "retry_after", "token_latency_ms",
+                   "duplicate_rate", "chunk_size", "queries", "reruns", "rag_backend"):
+        command += [f"--{option.replace('_', '-')}", str(getattr(args, option))]
+    result = subprocess.run(command, cwd=REPO_ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"error": (result.stderr.strip().splitlines() or ["erro desconhecido"])[-1]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_result(result: dict) -> str:
+    if "error" in result:
+        return f"ERRO: {result['error']}"
+    parts = [f"{result['seconds']:.2f}s"]
+    if result.get("throughput_rows_s"):
+        parts.append(f"{result['throughput_rows_s']:,.0f} linhas/s")
+    if result.get("throughput_queries_s"):
+        parts.append(f"{result['throughput_queries_s']:,.1f} perguntas/s")
+    if result.get("latency"):
+        parts.append(f"p50 {result['latency']['p50_ms']:.1f} ms | p99 {result['latency']['p99_ms']:.1f} ms "
+                     f"({result.get('latency_unit', '')})")
+    parts.append(f"pico RSS {result['peak_rss_mb']:,.0f} MB")
+    return " | ".join(parts)
+
+
+def compare(previous_path: str, current: dict):
+    """Imprime a variação de cada métrica em relação a uma execução anterior."""
+    with open(previous_path, 'r') as f:
+        previous = {(r["stage"], r["rows"]): r for r in json.load(f)["results"]}
+    print(f"\n--- Comparação com {previous_path} ---")
+    for result in current["results"]:
+        old = previous.get((result["stage"], result["rows"]))
+        if old is None or "error" in old or "error" in result:
+            continue
+        metrics = [("seconds", result["seconds"], old["seconds"]),
+                   ("peak_rss_mb", result["peak_rss_mb"], old["peak_rss_mb"])]
+        if result.get("latency") and old.get("latency"):
+            metrics += [("p50_ms", result["latency"]["p50_ms"], old["latency"]["p50_ms"]),
+                        ("p99_ms", result["latency"]["p99_ms"], old["latency"]["p99_ms"])]
+        changes = ", ".join(f"{name} {before:,.1f} -> {after:,.1f} ({(after - before) / before * 100:+.0f}%)"
+                            for name, after, before in metrics if before)
+        print(f"{result['stage']:>9} @ {result['rows']:>9,}: {changes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks offline com um servidor local no lugar da OpenAI.")
+    parser.add_argument("--sizes", nargs="+", default=["1k", "100k", "1m"], help="Tamanhos dos datasets (1k, 100k, 1m...).")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--dim", type=int, default=1536, help="Dimensão dos embeddings sintéticos.")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Latência fixa do servidor falso.")
+    parser.add_argument("--latency-jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de respostas HTTP 429.")
+    parser.add_argument("--retry-after", type=float, default=0.1)
+    parser.add_argument("--token-latency-ms", type=float, default=0, help="Atraso entre tokens no streaming.")
+    parser.add_argument("--duplicate-rate", type=float, default=0.0, help="Fração de comentários repetidos.")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Linhas por bloco no estágio pipeline.")
+    parser.add_argument("--queries", type=int, default=50, help="Perguntas no estágio rag.")
+    parser.add_argument("--reruns", type=int, default=200, help="Reruns simulados no estágio dashboard.")
+    parser.add_argument("--rag-backend", choices=["numpy", "chroma"], default="numpy")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: benchmarks/results/<data>.json).")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar.")
+    parser.add_argument("--stage", choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Processo filho: roda um estágio e imprime o resultado em JSON
+    if args.stage:
+        result = STAGE_FUNCTIONS[args.stage](args, args.rows)
+        result["peak_rss_mb"] = peak_rss_mb()
+        print(json.dumps(result))
+        return
+
+    report = {
+        "meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "git_commit": git_commit(),
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "args": {k: v for k, v in vars(args).items() if k not in ("stage", "rows", "output", "compare")}},
+        "results": [],
+    }
+    for size in args.sizes:
+        rows = parse_size(size)
+        for stage in args.stages:
+            print(f"INFO: {stage} com {rows:,} linhas...")
+            result = {"stage": stage, "rows": rows, **run_stage_subprocess(stage, rows, args)}
+            report["results"].append(result)
+            print(f"{stage:>9} @ {rows:>9,}: {format_result(result)}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"INFO: Resultados salvos em {output}")
+
+    if args.compare:
+        compare(args.compare, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# ===== GERADOR DE DADOS SINTÉTICOS =====
+# Datasets no formato de data/raw/data.csv (e da saída enriquecida) para benchmarks.
+import numpy as np
+import pandas as pd
+
+DJS = [f"DJ_{c}" for c in "ABCDEFGH"]
+BUFFETS = [f"Buffet_{c}" for c in "XYZWVU"]
+SENTIMENTS = np.array(["Positivo", "Negativo", "Misto"])
+TOPICS = np.array(["Buffet", "DJ", "Atendimento", "Geral"])
+
+TEMPLATES = {
+    "Positivo": [
+        "O {dj} é sensacional, a pista ficou cheia a noite toda. O {buffet} estava delicioso.",
+        "Tudo perfeito! {buffet} impecável e o {dj} animou todo mundo. Recomendo!",
+        "Adorei o evento, o {dj} foi ótimo e a comida do {buffet} muito saborosa.",
+    ],
+    "Negativo": [
+        "A comida do {buffet} chegou fria e demorou muito. O {dj} atrasou uma hora.",
+        "Péssimo. O {dj} tocou músicas repetitivas e o {buffet} esqueceu as bebidas.",
+        "Horrível, o {buffet} foi um desastre e o {dj} foi rude com os convidados.",
+    ],
+    "Misto": [
+        "O {dj} foi legal, mas o {buffet} estava mediano e a comida morna.",
+        "Buffet {buffet} ok, nada demais. O {dj} animou mas o som estava alto demais.",
+        "O {buffet} foi razoável. O {dj} começou fraco mas melhorou no final.",
+    ],
+}
+
+
+def make_raw_dataset(n_rows: int, seed: int = 42, duplicate_rate: float = 0.0) -> pd.DataFrame:
+    """
+    Generates a synthetic raw dataset with the columns of data/raw/data.csv.
+
+    :param n_rows: number of rows.
+    :param seed: random seed.
+    :param duplicate_rate: fraction of comments reused verbatim from earlier rows.
+    :return: DataFrame (ID_Evento, ID_Fornecedor_DJ, ID_Fornecedor_Buffet, Data_Evento, Comentario_Cliente).
+    """
+    df, _ = _make_raw_with_labels(n_rows, seed, duplicate_rate)
+    return df
+
+
+def _make_raw_with_labels(n_rows: int, seed: int, duplicate_rate: float) -> tuple[pd.DataFrame, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    djs = rng.choice(DJS, n_rows)
+    buffets = rng.choice(BUFFETS, n_rows)
+    sentiments = rng.choice(SENTIMENTS, n_rows, p=[0.5, 0.3, 0.2])
+    dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 730, n_rows), unit="D")
+    template_idx = rng.integers(0, 3, n_rows)
+    suffix = rng.integers(0, 1_000_000, n_rows)
+
+    comments = [
+        f"{TEMPLATES[s][t].format(dj=d.replace('_', ' '), buffet=b.replace('_', ' '))} (#{x})"
+        for s, t, d, b, x in zip(sentiments, template_idx, djs, buffets, suffix)
+    ]
+    if duplicate_rate > 0 and n_rows > 1:
+        dup = np.flatnonzero(rng.random(n_rows) < duplicate_rate)
+        dup = dup[dup > 0]
+        sources = (rng.random(len(dup)) * dup).astype(int)
+        for i, j in zip(dup, sources):
+            comments[i] = comments[j]
+
+    df = pd.DataFrame({
+        "ID_Evento": np.arange(1, n_rows + 1),
+        "ID_Fornecedor_DJ": djs,
+        "ID_Fornecedor_Buffet": buffets,
+        "Data_Evento": dates.strftime("%Y-%m-%d"),
+        "Comentario_Cliente": comments,
+    })
+    return df, sentiments
+
+
+def make_embeddings(n_rows: int, dim: int = 1536, seed: int = 42) -> np.ndarray:
+    """Random unit-norm float32 embedding matrix (n_rows, dim)."""
+    rng = np.random.default_rng(seed)
+    matrix = rng.standard_normal((n_rows, dim), dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix
+
+
+def make_enriched_frame(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Synthetic enriched metadata (raw columns + sentimento + topico), without
+    embeddings. The sentiment matches the template used for each comment.
+    """
+    rng = np.random.default_rng(seed + 1)
+    df, sentiments = _make_raw_with_labels(n_rows, seed, 0.0)
+    df["sentimento"] = sentiments
+    df["topico"] = rng.choice(TOPICS, n_rows)
+    return df
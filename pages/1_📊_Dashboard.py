@@ -1,7 +1,7 @@
 # pages/1_📊_Dashboard.py
 import streamlit as st
-import pandas as pd
-from src.analysis.metrics import calculate_kpis
+from src.analysis.metrics import calculate_kpis, load_live_kpis
+from src.visualization.render_cache import frame_version
 from src.visualization.charts import (
     plot_performance_over_time,
     plot_sentiment_distribution,
@@ -15,36 +15,51 @@ st.set_page_config(page_title="Dashboard", page_icon="📊", layout="wide")
 st.title("📊 Dashboard de Performance")
 
 # --- 1. Guarda de Segurança ---
-if 'data_loaded' not in st.session_state or st.session_state.df_enriched.empty:
+if 'keyword_index' not in st.session_state or st.session_state.aggregates.empty:
     st.error("Os dados não foram carregados. Por favor, vá para a Home Page (app.py) primeiro.")
     st.stop()
 
 # --- 2. Pega os Dados do Cache ---
-df = st.session_state.df_enriched
+# Cubo de contagens por fornecedor/mês/sentimento (KPIs e gráficos)
+cube = st.session_state.aggregates
+# Frequências de palavras-chave por fornecedor/sentimento (nuvem de palavras)
+keyword_index = st.session_state.keyword_index
+# Versão dos dados: chave do cache de gráficos renderizados (compartilhado entre sessões)
+data_version = frame_version(cube, keyword_index)
 
-# --- 3. Renderiza os KPIs (Como antes) ---
-st.subheader("KPIs Gerais")
-kpis = calculate_kpis(df)
-col1, col2, col3 = st.columns(3)
-col1.metric("Total de Feedbacks", kpis["total_feedbacks"])
-col2.metric("Feedbacks Positivos", kpis["count_positivo"])
-col3.metric("Taxa de Positividade", f"{kpis['pct_positivo']:.1f}%")
+# --- 3. Renderiza os KPIs ---
+# Com o pipeline em streaming rodando, os KPIs vêm do estado do acumulador
+# (atualizado a cada bloco) e os cartões se atualizam sozinhos
+@st.fragment(run_every="10s")
+def render_kpis():
+    st.subheader("KPIs Gerais")
+    live_kpis = load_live_kpis()
+    kpis = live_kpis or calculate_kpis(cube)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Total de Feedbacks", kpis["total_feedbacks"])
+    col2.metric("Feedbacks Positivos", kpis["count_positivo"])
+    col3.metric("Taxa de Positividade", f"{kpis['pct_positivo']:.1f}%")
+    if live_kpis is not None:
+        st.caption("Pipeline em andamento: KPIs ao vivo; os gráficos mostram a última execução concluída.")
+
+
+render_kpis()
 
 st.markdown("---")
 
-plot_performance_over_time(df)
+plot_performance_over_time(cube)
 
 st.markdown("---")
 
 # --- 4. LINHA 1: Gráficos de Análise (A SUA MUDANÇA) ---
 # Cria as duas colunas
-plot_sentiment_distribution(df)
+plot_sentiment_distribution(cube, data_version)
 
 st.markdown("---")
 
-plot_semantic_pie_chart(df)
+plot_semantic_pie_chart(cube, data_version)
 
 st.markdown("---")
 
 # --- 5. LINHA 2: Word Cloud (Como você pediu, em 1 coluna) ---
-plot_wordcloud_for_supplier(df)
\ No newline at end of file
+plot_wordcloud_for_supplier(keyword_index, cube, data_version)
\ No newline at end of file
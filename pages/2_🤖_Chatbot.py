@@ -1,5 +1,6 @@
 # pages/2_🤖_Chatbot.py
 import streamlit as st
+from src.database.enriched_store import data_version
 
 # Configuração da página
 st.set_page_config(page_title="Chatbot", page_icon="🤖", layout="wide")
@@ -15,6 +16,9 @@ if 'rag_bot' not in st.session_state:
 # --- 2. Pega o RAG Bot do Cache ---
 # (Note a mudança de nome de 'rag_chain' para 'rag_bot')
 rag_bot = st.session_state.rag_bot
+# Se o pipeline regravou os dados, o cache de respostas do bot é descartado
+if rag_bot is not None:
+    rag_bot.set_data_version(data_version())
 
 # --- 3. Lógica do Histórico do Chat ---
 if "messages" not in st.session_state:
@@ -31,16 +35,27 @@ if user_query := st.chat_input("Ex: Quais os piores feedbacks do DJ C?"):
     with st.chat_message("user"):
         st.markdown(user_query)
 
-    # 4.2. Gera a resposta do RAG (IA)
-    with st.spinner("Analisando feedbacks..."):
+    # 4.2. Gera a resposta do RAG (IA) e mostra os tokens à medida que chegam
+    timings = {}
+    with st.chat_message("assistant"):
         try:
-            resposta_ia = rag_bot.ask(user_query)
+            resposta_ia = st.write_stream(rag_bot.ask_stream(user_query, timings))
 
         except Exception as e:
             resposta_ia = f"Desculpe, ocorreu um erro ao processar sua pergunta: {e}"
-
-    # 4.3. Mostra a resposta da IA na tela
+            st.markdown(resposta_ia)
+
+        if "total_ms" in timings:
+            origem = "cache" if timings["cached"] else "IA"
+            st.caption(
+                f"Recuperação: {timings['retrieval_ms']:.0f} ms · "
+                f"Primeiro token: {timings.get('first_token_ms', 0):.0f} ms · "
+                f"Geração: {timings.get('generation_ms', 0):.0f} ms · "
+                f"Total: {timings['total_ms']:.0f} ms ({origem})"
+                + (f" · Prompt: {timings['prompt_tokens']} tokens "
+                   f"(sem a seleção de contexto: {timings['prompt_tokens_unpacked']})"
+                   if "prompt_tokens" in timings else "")
+            )
+
+    # 4.3. Guarda a resposta completa no histórico
     st.session_state.messages.append({"role": "assistant", "content": resposta_ia})
-    with st.chat_message("assistant"):
-        st.markdown(resposta_ia)
-
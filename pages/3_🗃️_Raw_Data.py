@@ -1,5 +1,6 @@
 # pages/3_🗃️_Raw_Data.py
 import streamlit as st
+from src.database.shared_dataset import SHARED_DATASET
 
 st.set_page_config(page_title="Dados", page_icon="🗃️", layout="wide")
 st.title("🗃️ Dados Enriquecidos (Pós-Análise de IA)")
@@ -9,9 +10,9 @@ if 'data_loaded' not in st.session_state:
     st.error("Os dados não foram carregados. Por favor, vá para a Home Page (app.py) primeiro.")
     st.stop()
 
-# --- Pega os Dados do Cache ---
-df = st.session_state.df_enriched
+# --- Pega os Dados Compartilhados ---
+# (o mesmo frame para todas as sessões; os embeddings ficam na matriz à parte)
+df = SHARED_DATASET.get().frame
 
 st.markdown("Estes são os dados que foram pré-processados pelo pipeline de IA.")
-# Mostra o DataFrame (escondendo a coluna 'embedding' que é muito longa)
-st.dataframe(df.drop(columns=['embedding']))
\ No newline at end of file
+st.dataframe(df)
\ No newline at end of file
@@ -0,0 +1,167 @@
+# pages/4_📈_Operacoes.py
+import datetime
+import os
+import pandas as pd
+import streamlit as st
+from src.monitoring.instrumentation import METRICS, histogram_quantile, load_snapshot, snapshot_to_prometheus
+
+PIPELINE_METRICS_PATH = "data/processed/pipeline_metrics.json"
+
+# Configuração da página
+st.set_page_config(page_title="Operações", page_icon="📈", layout="wide")
+st.title("📈 Operações")
+st.markdown("Latência por estágio, uso da API e caches do pipeline e do chatbot.")
+st.markdown("---")
+
+
+# --- Funções de apoio ---
+def stage_table(snapshot: dict, name: str, label: str) -> pd.DataFrame:
+    """Uma linha por série do histograma: contagem, média, p50 e p95 (em ms)."""
+    rows_total = {c["labels"].get(label): c["value"] for c in snapshot["counters"]
+                  if c["name"] == "stage_rows_total"}
+    rows = []
+    for histogram in snapshot["histograms"]:
+        if histogram["name"] != name or not histogram["count"]:
+            continue
+        key = histogram["labels"].get(label)
+        p50 = histogram_quantile(histogram, snapshot["buckets"], 0.5)
+        p95 = histogram_quantile(histogram, snapshot["buckets"], 0.95)
+        row = {
+            label: key,
+            "Execuções": histogram["count"],
+            "Total (s)": histogram["sum"],
+            "Média (ms)": histogram["sum"] / histogram["count"] * 1000,
+            "p50 (ms)": p50 * 1000,
+            "p95 (ms)": p95 * 1000,
+        }
+        if name == "stage_seconds":
+            row["Linhas"] = rows_total.get(key, 0)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def counter_table(snapshot: dict, names: list[str], index: str) -> pd.DataFrame:
+    """Contadores agrupados pelo rótulo index, uma coluna por contador."""
+    records = [{index: c["labels"].get(index), "métrica": c["name"], "valor": c["value"]}
+               for c in snapshot["counters"] if c["name"] in names]
+    if not records:
+        return pd.DataFrame()
+    return pd.DataFrame(records).pivot_table(index=index, columns="métrica", values="valor",
+                                             aggfunc="sum", fill_value=0)
+
+
+def token_table(snapshot: dict) -> pd.DataFrame:
+    records = [{"endpoint": c["labels"].get("endpoint"), "tipo": c["labels"].get("kind"), "tokens": c["value"]}
+               for c in snapshot["counters"] if c["name"] == "api_tokens_total"]
+    if not records:
+        return pd.DataFrame()
+    return pd.DataFrame(records).pivot_table(index="endpoint", columns="tipo", values="tokens",
+                                             aggfunc="sum", fill_value=0)
+
+
+def prompt_table(snapshot: dict) -> pd.DataFrame:
+    """Tokens por prompt do chatbot com e sem a seleção de contexto."""
+    prompts = sum(c["value"] for c in snapshot["counters"] if c["name"] == "rag_prompts_total")
+    tokens = counter_table(snapshot, ["rag_prompt_tokens_total"], "context")
+    if tokens.empty or not prompts:
+        return pd.DataFrame()
+    table = tokens.rename(columns={"rag_prompt_tokens_total": "tokens"})
+    table["tokens por prompt"] = table["tokens"] / prompts
+    return table
+
+
+def cache_table(snapshot: dict) -> pd.DataFrame:
+    table = counter_table(snapshot, ["cache_hits_total", "cache_misses_total"], "cache")
+    if table.empty:
+        return table
+    for column in ("cache_hits_total", "cache_misses_total"):
+        if column not in table:
+            table[column] = 0
+    total = table["cache_hits_total"] + table["cache_misses_total"]
+    table["taxa de acerto"] = (table["cache_hits_total"] / total.where(total > 0)).fillna(0)
+    return table
+
+
+def show_snapshot(snapshot: dict, key: str):
+    """Mostra as tabelas de um snapshot e o botão de exportação Prometheus."""
+    started = datetime.datetime.fromtimestamp(snapshot["started_at"]).strftime("%d/%m/%Y %H:%M:%S")
+    st.caption(f"Métricas coletadas desde {started}.")
+
+    st.markdown("**Latência por estágio**")
+    stages = stage_table(snapshot, "stage_seconds", "stage")
+    if stages.empty:
+        st.info("Nenhum estágio registrado ainda.")
+    else:
+        st.dataframe(stages.round(1), hide_index=True, width="stretch")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Requisições à API**")
+        api = counter_table(snapshot, ["api_requests_total", "api_retries_total",
+                                       "api_throttled_total", "api_errors_total"], "endpoint")
+        latency = stage_table(snapshot, "api_request_seconds", "endpoint")
+        if api.empty:
+            st.info("Nenhuma requisição registrada.")
+        else:
+            st.dataframe(api, width="stretch")
+        if not latency.empty:
+            st.dataframe(latency.round(1), hide_index=True, width="stretch")
+    with col2:
+        st.markdown("**Tokens (campo usage)**")
+        tokens = token_table(snapshot)
+        if tokens.empty:
+            st.info("Nenhum uso de tokens registrado.")
+        else:
+            st.dataframe(tokens, width="stretch")
+        saved = counter_table(snapshot, ["dedup_saved_total"], "endpoint")
+        if not saved.empty:
+            st.markdown("**Deduplicação (chamadas economizadas)**")
+            st.dataframe(saved, width="stretch")
+        local = counter_table(snapshot, ["local_classifier_total"], "outcome")
+        if not local.empty:
+            st.markdown("**Classificador local**")
+            st.dataframe(local, width="stretch")
+        prompts = prompt_table(snapshot)
+        if not prompts.empty:
+            st.markdown("**Prompt do chatbot (packed = com a seleção de contexto)**")
+            st.dataframe(prompts.round(1), width="stretch")
+            st.dataframe(counter_table(snapshot, ["rag_context_snippets_total"], "outcome"), width="stretch")
+        routes = counter_table(snapshot, ["retrieval_route_total"], "route")
+        if not routes.empty:
+            st.markdown("**Rotas de recuperação do chatbot**")
+            st.dataframe(routes, width="stretch")
+        st.markdown("**Caches**")
+        caches = cache_table(snapshot)
+        if caches.empty:
+            st.info("Nenhum acesso a cache registrado.")
+        else:
+            st.dataframe(caches.style.format({"taxa de acerto": "{:.1%}"}), width="stretch")
+
+    st.download_button("Exportar (formato Prometheus)", snapshot_to_prometheus(snapshot),
+                       file_name=f"vocpulse_{key}.prom", mime="text/plain", key=f"export_{key}")
+
+
+# --- 1. Métricas deste processo (carga do app e chatbot) ---
+st.subheader("App e Chatbot (este servidor)")
+if st.button("Atualizar"):
+    st.rerun()
+show_snapshot(METRICS.snapshot(), "app")
+
+st.markdown("---")
+
+# --- 2. Métricas da última execução do pipeline ---
+# O pipeline grava o snapshot periodicamente durante a execução; a seção se atualiza sozinha
+@st.fragment(run_every="10s")
+def render_pipeline_metrics():
+    st.subheader("Última execução do pipeline")
+    pipeline_snapshot = load_snapshot(PIPELINE_METRICS_PATH)
+    if pipeline_snapshot is None:
+        st.info(f"Nenhuma execução registrada. Rode `python scripts/run_pipeline.py` para gerar "
+                f"{PIPELINE_METRICS_PATH}.")
+        return
+    saved = datetime.datetime.fromtimestamp(os.path.getmtime(PIPELINE_METRICS_PATH)).strftime("%d/%m/%Y %H:%M:%S")
+    st.caption(f"Snapshot gravado em {saved}.")
+    show_snapshot(pipeline_snapshot, "pipeline")
+
+
+render_pipeline_metrics()
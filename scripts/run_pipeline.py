@@ -1,6 +1,7 @@
 # ===== PRÉ-PROCESSAMENTO DE DADOS PARA O APP STREAMLIT ====
 import os
 import sys
+import argparse
 import pandas as pd
 from dotenv import load_dotenv
 
@@ -9,7 +10,19 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # 2. Importa funções da pasta src/
 from src.ingestion.data_loader import load_csv
-from src.analysis.analyzer import run_ai_pipeline
+from src.analysis.analyzer import (
+    run_ai_pipeline, open_enrichment_cache, open_local_classifier, PIPELINE_CONFIG, LOCAL_CLASSIFIER_ENABLED
+)
+from src.analysis.streaming import run_streaming_pipeline, checkpoint_path_for
+from src.analysis.aggregates import build_aggregate_cube, save_aggregates
+from src.analysis.metrics import KPIAccumulator, KPI_STATE_PATH
+from src.analysis.keywords import build_keyword_index, save_keyword_index
+from src.database.enriched_store import (
+    save_enriched, convert_json_to_columnar, remove_columnar, load_frame, load_embeddings,
+    attach_embeddings, publish_json, STORAGE_FORMAT
+)
+from src.database.chroma_manager import sync_chromadb, CHROMA_MODE
+from src.monitoring.instrumentation import METRICS, run_periodically
 
 # 3. Carrega as variáveis de ambiente presentes em .env ou .streamlit/secrets.toml
 load_dotenv(".streamlit/secrets.toml")
@@ -17,8 +30,91 @@ load_dotenv(".streamlit/secrets.toml")
 # 4. Define os caminhos
 INPUT_CSV_PATH = "data/raw/data.csv"
 OUTPUT_JSON_PATH = "data/processed/data_enriched.json"
+# Log retomável do modo --stream: fica fora dos dados lidos pelo app até ser publicado
+STREAM_WORK_PATH = "data/processed/data_enriched.jsonl.partial"
+METRICS_JSON_PATH = "data/processed/pipeline_metrics.json"
+METRICS_PROM_PATH = "data/processed/pipeline_metrics.prom"
+# Segundos entre os snapshots gravados durante a execução (página de Operações ao vivo)
+METRICS_SAVE_INTERVAL = PIPELINE_CONFIG.get('metrics_save_interval_s', 15)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pipeline de enriquecimento de feedbacks com IA.")
+    parser.add_argument(
+        "--seed-cache", action="store_true",
+        help="Popula o cache com o data_enriched.json existente antes de rodar "
+             "(assume que ele foi gerado com o prompt e modelos atuais)."
+    )
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Lê o CSV em blocos e grava cada bloco em um JSONL de trabalho, com checkpoint "
+             "(memória constante; uma nova execução continua de onde parou). A saída é publicada ao final."
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=PIPELINE_CONFIG.get('stream_chunk_size', 1000),
+        help="Linhas por bloco no modo --stream."
+    )
+    parser.add_argument(
+        "--restart", action="store_true",
+        help="No modo --stream, ignora o checkpoint e recomeça do zero."
+    )
+    parser.add_argument(
+        "--sync-chroma", action=argparse.BooleanOptionalAction, default=CHROMA_MODE == "persistent",
+        help="Sincroniza a coleção persistente do ChromaDB com a saída (padrão: ativo no modo 'persistent')."
+    )
+    parser.add_argument(
+        "--local-classifier", action=argparse.BooleanOptionalAction, default=LOCAL_CLASSIFIER_ENABLED,
+        help="Rotula localmente os comentários com previsão confiável e envia só os demais ao LLM "
+             "(requer o modelo de scripts/train_local_classifier.py)."
+    )
+    parser.add_argument(
+        "--format", choices=["columnar", "json", "both"], default=STORAGE_FORMAT,
+        help="Formato de saída: colunar (Parquet + matriz float32 .npy), JSON ou ambos."
+    )
+    return parser.parse_args()
+
+def save_pipeline_metrics(verbose: bool = True):
+    """
+    Grava as métricas da execução (JSON para a página de Operações e texto
+    Prometheus). Chamada periodicamente durante a execução e ao final.
+    """
+    if not METRICS.snapshot()["histograms"]:
+        return  # nada foi executado; mantém o snapshot da última execução
+    METRICS.save(METRICS_JSON_PATH, METRICS_PROM_PATH)
+    if verbose:
+        print(f"INFO: Métricas da execução salvas em {METRICS_JSON_PATH} e {METRICS_PROM_PATH}.")
+
+def finalize_jsonl_output(fmt: str, sync_chroma: bool, kpi_state: bool = False,
+                          source_path: str = OUTPUT_JSON_PATH):
+    """
+    Gera as saídas derivadas a partir do JSONL completo (modos --stream e em shards):
+    formato colunar, cubo de agregados, índice de palavras-chave e, opcionalmente,
+    o estado dos KPIs e a coleção persistente do ChromaDB.
+
+    :param source_path: JSONL completo; se for o arquivo de trabalho do streaming,
+                        é publicado (atomicamente) como o JSON de saída.
+    """
+    if source_path != OUTPUT_JSON_PATH:
+        publish_json(source_path, OUTPUT_JSON_PATH)
+    # O formato colunar é gerado ao final, a partir do JSONL publicado
+    if fmt in ("columnar", "both"):
+        convert_json_to_columnar(OUTPUT_JSON_PATH)
+    else:
+        remove_columnar()
+    # Cubo de agregados e índice de palavras-chave do dashboard
+    df_frame = load_frame(json_path=OUTPUT_JSON_PATH)
+    # Estado exato dos KPIs antes do cubo: o dashboard deixa de mostrar os KPIs "ao vivo"
+    if kpi_state:
+        KPIAccumulator.from_frame(df_frame).save(KPI_STATE_PATH)
+    save_aggregates(build_aggregate_cube(df_frame))
+    save_keyword_index(build_keyword_index(df_frame))
+    del df_frame
+    if sync_chroma:
+        embeddings = load_embeddings(json_path=OUTPUT_JSON_PATH)
+        sync_chromadb(attach_embeddings(load_frame(json_path=OUTPUT_JSON_PATH), embeddings),
+                      embeddings=embeddings)
 
 def main():
+    args = parse_args()
     print("--- INICIANDO PIPELINE DE PRÉ-PROCESSAMENTO ---")
 
     # 1. Pega a chave de API
@@ -28,28 +124,68 @@ def main():
         print("Verifique se a chave está presente em .streamlit/secrets.toml")
         return
 
-    # 2. Carrega os dados brutos
+    # 2. Abre o cache de enriquecimento (só o que mudou vai para a API)
+    cache = open_enrichment_cache()
+    if cache and args.seed_cache and os.path.exists(OUTPUT_JSON_PATH):
+        df_previous = pd.read_json(OUTPUT_JSON_PATH, lines=True)
+        cache.seed_from_records(df_previous.to_dict('records'))
+
+    # 2.1. Classificador local (triagem antes do LLM)
+    local_classifier = open_local_classifier() if args.local_classifier else None
+
+    # 2.2. Modo streaming: blocos, saída incremental e checkpoint
+    if args.stream:
+        run_streaming_pipeline(INPUT_CSV_PATH, STREAM_WORK_PATH, api_key, args.chunk_size,
+                               cache=cache, restart=args.restart, kpi_state_path=KPI_STATE_PATH,
+                               local_classifier=local_classifier)
+        finalize_jsonl_output(args.format, args.sync_chroma, kpi_state=True, source_path=STREAM_WORK_PATH)
+        if cache:
+            print(f"INFO: {cache.report()}")
+            cache.close()
+        return
+
+    # 3. Carrega os dados brutos
     df_raw= load_csv(INPUT_CSV_PATH)
     if df_raw.empty:
         print("Pipeline interrompido.")
         return
 
-    # 3. Roda o motor de IA
+    # 4. Roda o motor de IA
     print(f"Iniciando análise de IA para {len(df_raw)} linhas...")
-    df_enriched = run_ai_pipeline(df_raw, api_key)
+    df_enriched = run_ai_pipeline(df_raw, api_key, cache=cache, local_classifier=local_classifier)
     print("Análise de IA concluída.")
+    if cache:
+        print(f"INFO: {cache.report()}")
+        cache.close()
 
-    # 4. Salva os resultados enriquecidos
+    # 5. Salva os resultados enriquecidos
     try:
-        os.makedirs("data/processed", exist_ok=True)
-        df_enriched.to_json(OUTPUT_JSON_PATH, orient='records', lines=True)
-        print(f"SUCESSO! Dados enriquecidos salvos em: {OUTPUT_JSON_PATH}")
+        with METRICS.timer(stage="storage"):
+            save_enriched(df_enriched, args.format, json_path=OUTPUT_JSON_PATH)
+            # Estado dos KPIs incrementais (antes do cubo, que passa a ser a fonte do dashboard)
+            KPIAccumulator.from_frame(df_enriched).save(KPI_STATE_PATH)
+            save_aggregates(build_aggregate_cube(df_enriched))
+            save_keyword_index(build_keyword_index(df_enriched))
+        # Um checkpoint antigo do modo --stream não vale para a saída nova
+        for path in (checkpoint_path_for(STREAM_WORK_PATH), STREAM_WORK_PATH):
+            if os.path.exists(path):
+                os.remove(path)
+        print(f"SUCESSO! Dados enriquecidos salvos (formato: {args.format}).")
         print("\nVisualização das 5 primeiras linhas:")
         print(df_enriched.drop(columns=['embedding']).head())
     except Exception as e:
-        print(f"ERRO ao salvar arquivo JSON: {e}")
+        print(f"ERRO ao salvar os dados enriquecidos: {e}")
+        return
+
+    # 6. Atualiza a coleção persistente (apenas linhas novas/alteradas/removidas)
+    if args.sync_chroma:
+        sync_chromadb(df_enriched)
 
 if __name__ == "__main__":
-    main()
+    try:
+        with run_periodically(lambda: save_pipeline_metrics(verbose=False), METRICS_SAVE_INTERVAL):
+            main()
+    finally:
+        save_pipeline_metrics()
 
 
@@ -0,0 +1,234 @@
+# ===== PIPELINE EM SHARDS (VÁRIOS PROCESSOS) =====
+# Uso:
+#   python scripts/run_sharded.py run --shards 8 [--parallel 4] [--api-key-envs OPENAI_API_KEY_A OPENAI_API_KEY_B]
+#   python scripts/run_sharded.py status
+#   python scripts/run_sharded.py worker --shard 3      (ex.: em outra máquina, com o mesmo --shards-dir)
+#   python scripts/run_sharded.py merge
+# O CSV é dividido por hash do ID_Evento; cada shard roda em um processo próprio
+# (com checkpoint, log e arquivo parcial próprios) e o merge reconstrói a saída
+# na ordem original. Rodar "run" de novo só refaz os shards que não terminaram.
+import os
+import sys
+import argparse
+import math
+import subprocess
+import time
+
+# 1. Habilita encontrar e importar módulos da pasta src/ (e o run_pipeline.py)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.analysis.analyzer import open_enrichment_cache, open_local_classifier, PIPELINE_CONFIG, \
+    LOCAL_CLASSIFIER_ENABLED
+from src.analysis.sharding import (
+    split_csv, read_manifest, manifest_matches, run_shard, shard_status, merge_parts, log_path,
+    metrics_path, shard_metrics
+)
+from src.database.enriched_store import STORAGE_FORMAT
+from src.database.chroma_manager import CHROMA_MODE
+from src.monitoring.instrumentation import METRICS, load_snapshot, merge_snapshots, save_snapshot, run_periodically
+from run_pipeline import finalize_jsonl_output, INPUT_CSV_PATH, OUTPUT_JSON_PATH, METRICS_JSON_PATH, \
+    METRICS_PROM_PATH, METRICS_SAVE_INTERVAL
+
+SHARDS_DIR = "data/shards"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pipeline de enriquecimento dividido em shards.")
+    parser.add_argument("--shards-dir", default=SHARDS_DIR)
+    parser.add_argument("--chunk-size", type=int, default=PIPELINE_CONFIG.get('stream_chunk_size', 1000),
+                        help="Linhas por bloco dentro de cada shard.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Divide o CSV (se preciso), roda os shards pendentes e faz o merge.")
+    run.add_argument("--shards", type=int, required=True, help="Número de shards.")
+    run.add_argument("--parallel", type=int, help="Processos simultâneos (padrão: um por shard).")
+    run.add_argument("--retries", type=int, default=2, help="Novas tentativas por shard que falhar.")
+    run.add_argument("--api-key-envs", nargs="+", default=["OPENAI_API_KEY"],
+                     help="Variáveis de ambiente com as chaves de API; os shards são distribuídos entre elas "
+                          "e o limite de taxa de cada chave é dividido entre os processos que a usam.")
+    run.add_argument("--resplit", action="store_true", help="Divide o CSV de novo, descartando o progresso.")
+    run.add_argument("--progress-interval", type=float, default=10.0, help="Segundos entre relatórios.")
+    run.add_argument("--local-classifier", action=argparse.BooleanOptionalAction, default=LOCAL_CLASSIFIER_ENABLED)
+    _add_output_args(run)
+
+    worker = commands.add_parser("worker", help="Enriquece um único shard.")
+    worker.add_argument("--shard", type=int, required=True)
+    worker.add_argument("--api-key-env", default="OPENAI_API_KEY")
+    worker.add_argument("--rate-share", type=float, default=1.0,
+                        help="Fração do limite de requisições/tokens por minuto usada por este processo.")
+    worker.add_argument("--local-classifier", action=argparse.BooleanOptionalAction,
+                        default=LOCAL_CLASSIFIER_ENABLED)
+
+    commands.add_parser("status", help="Mostra o progresso de cada shard.")
+
+    merge = commands.add_parser("merge", help="Junta os shards concluídos na saída final.")
+    _add_output_args(merge)
+    return parser.parse_args()
+
+
+def _add_output_args(parser):
+    parser.add_argument("--format", choices=["columnar", "json", "both"], default=STORAGE_FORMAT)
+    parser.add_argument("--sync-chroma", action=argparse.BooleanOptionalAction, default=CHROMA_MODE == "persistent")
+
+
+def print_status(shards_dir: str, running: dict | None = None, failed=()):
+    status = shard_status(shards_dir)
+    total = sum(s["rows"] for s in status)
+    done = sum(s["rows_done"] for s in status)
+    print(f"INFO: Progresso: {done}/{total} linhas ({done / total if total else 1:.0%})")
+    for s in status:
+        if s["done"]:
+            state = "concluído"
+        elif s["shard"] in failed:
+            state = f"FALHOU (log: {log_path(shards_dir, s['shard'])})"
+        elif running and s["shard"] in running:
+            state = "rodando"
+        else:
+            state = "pendente"
+        percent = s["rows_done"] / s["rows"] if s["rows"] else 1
+        print(f"    shard {s['shard']:03d}: {s['rows_done']:>9}/{s['rows']:<9} {percent:>5.0%}  {state}")
+
+
+def save_combined_metrics(shards_dir: str, verbose: bool = False):
+    """
+    Soma as métricas salvas pelos workers (e as deste processo: merge e saídas
+    derivadas) no snapshot lido pela página de Operações.
+    """
+    snapshots = shard_metrics(shards_dir)
+    if METRICS.snapshot()["histograms"]:
+        snapshots.append(METRICS.snapshot())
+    if not snapshots:
+        return
+    save_snapshot(merge_snapshots(snapshots), METRICS_JSON_PATH, METRICS_PROM_PATH)
+    if verbose:
+        print(f"INFO: Métricas de {len(snapshots)} processos salvas em {METRICS_JSON_PATH} e {METRICS_PROM_PATH}.")
+
+
+def merge_and_finalize(args):
+    try:
+        merge_parts(args.shards_dir, OUTPUT_JSON_PATH)
+        finalize_jsonl_output(args.format, args.sync_chroma, kpi_state=True)
+        print(f"SUCESSO! Dados enriquecidos salvos (formato: {args.format}).")
+    finally:
+        save_combined_metrics(args.shards_dir, verbose=True)
+
+
+def run_worker(args):
+    api_key = os.getenv(args.api_key_env)
+    if not api_key:
+        print(f"ERRO CRÍTICO: {args.api_key_env} não encontrada.")
+        sys.exit(1)
+    cache = open_enrichment_cache()
+    local_classifier = open_local_classifier() if args.local_classifier else None
+    # Métricas do shard, somadas às das tentativas anteriores dele (o coordenador junta todos os shards)
+    path = metrics_path(args.shards_dir, args.shard)
+    previous = load_snapshot(path)
+
+    def save_metrics():
+        save_snapshot(merge_snapshots([METRICS.snapshot()] + ([previous] if previous else [])), path)
+
+    try:
+        with run_periodically(save_metrics, METRICS_SAVE_INTERVAL):
+            run_shard(args.shards_dir, args.shard, api_key, args.chunk_size, cache=cache,
+                      local_classifier=local_classifier, rate_share=args.rate_share)
+    finally:
+        save_metrics()
+        if cache:
+            print(f"INFO: {cache.report()}")
+            cache.close()
+
+
+def launch_worker(args, shard: int, api_key_env: str, rate_share: float) -> subprocess.Popen:
+    """Starts one worker process, appending its output to the shard log."""
+    command = [sys.executable, os.path.abspath(__file__), "--shards-dir", args.shards_dir,
+               "--chunk-size", str(args.chunk_size), "worker", "--shard", str(shard),
+               "--api-key-env", api_key_env, "--rate-share", str(rate_share),
+               "--local-classifier" if args.local_classifier else "--no-local-classifier"]
+    with open(log_path(args.shards_dir, shard), 'a') as log:
+        return subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT)
+
+
+def run_all(args):
+    # 1. Divide o CSV, a não ser que os shards atuais sejam deste mesmo arquivo
+    manifest = read_manifest(args.shards_dir)
+    if args.resplit or not manifest_matches(manifest, INPUT_CSV_PATH, args.shards):
+        split_csv(INPUT_CSV_PATH, args.shards_dir, args.shards)
+    else:
+        print("INFO: Reaproveitando os shards existentes (só os pendentes serão processados).")
+
+    missing = [name for name in args.api_key_envs if not os.getenv(name)]
+    if missing:
+        print(f"ERRO CRÍTICO: Chaves de API não encontradas: {', '.join(missing)}")
+        return 1
+
+    # 2. Roda os shards pendentes, no máximo `parallel` ao mesmo tempo
+    queue = [s["shard"] for s in shard_status(args.shards_dir) if not s["done"]]
+    parallel = max(1, min(args.parallel or len(queue) or 1, len(queue) or 1))
+    # Cada processo novo vai para a chave com menos processos rodando, então nenhuma
+    # chave passa de ceil(parallel / chaves) processos e cada um usa essa fração do limite
+    rate_share = 1 / math.ceil(parallel / len(args.api_key_envs))
+    attempts, running, failed = {shard: 0 for shard in queue}, {}, []
+    key_of = {}  # shard rodando -> variável da chave de API
+    last_report = 0.0
+    print(f"INFO: {len(queue)} shards pendentes, {parallel} processos simultâneos.")
+
+    while queue or running:
+        while queue and len(running) < parallel:
+            shard = queue.pop(0)
+            load = {name: 0 for name in args.api_key_envs}
+            for name in key_of.values():
+                load[name] += 1
+            api_key_env = min(args.api_key_envs, key=load.get)
+            key_of[shard] = api_key_env
+            running[shard] = launch_worker(args, shard, api_key_env, rate_share)
+            attempts[shard] += 1
+
+        for shard, process in list(running.items()):
+            code = process.poll()
+            if code is None:
+                continue
+            del running[shard], key_of[shard]
+            if code == 0:
+                print(f"INFO: Shard {shard} concluído.")
+            elif attempts[shard] <= args.retries:
+                print(f"AVISO: Shard {shard} falhou (código {code}); nova tentativa "
+                      f"{attempts[shard]}/{args.retries} a partir do checkpoint.")
+                queue.append(shard)
+            else:
+                print(f"ERRO: Shard {shard} falhou {attempts[shard]} vezes. Veja {log_path(args.shards_dir, shard)}")
+                failed.append(shard)
+
+        if time.monotonic() - last_report >= args.progress_interval:
+            print_status(args.shards_dir, running, failed)
+            save_combined_metrics(args.shards_dir)
+            last_report = time.monotonic()
+        time.sleep(0.5)
+
+    print_status(args.shards_dir, failed=failed)
+    if failed:
+        print("ERRO: Merge não realizado. Rode o comando de novo para refazer só os shards que falharam.")
+        return 1
+
+    # 3. Junta as partes na ordem original e gera as saídas derivadas
+    merge_and_finalize(args)
+    return 0
+
+
+def main():
+    args = parse_args()
+    if args.command == "worker":
+        run_worker(args)
+    elif args.command == "status":
+        if read_manifest(args.shards_dir) is None:
+            print(f"INFO: Nenhum shard em {args.shards_dir}.")
+        else:
+            print_status(args.shards_dir)
+    elif args.command == "merge":
+        merge_and_finalize(args)
+    else:
+        sys.exit(run_all(args))
+
+
+if __name__ == "__main__":
+    main()
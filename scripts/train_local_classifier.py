@@ -0,0 +1,65 @@
+# ===== TREINO DO CLASSIFICADOR LOCAL =====
+# Uso: python scripts/train_local_classifier.py [--test-size 0.2] [--thresholds 0.8 0.9 0.95]
+# Treina o classificador local com as linhas já rotuladas pelo LLM, mede a
+# concordância com o LLM em uma amostra separada e salva o modelo (treinado
+# com todas as linhas) no caminho configurado em pipeline.local_classifier.
+import os
+import sys
+import argparse
+import json
+
+# 1. Habilita encontrar e importar módulos da pasta src/
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.analysis.analyzer import LOCAL_CLASSIFIER_CONFIG, LOCAL_CLASSIFIER_PATH, LOCAL_CLASSIFIER_THRESHOLD
+from src.analysis.local_classifier import (
+    LocalClassifier, training_rows, agreement_report, format_agreement_report
+)
+from src.database.enriched_store import load_frame
+
+INPUT_JSON_PATH = "data/processed/data_enriched.json"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Treina o classificador local (TF-IDF + regressão logística).")
+    parser.add_argument("--test-size", type=float, default=0.2,
+                        help="Fração das linhas reservada para medir a concordância com o LLM.")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.5, 0.7, 0.8, 0.9, 0.95],
+                        help="Limiares de confiança avaliados no relatório.")
+    parser.add_argument("--min-topic-support", type=int,
+                        default=LOCAL_CLASSIFIER_CONFIG.get('min_topic_support', 5))
+    parser.add_argument("--model-path", default=LOCAL_CLASSIFIER_PATH)
+    parser.add_argument("--report", help="Arquivo JSON para salvar o relatório de concordância.")
+    return parser.parse_args()
+
+
+def main():
+    from sklearn.model_selection import train_test_split
+
+    args = parse_args()
+    rows = training_rows(load_frame(json_path=INPUT_JSON_PATH))
+    print(f"INFO: {len(rows)} comentários rotulados pelo LLM disponíveis para treino.")
+    if rows['sentimento'].nunique() < 2:
+        print("ERRO: São necessários pelo menos dois sentimentos distintos para treinar.")
+        return
+
+    # 1. Concordância com o LLM em linhas não vistas no treino
+    train, test = train_test_split(rows, test_size=args.test_size, random_state=42)
+    classifier = LocalClassifier(LOCAL_CLASSIFIER_THRESHOLD, args.min_topic_support)
+    classifier.fit(train['text'], train['sentimento'], train['topico'])
+    report = agreement_report(classifier, test['text'], test['sentimento'], test['topico'], args.thresholds)
+    print(format_agreement_report(report))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"INFO: Relatório salvo em {args.report}")
+
+    # 2. Modelo final com todas as linhas
+    classifier.fit(rows['text'], rows['sentimento'], rows['topico'])
+    classifier.save(args.model_path)
+    print(f"SUCESSO! Modelo local salvo em {args.model_path} "
+          f"(limiar de confiança: {classifier.confidence_threshold}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# === CUBO DE AGREGADOS PARA O DASHBOARD ===
+# Contagens de feedbacks por tipo de fornecedor, fornecedor, mês e sentimento.
+# Gerado pelo pipeline; KPIs e gráficos leem só daqui (tamanho independente
+# do número de feedbacks).
+import os
+import pandas as pd
+
+AGGREGATES_PATH = "data/processed/data_enriched_aggregates.parquet"
+SUPPLIER_COLUMNS = {"DJ": "ID_Fornecedor_DJ", "Buffet": "ID_Fornecedor_Buffet"}
+CUBE_COLUMNS = ["supplier_type", "supplier", "month", "sentimento", "count"]
+SCORE_MAP = {'Positivo': 1, "Misto": 0, "Negativo": -1}
+
+
+def build_aggregate_cube(df_enriched: pd.DataFrame) -> pd.DataFrame:
+    """
+    Counts feedbacks by supplier type, supplier, month and sentiment.
+    Every feedback is counted once per supplier type.
+    :param df_enriched: Enriched DataFrame (embeddings are not needed).
+    :return: DataFrame with columns supplier_type, supplier, month, sentimento, count.
+    """
+    if df_enriched.empty:
+        return pd.DataFrame(columns=CUBE_COLUMNS)
+
+    month = pd.to_datetime(df_enriched['Data_Evento'], errors='coerce').dt.to_period('M').dt.to_timestamp()
+    parts = []
+    for supplier_type, col_name in SUPPLIER_COLUMNS.items():
+        if col_name not in df_enriched.columns:
+            continue
+        counts = pd.DataFrame({
+            "supplier": df_enriched[col_name],
+            "month": month,
+            "sentimento": df_enriched['sentimento'],
+        }).groupby(["supplier", "month", "sentimento"], dropna=False).size().reset_index(name="count")
+        counts.insert(0, "supplier_type", supplier_type)
+        parts.append(counts)
+    return pd.concat(parts, ignore_index=True)[CUBE_COLUMNS]
+
+
+def save_aggregates(cube: pd.DataFrame, path: str = AGGREGATES_PATH):
+    """
+    Saves the aggregate cube as Parquet (atomic rename).
+    :param cube: Output of build_aggregate_cube.
+    :param path: Destination file.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    cube.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    print(f"INFO: Cubo de agregados salvo em {path} ({len(cube)} linhas).")
+
+
+def load_aggregates(path: str = AGGREGATES_PATH) -> pd.DataFrame:
+    """
+    Loads the aggregate cube written by the pipeline.
+    :raises FileNotFoundError: if the pipeline has not produced it yet.
+    """
+    return pd.read_parquet(path)
+
+
+def _default_supplier_type(cube: pd.DataFrame) -> str | None:
+    # Cada feedback aparece uma vez por tipo: qualquer tipo serve para os totais
+    return cube['supplier_type'].iloc[0] if not cube.empty else None
+
+
+def sentiment_counts(cube: pd.DataFrame, supplier_type: str | None = None,
+                     supplier: str | None = None) -> pd.Series:
+    """
+    Feedback count per sentiment, largest first (like value_counts).
+    :param cube: Aggregate cube.
+    :param supplier_type: "DJ" or "Buffet" (required when supplier is given).
+    :param supplier: Optional supplier ID.
+    :return: Series indexed by sentiment.
+    """
+    supplier_type = supplier_type or _default_supplier_type(cube)
+    rows = cube[cube['supplier_type'] == supplier_type]
+    if supplier is not None:
+        rows = rows[rows['supplier'] == supplier]
+    counts = rows.groupby('sentimento', dropna=False)['count'].sum()
+    return counts[counts > 0].sort_values(ascending=False)
+
+
+def list_suppliers(cube: pd.DataFrame, supplier_type: str) -> list:
+    """
+    Suppliers of one type present in the cube.
+    :param cube: Aggregate cube.
+    :param supplier_type: "DJ" or "Buffet".
+    """
+    return sorted(cube.loc[cube['supplier_type'] == supplier_type, 'supplier'].dropna().unique())
+
+
+def monthly_sentiment_scores(cube: pd.DataFrame, supplier_type: str) -> pd.DataFrame:
+    """
+    Mean sentiment score (Positivo=1, Misto=0, Negativo=-1) per supplier and
+    month, weighted by the counts. Other sentiments (Erro/Falha) are ignored.
+    :param cube: Aggregate cube.
+    :param supplier_type: "DJ" or "Buffet".
+    :return: DataFrame with columns month, supplier, score_medio.
+    """
+    rows = cube[(cube['supplier_type'] == supplier_type) & cube['sentimento'].isin(SCORE_MAP.keys())]
+    rows = rows.dropna(subset=['month', 'supplier'])
+    weighted = rows.assign(score=rows['sentimento'].map(SCORE_MAP) * rows['count'])
+    trend = weighted.groupby(['month', 'supplier'])[['score', 'count']].sum().reset_index()
+    trend['score_medio'] = trend['score'] / trend['count']
+    return trend[['month', 'supplier', 'score_medio']]
@@ -1,18 +1,84 @@
 import pandas as pd
 from openai import OpenAI
+import asyncio
 import json
-import yaml
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.analysis.cache import EnrichmentCache
+from src.analysis.batching import build_embedding_batches
+from src.analysis.async_engine import AsyncEnrichmentEngine, SPLITTABLE_ERRORS
+from src.analysis.local_classifier import LocalClassifier, ORIGIN_COLUMN
+from src.analysis.dedup import deduplicate
+from src.config import load_config, load_prompts
+from src.monitoring.instrumentation import METRICS
 
 # ===== IMPORTA O PROMPT =====
 try:
-    with open("config/prompts.yaml", 'r') as f:
-        prompts = yaml.safe_load(f)
-        ANALYSIS_PROMPT = prompts['analysis_prompt']
+    ANALYSIS_PROMPT = load_prompts()['analysis_prompt']
 except FileNotFoundError:
     print("ERRO: 'config/prompts.yaml' não encontrado.")
     ANALYSIS_PROMPT = ""
 
+# ===== IMPORTA AS CONFIGURAÇÕES =====
+try:
+    config = load_config()
+    CHAT_MODEL = config['openai']['chat_model']
+    EMBEDDING_MODEL = config['openai']['embedding_model']
+    PIPELINE_CONFIG = config.get('pipeline', {})
+    CACHE_CONFIG = config.get('cache', {})
+except FileNotFoundError:
+    print("ERRO: 'config/config.yaml' não encontrado.")
+    CHAT_MODEL = "gpt-3.5-turbo-1106"
+    EMBEDDING_MODEL = "text-embedding-3-small"
+    PIPELINE_CONFIG = {}
+    CACHE_CONFIG = {}
+
+ANALYSIS_WORKERS = PIPELINE_CONFIG.get('analysis_workers', 10)
+EMBEDDING_BATCH_SIZE = PIPELINE_CONFIG.get('embedding_batch_size', 1000)
+EMBEDDING_MAX_TOKENS_PER_BATCH = PIPELINE_CONFIG.get('embedding_max_tokens_per_batch', 250000)
+PIPELINE_ENGINE = PIPELINE_CONFIG.get('engine', "async")
+CACHE_ENABLED = CACHE_CONFIG.get('enabled', True)
+CACHE_PATH = CACHE_CONFIG.get('path', "data/cache/enrichment_cache.sqlite")
+DEDUP_CONFIG = PIPELINE_CONFIG.get('dedup', {})
+DEDUP_ENABLED = DEDUP_CONFIG.get('enabled', True)
+DEDUP_THRESHOLD = DEDUP_CONFIG.get('near_duplicate_threshold', 0.9)
+DEDUP_NUM_PERM = DEDUP_CONFIG.get('num_perm', 128)
+DEDUP_BANDS = DEDUP_CONFIG.get('bands', 16)
+LOCAL_CLASSIFIER_CONFIG = PIPELINE_CONFIG.get('local_classifier', {})
+LOCAL_CLASSIFIER_ENABLED = LOCAL_CLASSIFIER_CONFIG.get('enabled', False)
+LOCAL_CLASSIFIER_PATH = LOCAL_CLASSIFIER_CONFIG.get('path', "data/models/local_classifier.joblib")
+LOCAL_CLASSIFIER_THRESHOLD = LOCAL_CLASSIFIER_CONFIG.get('confidence_threshold', 0.9)
+
+
+# ===== ABRE O CACHE DE ENRIQUECIMENTO =====
+def open_enrichment_cache(path: str = CACHE_PATH) -> EnrichmentCache | None:
+    """
+    Opens the persistent enrichment cache keyed by the current analysis
+    prompt and model names, or returns None if the cache is disabled.
+
+    :param path: SQLite file path.
+    :return: EnrichmentCache instance or None.
+    """
+    if not CACHE_ENABLED:
+        return None
+    return EnrichmentCache(path, ANALYSIS_PROMPT, CHAT_MODEL, EMBEDDING_MODEL)
+
+
+# ===== CARREGA O CLASSIFICADOR LOCAL =====
+def open_local_classifier(path: str = LOCAL_CLASSIFIER_PATH) -> LocalClassifier | None:
+    """
+    Loads the trained local classifier with the threshold from config.yaml,
+    or returns None (with a warning) if no model was trained yet.
+
+    :param path: model file.
+    :return: LocalClassifier instance or None.
+    """
+    classifier = LocalClassifier.load(path, LOCAL_CLASSIFIER_THRESHOLD)
+    if classifier is None:
+        print(f"AVISO: Modelo local '{path}' não encontrado. Todos os comentários irão para o LLM. "
+              f"Treine-o com scripts/train_local_classifier.py.")
+    return classifier
+
+
 # ===== CRIA A CLASSE AI ANALYZER =====
 class AIAnalyzer:
     """Encapsules the OpenAI AI analysis and embedding generation logics."""
@@ -26,85 +92,310 @@ class AIAnalyzer:
         """
         self.client = OpenAI(api_key=api_key)
 
-    # Analisa e gera embeddings via API da OpenAI
-    def get_analysis_and_embedding(self, text_review:str) -> dict:
+    # Analisa o sentimento e o tópico via API da OpenAI
+    def get_analysis(self, text_review:str) -> dict:
         """
-        Executes two API calls for one text_review:
-        1. Sentiment and topic analysis via the ChatCompletion endpoint.
-        2. Embedding generation.
+        Executes the sentiment and topic analysis via the ChatCompletion endpoint.
 
         :param text_review:
-        :return dictionary with three results: sentiment, topic, embedding:
+        :return dictionary with two results: sentiment, topic:
         """
         analysis_result = {"sentimento": "Erro", "topico": "Erro"}
-        embedding_result = []
-
-        # --- 1. Chamada de Análise (Sentimento/Tópico) ---
         try:
-            response_analysis = self.client.chat.completions.create(
-                model="gpt-3.5-turbo-1106",
-                response_format = {"type": "json_object"},
-                messages = [
-                    {"role": "system", "content": ANALYSIS_PROMPT},
-                    {"role": "user", "content": text_review}
-            ]
-            )
+            METRICS.inc("api_requests_total", endpoint="chat")
+            with METRICS.timer("api_request_seconds", endpoint="chat"):
+                response_analysis = self.client.chat.completions.create(
+                    model=CHAT_MODEL,
+                    response_format = {"type": "json_object"},
+                    messages = [
+                        {"role": "system", "content": ANALYSIS_PROMPT},
+                        {"role": "user", "content": text_review}
+                ]
+                )
+            METRICS.record_usage(response_analysis.usage, "chat")
             # Extrai o conteúdo JSON da resposta
             analysis_result = json.loads(response_analysis.choices[0].message.content)
         except Exception as e:
+            METRICS.inc("api_errors_total", endpoint="chat")
             # Imprime o erro sem parar a execução
             print(f"Erro na ANÁLISE para: {text_review[:30]}... | Erro: {e}")
 
-        # --- 2. Chamada de Embedding ---
-        try:
-            response_embedding = self.client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text_review
-            )
-            embedding_result = response_embedding.data[0].embedding
-        except Exception as e:
-            print(f"Erro na GERAÇÃO DE EMBEDDING para: {text_review[:30]}... | Erro: {e}")
-
-        # --- 3. Retorno Combinado ----
         return {
             "sentimento": analysis_result.get("sentimento", "Erro"),
             "topico": analysis_result.get("topico", "Erro"),
-            "embedding": embedding_result
         }
 
-# ===== CRIA O PIPELINE DE IA =====
-def run_ai_pipeline(df: pd.DataFrame, api_key:str) -> pd.DataFrame:
+    # Gera embeddings para vários textos em uma única chamada
+    def get_embeddings(self, text_reviews:list[str]) -> list[list[float]]:
+        """
+        Generates the embeddings of several texts with a single multi-input
+        request. Vectors are mapped back to the inputs by their index.
+
+        :param text_reviews: texts to be embedded.
+        :return: list of embeddings, in the same order as text_reviews
+                 (empty lists when the request fails; when the API rejects
+                 an input, the batch is split in halves until only that
+                 input is left without an embedding).
+        """
+        embeddings = [[] for _ in text_reviews]
+        try:
+            METRICS.inc("api_requests_total", endpoint="embeddings")
+            with METRICS.timer("api_request_seconds", endpoint="embeddings"):
+                response_embedding = self.client.embeddings.create(
+                    model=EMBEDDING_MODEL,
+                    input=text_reviews
+                )
+            METRICS.record_usage(response_embedding.usage, "embeddings")
+            for item in response_embedding.data:
+                embeddings[item.index] = item.embedding
+        except SPLITTABLE_ERRORS as e:
+            METRICS.inc("api_errors_total", endpoint="embeddings")
+            if len(text_reviews) > 1:
+                middle = len(text_reviews) // 2
+                return self.get_embeddings(text_reviews[:middle]) + self.get_embeddings(text_reviews[middle:])
+            print(f"Erro na GERAÇÃO DE EMBEDDING para: {text_reviews[0][:30]}... | Erro: {e}")
+        except Exception as e:
+            METRICS.inc("api_errors_total", endpoint="embeddings")
+            print(f"Erro na GERAÇÃO DE EMBEDDING para lote de {len(text_reviews)} textos | Erro: {e}")
+        return embeddings
+
+    # Analisa e gera embeddings via API da OpenAI
+    def get_analysis_and_embedding(self, text_review:str) -> dict:
+        """
+        Executes two API calls for one text_review:
+        1. Sentiment and topic analysis via the ChatCompletion endpoint.
+        2. Embedding generation.
+
+        :param text_review:
+        :return dictionary with three results: sentiment, topic, embedding:
+        """
+        analysis_result = self.get_analysis(text_review)
+        embedding_result = self.get_embeddings([text_review])[0]
+
+        # --- Retorno Combinado ----
+        return {**analysis_result, "embedding": embedding_result}
+
+
+# ===== CRIA O MOTOR ASSÍNCRONO =====
+def build_async_engine(api_key: str, base_url: str | None = None,
+                       rate_share: float = 1.0) -> AsyncEnrichmentEngine:
     """
-    Receives the raw DataFrame and enriches it by batches (paralLel).
+    Creates the async enrichment engine with the limits from config.yaml.
 
-    :param df:
-    :param api_key:
-    :return df_enriched:
+    :param api_key: OpenAI API key.
+    :param base_url: optional API base URL (defaults to OPENAI_BASE_URL or the OpenAI API).
+    :param rate_share: fraction of the requests/tokens per minute budget this
+                       process may use (e.g. 1/4 for one of four workers sharing a key).
+    :return: AsyncEnrichmentEngine instance.
     """
-    #
-    analyzer = AIAnalyzer(api_key=api_key)
-    results = []
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = {executor.submit(analyzer.get_analysis_and_embedding, row): row for row in df['Comentario_Cliente']}
-        temp_results = {}
+    return AsyncEnrichmentEngine(
+        api_key=api_key,
+        analysis_prompt=ANALYSIS_PROMPT,
+        chat_model=CHAT_MODEL,
+        embedding_model=EMBEDDING_MODEL,
+        requests_per_minute=PIPELINE_CONFIG.get('requests_per_minute', 3000) * rate_share,
+        tokens_per_minute=PIPELINE_CONFIG.get('tokens_per_minute', 1_000_000) * rate_share,
+        initial_concurrency=PIPELINE_CONFIG.get('initial_concurrency', 8),
+        max_concurrency=PIPELINE_CONFIG.get('max_concurrency', 64),
+        max_retries=PIPELINE_CONFIG.get('max_retries', 6),
+        embedding_batch_size=EMBEDDING_BATCH_SIZE,
+        embedding_max_tokens=EMBEDDING_MAX_TOKENS_PER_BATCH,
+        base_url=base_url,
+    )
+
+
+# ===== ETAPA DE ANÁLISE (PARALELA) =====
+def run_analysis_stage(analyzer: AIAnalyzer, comments: list[str], max_workers: int = ANALYSIS_WORKERS) -> dict:
+    """
+    Runs the sentiment/topic analysis for each unique comment in parallel.
+
+    :param analyzer: AIAnalyzer instance.
+    :param comments: unique comments to be analysed.
+    :param max_workers: number of parallel threads.
+    :return: dict mapping each comment to its analysis result.
+    """
+    temp_results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(analyzer.get_analysis, comment): comment for comment in comments}
 
         print(f"INFO: Iniciando {len(futures)} tarefas de análise da IA...")
 
         for future in as_completed(futures):
             original_comment = futures[future]
             try:
-                result_dict = future.result()
-                temp_results[original_comment] = result_dict
+                temp_results[original_comment] = future.result()
             except Exception as e:
                 print(f"ERRO: Tarefa falhou completamente: {e}")
-                temp_results[original_comment] = {"sentimento": "Falha", "topico": "Falha", "embedding":[]}
+                temp_results[original_comment] = {"sentimento": "Falha", "topico": "Falha"}
+    return temp_results
+
+
+# ===== ETAPA DE EMBEDDINGS (EM LOTES) =====
+def run_embedding_stage(analyzer: AIAnalyzer, comments: list[str],
+                        batch_size: int = EMBEDDING_BATCH_SIZE,
+                        max_tokens: int = EMBEDDING_MAX_TOKENS_PER_BATCH) -> dict:
+    """
+    Generates the embeddings for the unique comments using multi-input
+    requests, capped by batch_size inputs and max_tokens tokens per request.
+
+    :param analyzer: AIAnalyzer instance.
+    :param comments: unique comments to be embedded.
+    :param batch_size: maximum number of inputs per request.
+    :param max_tokens: maximum number of estimated tokens per request.
+    :return: dict mapping each comment to its embedding.
+    """
+    batches = build_embedding_batches(comments, batch_size, max_tokens)
+    print(f"INFO: Gerando embeddings de {len(comments)} textos em {len(batches)} lotes...")
+
+    temp_results = {}
+    for batch in batches:
+        batch_texts = [comments[i] for i in batch]
+        for text, embedding in zip(batch_texts, analyzer.get_embeddings(batch_texts)):
+            temp_results[text] = embedding
+    return temp_results
+
+
+# ===== DEDUPLICAÇÃO (UM REPRESENTANTE POR GRUPO) =====
+def collapse_duplicates(comments: list[str], analysis_results: dict, embedding_results: dict,
+                        threshold: float = DEDUP_THRESHOLD) -> tuple[dict, dict]:
+    """
+    Groups exact and near-duplicate comments and picks, per group, the
+    comment whose results will be reused by the whole group (a member already
+    in the results when there is one).
+
+    :param comments: unique comments.
+    :param analysis_results: analyses already available (e.g. cached).
+    :param embedding_results: embeddings already available (e.g. cached).
+    :param threshold: near-duplicate similarity threshold.
+    :return: ({comment: analysis representative}, {comment: embedding representative}).
+    """
+    with METRICS.timer(stage="dedup"):
+        groups = deduplicate(comments, threshold, DEDUP_NUM_PERM, DEDUP_BANDS)
+    METRICS.inc("stage_rows_total", len(comments), stage="dedup")
+    analysis_rep = groups.representatives(analysis_results)
+    embedding_rep = groups.representatives(embedding_results)
+
+    saved_analyses = sum(1 for c, rep in analysis_rep.items() if c != rep and c not in analysis_results)
+    saved_embeddings = sum(1 for c, rep in embedding_rep.items() if c != rep and c not in embedding_results)
+    METRICS.inc("dedup_saved_total", saved_analyses, endpoint="chat")
+    METRICS.inc("dedup_saved_total", saved_embeddings, endpoint="embeddings")
+    print(f"INFO: Deduplicação: {len(comments)} comentários em {groups.n_clusters} grupos "
+          f"({groups.exact_merged} duplicatas exatas, {groups.near_merged} quase-duplicatas). "
+          f"Economia: {saved_analyses} análises e {saved_embeddings} embeddings.")
+    return analysis_rep, embedding_rep
+
+
+def _fan_out(results: dict, representative: dict):
+    """Copies each representative's result to the other members of its group."""
+    for comment, rep in representative.items():
+        if comment not in results and rep in results:
+            results[comment] = results[rep]
+
+
+# ===== CRIA O PIPELINE DE IA =====
+def run_ai_pipeline(df: pd.DataFrame, api_key:str, cache: EnrichmentCache | None = None,
+                    engine: str = PIPELINE_ENGINE, base_url: str | None = None,
+                    local_classifier: LocalClassifier | None = None,
+                    dedup: bool = DEDUP_ENABLED, rate_share: float = 1.0,
+                    async_engine: AsyncEnrichmentEngine | None = None) -> pd.DataFrame:
+    """
+    Receives the raw DataFrame and enriches it in two stages: the analysis
+    (one request per comment) and the embeddings (multi-input batches).
+    With engine="async" both stages run on the rate-limited async engine;
+    with engine="threads" they run on a thread pool. When a cache is given,
+    only the comments missing from it are sent to the API. When a local
+    classifier is given, the comments it labels confidently skip the chat
+    call (their labels are not cached) and an 'origem_analise' column tells
+    which tier labelled each row. With dedup, exact and near-duplicate
+    comments are enriched once per group and the results are copied to every
+    row of the group (only the representatives' results are cached).
+
+    :param df:
+    :param api_key:
+    :param cache: optional EnrichmentCache.
+    :param engine: "async" or "threads".
+    :param base_url: optional API base URL (async engine only).
+    :param local_classifier: optional LocalClassifier for the analysis triage.
+    :param dedup: collapse exact and near-duplicate comments before the API calls.
+    :param rate_share: fraction of the rate limits available to this process (async engine only).
+    :param async_engine: engine to reuse (async engine only). Callers enriching
+                         several chunks pass the same engine so the per-minute
+                         budgets hold across chunks; by default a new one is built.
+    :return df_enriched:
+    """
+    comments = list(dict.fromkeys(df['Comentario_Cliente'].astype(str)))
+
+    with METRICS.timer(stage="cache_lookup"):
+        analysis_results = cache.get_analyses(comments) if cache else {}
+        embedding_results = cache.get_embeddings(comments) if cache else {}
+    if cache:
+        METRICS.inc("cache_hits_total", len(analysis_results), cache="enrichment_analysis")
+        METRICS.inc("cache_misses_total", len(comments) - len(analysis_results), cache="enrichment_analysis")
+        METRICS.inc("cache_hits_total", len(embedding_results), cache="enrichment_embedding")
+        METRICS.inc("cache_misses_total", len(comments) - len(embedding_results), cache="enrichment_embedding")
+
+    # Um representante por grupo de (quase) duplicatas
+    analysis_rep = embedding_rep = {}
+    if dedup and len(comments) > 1:
+        analysis_rep, embedding_rep = collapse_duplicates(comments, analysis_results, embedding_results)
+
+    # Apenas o que não está no cache (e representa o seu grupo) vai para a API
+    pending_analysis = [c for c in comments if c not in analysis_results and analysis_rep.get(c, c) == c]
+    pending_embedding = [c for c in comments if c not in embedding_results and embedding_rep.get(c, c) == c]
+
+    # Triagem: o classificador local rotula o que tem confiança; o resto vai para o LLM
+    local_results = {}
+    if local_classifier is not None and pending_analysis:
+        with METRICS.timer(stage="local_classification"):
+            local_results, pending_analysis = local_classifier.triage(pending_analysis)
+        METRICS.inc("stage_rows_total", len(local_results) + len(pending_analysis), stage="local_classification")
+        METRICS.inc("local_classifier_total", len(local_results), outcome="local")
+        METRICS.inc("local_classifier_total", len(pending_analysis), outcome="escalated")
+        print(f"INFO: Classificador local: {len(local_results)} comentários rotulados localmente, "
+              f"{len(pending_analysis)} enviados ao LLM.")
+
+    if engine == "async":
+        if async_engine is None:
+            async_engine = build_async_engine(api_key, base_url, rate_share)
+        # Análises e embeddings rodam concorrentemente: um único estágio
+        with METRICS.timer(stage="enrichment"):
+            new_analyses, new_embeddings = asyncio.run(async_engine.run(pending_analysis, pending_embedding))
+        METRICS.inc("stage_rows_total", len(pending_analysis), stage="analysis")
+        METRICS.inc("stage_rows_total", len(pending_embedding), stage="embedding")
+        print(f"INFO: {async_engine.report()}")
+    else:
+        analyzer = AIAnalyzer(api_key=api_key)
+        # 1. Análise de sentimento e tópico
+        with METRICS.timer(stage="analysis"):
+            new_analyses = run_analysis_stage(analyzer, pending_analysis) if pending_analysis else {}
+        METRICS.inc("stage_rows_total", len(pending_analysis), stage="analysis")
+        # 2. Embeddings em lotes
+        with METRICS.timer(stage="embedding"):
+            new_embeddings = run_embedding_stage(analyzer, pending_embedding) if pending_embedding else {}
+        METRICS.inc("stage_rows_total", len(pending_embedding), stage="embedding")
+
+    if cache:
+        cache.put_analyses(new_analyses)
+        cache.put_embeddings(new_embeddings)
+    analysis_results.update(new_analyses)
+    analysis_results.update(local_results)
+    embedding_results.update(new_embeddings)
+    _fan_out(analysis_results, analysis_rep)
+    _fan_out(embedding_results, embedding_rep)
 
     print("INFO: Tarefas de IA concluídas. Montando DataFrame...")
 
-    for comment in df['Comentario_Cliente']:
-        results.append(temp_results.get(comment))
+    with METRICS.timer(stage="assembly"):
+        results = []
+        for comment in df['Comentario_Cliente'].astype(str):
+            result_dict = dict(analysis_results.get(comment, {"sentimento": "Falha", "topico": "Falha"}))
+            result_dict["embedding"] = embedding_results.get(comment, [])
+            if local_classifier is not None:
+                result_dict[ORIGIN_COLUMN] = "local" if analysis_rep.get(comment, comment) in local_results else "llm"
+            results.append(result_dict)
 
-    df_results = pd.DataFrame(results)
-    df_enriched = pd.concat([df.reset_index(drop=True), df_results], axis=1)
+        df_results = pd.DataFrame(results)
+        df_enriched = pd.concat([df.reset_index(drop=True), df_results], axis=1)
+    METRICS.inc("stage_rows_total", len(df_enriched), stage="assembly")
 
-    return df_enriched
\ No newline at end of file
+    return df_enriched
@@ -0,0 +1,356 @@
+# ===== MOTOR ASSÍNCRONO DE ENRIQUECIMENTO =====
+import asyncio
+import json
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+from openai import (
+    AsyncOpenAI,
+    APIConnectionError,
+    APITimeoutError,
+    BadRequestError,
+    InternalServerError,
+    RateLimitError,
+    UnprocessableEntityError,
+)
+
+from src.analysis.batching import build_embedding_batches, estimate_tokens
+from src.monitoring.instrumentation import METRICS
+
+# Erros que valem uma nova tentativa
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+# Erros causados por uma entrada do lote (ex.: texto longo demais): o lote é dividido
+# ao meio até isolar a entrada rejeitada, e só ela fica sem embedding
+SPLITTABLE_ERRORS = (BadRequestError, UnprocessableEntityError)
+
+# Estimativa de tokens de saída de uma análise (JSON curto)
+ANALYSIS_OUTPUT_TOKENS = 50
+
+
+def _loop_primitive(owner, name: str, factory):
+    """
+    Returns the asyncio primitive stored in owner.<name>, recreating it when
+    the running event loop changed (each asyncio.run() starts a new loop, and
+    the limiters keep their state across runs).
+    """
+    loop = asyncio.get_running_loop()
+    primitive, bound_loop = getattr(owner, name, (None, None))
+    if bound_loop is not loop:
+        primitive = factory()
+        setattr(owner, name, (primitive, loop))
+    return primitive
+
+
+# ===== LIMITADOR TOKEN BUCKET =====
+class TokenBucket:
+    """
+    Async token bucket refilled continuously at rate_per_minute / 60 units per
+    second. The budget persists across event loops, so one bucket can pace
+    several consecutive runs (e.g. the chunks of a streamed pipeline).
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.tokens = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1):
+        """
+        Waits until `amount` units are available and consumes them.
+        Waiters are served in FIFO order.
+
+        :param amount: units to consume (capped at the bucket capacity).
+        """
+        amount = min(amount, self.capacity)
+        async with _loop_primitive(self, "_lock", asyncio.Lock):
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+
+class RateLimiter:
+    """Combines a requests/min and a tokens/min bucket."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    async def acquire(self, tokens: int):
+        await self.requests.acquire(1)
+        await self.tokens.acquire(tokens)
+
+
+# ===== CONCORRÊNCIA ADAPTATIVA (AIMD) =====
+class AdaptiveConcurrency:
+    """
+    Concurrency limit that grows by one after `limit` consecutive successes
+    (additive increase) and is halved when the API throttles us
+    (multiplicative decrease), at most once per cooldown period.
+    """
+
+    def __init__(self, initial: int, maximum: int, minimum: int = 1, cooldown: float = 2.0):
+        self.limit = max(minimum, min(initial, maximum))
+        self.maximum = maximum
+        self.minimum = minimum
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.peak = self.limit
+        self._successes = 0
+        self._last_decrease = 0.0
+
+    async def acquire(self):
+        cond = _loop_primitive(self, "_cond", asyncio.Condition)
+        async with cond:
+            await cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self, throttled: bool = False):
+        cond = _loop_primitive(self, "_cond", asyncio.Condition)
+        async with cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                self._successes = 0
+                if now - self._last_decrease >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit // 2)
+                    self._last_decrease = now
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.maximum:
+                    self.limit += 1
+                    self.peak = max(self.peak, self.limit)
+                    self._successes = 0
+            cond.notify_all()
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    """
+    Reads the Retry-After (or retry-after-ms) header of an API error.
+
+    :param error: exception raised by the OpenAI client.
+    :return: seconds to wait, or None if the header is absent.
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+# ===== MOTOR =====
+class AsyncEnrichmentEngine:
+    """
+    Enriches comments with the async OpenAI client, respecting requests/min
+    and tokens/min budgets, retrying throttled/transient errors with jittered
+    exponential backoff (honoring Retry-After) and adapting the concurrency
+    to the throttling signal. The rate limits and the concurrency limit are
+    kept across run() calls, so reusing one engine for every chunk of a run
+    enforces the per-minute budgets over the whole run.
+    """
+
+    def __init__(self, api_key: str, analysis_prompt: str, chat_model: str, embedding_model: str,
+                 requests_per_minute: float = 3000, tokens_per_minute: float = 1_000_000,
+                 initial_concurrency: int = 8, max_concurrency: int = 64, max_retries: int = 6,
+                 backoff_base: float = 0.5, backoff_cap: float = 60.0,
+                 embedding_batch_size: int = 1000, embedding_max_tokens: int = 250000,
+                 base_url: str | None = None):
+        """
+        :param api_key: OpenAI API key.
+        :param analysis_prompt: system prompt of the analysis call.
+        :param chat_model: chat model name.
+        :param embedding_model: embedding model name.
+        :param requests_per_minute: request budget.
+        :param tokens_per_minute: token budget.
+        :param initial_concurrency: starting number of in-flight requests.
+        :param max_concurrency: upper bound for the in-flight requests.
+        :param max_retries: retries per request before giving up.
+        :param backoff_base: base delay (s) of the exponential backoff.
+        :param backoff_cap: maximum delay (s) of the exponential backoff.
+        :param embedding_batch_size: maximum inputs per embeddings request.
+        :param embedding_max_tokens: maximum estimated tokens per embeddings request.
+        :param base_url: optional API base URL (e.g. a local stub server).
+        """
+        self.api_key = api_key
+        self.base_url = base_url
+        self.client = None
+        self.analysis_prompt = analysis_prompt
+        self.chat_model = chat_model
+        self.embedding_model = embedding_model
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.embedding_batch_size = embedding_batch_size
+        self.embedding_max_tokens = embedding_max_tokens
+        self.concurrency = AdaptiveConcurrency(initial_concurrency, max_concurrency)
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "failed_analyses": 0,
+                      "failed_embeddings": 0, "peak_concurrency": 0}
+
+    def _backoff_delay(self, attempt: int, error: Exception) -> float:
+        jittered = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return retry_after + jittered * 0.1
+        return jittered
+
+    async def _call_with_retries(self, request, tokens: int, endpoint: str):
+        """
+        Runs `request()` under the rate limiter and the concurrency limit,
+        retrying the retryable errors.
+
+        :param request: zero-argument coroutine function performing the API call.
+        :param tokens: estimated tokens of the call.
+        :param endpoint: "chat" or "embeddings" (metrics label).
+        :return: the API response.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(tokens)
+            await self.concurrency.acquire()
+            throttled = False
+            start = time.perf_counter()
+            try:
+                self.stats["requests"] += 1
+                METRICS.inc("api_requests_total", endpoint=endpoint)
+                response = await request()
+                METRICS.record_usage(getattr(response, "usage", None), endpoint)
+                return response
+            except RETRYABLE_ERRORS as e:
+                throttled = isinstance(e, RateLimitError)
+                if throttled:
+                    self.stats["throttled"] += 1
+                    METRICS.inc("api_throttled_total", endpoint=endpoint)
+                if attempt == self.max_retries:
+                    METRICS.inc("api_errors_total", endpoint=endpoint)
+                    raise
+                delay = self._backoff_delay(attempt, e)
+            except Exception:
+                METRICS.inc("api_errors_total", endpoint=endpoint)
+                raise
+            finally:
+                METRICS.observe("api_request_seconds", time.perf_counter() - start, endpoint=endpoint)
+                await self.concurrency.release(throttled)
+            self.stats["retries"] += 1
+            METRICS.inc("api_retries_total", endpoint=endpoint)
+            await asyncio.sleep(delay)
+
+    async def analyze(self, text_review: str) -> dict:
+        """
+        Sentiment and topic analysis of one comment.
+
+        :param text_review:
+        :return dictionary with two results: sentiment, topic:
+        """
+        tokens = estimate_tokens(self.analysis_prompt) + estimate_tokens(text_review) + ANALYSIS_OUTPUT_TOKENS
+        try:
+            response = await self._call_with_retries(
+                lambda: self.client.chat.completions.create(
+                    model=self.chat_model,
+                    response_format={"type": "json_object"},
+                    messages=[
+                        {"role": "system", "content": self.analysis_prompt},
+                        {"role": "user", "content": text_review}
+                    ]
+                ),
+                tokens, "chat"
+            )
+            result = json.loads(response.choices[0].message.content)
+            return {"sentimento": result.get("sentimento", "Erro"), "topico": result.get("topico", "Erro")}
+        except Exception as e:
+            self.stats["failed_analyses"] += 1
+            print(f"Erro na ANÁLISE para: {text_review[:30]}... | Erro: {e}")
+            return {"sentimento": "Falha", "topico": "Falha"}
+
+    async def embed(self, text_reviews: list[str]) -> list[list[float]]:
+        """
+        Embeddings of one batch of comments in a single request.
+
+        :param text_reviews:
+        :return: embeddings in the same order as text_reviews (empty on failure;
+                 when the API rejects an input, only that input).
+        """
+        embeddings = [[] for _ in text_reviews]
+        tokens = sum(estimate_tokens(t) for t in text_reviews)
+        try:
+            response = await self._call_with_retries(
+                lambda: self.client.embeddings.create(model=self.embedding_model, input=text_reviews),
+                tokens, "embeddings"
+            )
+            for item in response.data:
+                embeddings[item.index] = item.embedding
+        except SPLITTABLE_ERRORS as e:
+            if len(text_reviews) > 1:
+                middle = len(text_reviews) // 2
+                first, second = await asyncio.gather(self.embed(text_reviews[:middle]),
+                                                     self.embed(text_reviews[middle:]))
+                return first + second
+            self.stats["failed_embeddings"] += 1
+            print(f"Erro na GERAÇÃO DE EMBEDDING para: {text_reviews[0][:30]}... | Erro: {e}")
+        except Exception as e:
+            self.stats["failed_embeddings"] += len(text_reviews)
+            print(f"Erro na GERAÇÃO DE EMBEDDING para lote de {len(text_reviews)} textos | Erro: {e}")
+        return embeddings
+
+    async def run(self, analysis_comments: list[str], embedding_comments: list[str]) -> tuple[dict, dict]:
+        """
+        Runs the analysis and embedding stages concurrently.
+
+        :param analysis_comments: unique comments to analyse.
+        :param embedding_comments: unique comments to embed.
+        :return: (analysis results, embedding results), both keyed by comment.
+        """
+        # Um cliente por loop (o pool HTTP é fechado no fim); retries são feitos aqui, não no cliente
+        self.client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+        batches = build_embedding_batches(embedding_comments, self.embedding_batch_size, self.embedding_max_tokens)
+        print(f"INFO: Motor assíncrono: {len(analysis_comments)} análises e "
+              f"{len(batches)} lotes de embeddings...")
+
+        async def run_batch(batch):
+            texts = [embedding_comments[i] for i in batch]
+            return texts, await self.embed(texts)
+
+        try:
+            analyses, embedded_batches = await asyncio.gather(
+                asyncio.gather(*(self.analyze(c) for c in analysis_comments)),
+                asyncio.gather(*(run_batch(b) for b in batches)),
+            )
+        finally:
+            await self.client.close()
+        self.stats["peak_concurrency"] = self.concurrency.peak
+
+        analysis_results = dict(zip(analysis_comments, analyses))
+        embedding_results = {}
+        for texts, embeddings in embedded_batches:
+            embedding_results.update(zip(texts, embeddings))
+        return analysis_results, embedding_results
+
+    def report(self) -> str:
+        """Returns a human-readable summary of the run."""
+        s = self.stats
+        return (f"Requisições: {s['requests']} | Retries: {s['retries']} | 429s: {s['throttled']} | "
+                f"Concorrência máxima: {s['peak_concurrency']} | "
+                f"Falhas: {s['failed_analyses']} análises, {s['failed_embeddings']} embeddings")
@@ -0,0 +1,34 @@
+# ===== ESTIMATIVA DE TOKENS =====
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap local token estimate (~4 characters per token), used to keep
+    embedding batches under the per-request token cap.
+
+    :param text: text to be measured.
+    :return: estimated number of tokens.
+    """
+    return len(text) // 4 + 1
+
+
+def build_embedding_batches(texts: list[str], batch_size: int, max_tokens: int) -> list[list[int]]:
+    """
+    Splits the texts into batches of indices that respect both the maximum
+    number of inputs and the maximum number of (estimated) tokens per request.
+
+    :param texts: texts to be embedded.
+    :param batch_size: maximum number of inputs per request.
+    :param max_tokens: maximum number of estimated tokens per request.
+    :return: list of batches, each one a list of indices into texts.
+    """
+    batches = []
+    current, current_tokens = [], 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (len(current) >= batch_size or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
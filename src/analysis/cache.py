@@ -0,0 +1,151 @@
+# ===== CACHE PERSISTENTE DE ENRIQUECIMENTO =====
+import hashlib
+import json
+import os
+import sqlite3
+from array import array
+
+# Quantidade máxima de chaves por consulta (limite de parâmetros do SQLite)
+_LOOKUP_CHUNK = 500
+
+
+def _hash(*parts: str) -> str:
+    """Returns the sha256 hex digest of the parts, separated by a NUL byte."""
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class EnrichmentCache:
+    """
+    Content-addressed on-disk cache (SQLite) for the AI enrichment results.
+
+    Analysis entries are keyed by the comment text + analysis prompt + chat
+    model, and embedding entries by the comment text + embedding model, so
+    editing the prompt only invalidates the analyses, and changing the
+    embedding model only invalidates the embeddings.
+    """
+
+    def __init__(self, path: str, analysis_prompt: str, chat_model: str, embedding_model: str):
+        """
+        Opens (or creates) the cache file.
+
+        :param path: SQLite file path.
+        :param analysis_prompt: analysis prompt from prompts.yaml.
+        :param chat_model: chat model name from config.yaml.
+        :param embedding_model: embedding model name from config.yaml.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.analysis_prompt = analysis_prompt
+        self.chat_model = chat_model
+        self.embedding_model = embedding_model
+        self.stats = {"analysis_hits": 0, "analysis_misses": 0,
+                      "embedding_hits": 0, "embedding_misses": 0}
+
+        # WAL + timeout: vários processos (pipeline em shards) podem usar o mesmo arquivo
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS analysis (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS embedding (key TEXT PRIMARY KEY, value BLOB)")
+        self.conn.commit()
+
+    # --- Chaves ---
+    def analysis_key(self, text: str) -> str:
+        return _hash("analysis", self.chat_model, self.analysis_prompt, text)
+
+    def embedding_key(self, text: str) -> str:
+        return _hash("embedding", self.embedding_model, text)
+
+    # --- Leitura em lote ---
+    def _lookup(self, table: str, keys: list[str]) -> dict:
+        found = {}
+        for start in range(0, len(keys), _LOOKUP_CHUNK):
+            chunk = keys[start:start + _LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT key, value FROM {table} WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            found.update(rows)
+        return found
+
+    def get_analyses(self, texts: list[str]) -> dict:
+        """
+        Looks up the cached analyses of the texts.
+
+        :param texts: comments to look up.
+        :return: dict mapping each cached text to its analysis dict.
+        """
+        keys = {text: self.analysis_key(text) for text in texts}
+        found = self._lookup("analysis", list(keys.values()))
+        results = {text: json.loads(found[key]) for text, key in keys.items() if key in found}
+        self.stats["analysis_hits"] += len(results)
+        self.stats["analysis_misses"] += len(texts) - len(results)
+        return results
+
+    def get_embeddings(self, texts: list[str]) -> dict:
+        """
+        Looks up the cached embeddings of the texts.
+
+        :param texts: comments to look up.
+        :return: dict mapping each cached text to its embedding (list of floats).
+        """
+        keys = {text: self.embedding_key(text) for text in texts}
+        found = self._lookup("embedding", list(keys.values()))
+        results = {text: array('f', found[key]).tolist() for text, key in keys.items() if key in found}
+        self.stats["embedding_hits"] += len(results)
+        self.stats["embedding_misses"] += len(texts) - len(results)
+        return results
+
+    # --- Escrita em lote ---
+    def put_analyses(self, results: dict):
+        """
+        Stores the analyses, skipping the ones that failed.
+
+        :param results: dict mapping text to analysis dict.
+        """
+        rows = [
+            (self.analysis_key(text), json.dumps(result, ensure_ascii=False))
+            for text, result in results.items()
+            if result.get("sentimento") not in ("Erro", "Falha")
+        ]
+        self.conn.executemany("INSERT OR REPLACE INTO analysis VALUES (?, ?)", rows)
+        self.conn.commit()
+
+    def put_embeddings(self, results: dict):
+        """
+        Stores the embeddings as float32 blobs, skipping the empty ones.
+
+        :param results: dict mapping text to embedding.
+        """
+        rows = [
+            (self.embedding_key(text), array('f', embedding).tobytes())
+            for text, embedding in results.items()
+            if len(embedding) > 0
+        ]
+        self.conn.executemany("INSERT OR REPLACE INTO embedding VALUES (?, ?)", rows)
+        self.conn.commit()
+
+    def seed_from_records(self, records: list[dict]):
+        """
+        Warms the cache with already-enriched records (e.g. a previous
+        data_enriched.json), assuming they were produced with the current
+        prompt and models.
+
+        :param records: dicts with Comentario_Cliente, sentimento, topico and embedding.
+        """
+        analyses, embeddings = {}, {}
+        for record in records:
+            text = str(record["Comentario_Cliente"])
+            analyses[text] = {"sentimento": record.get("sentimento"), "topico": record.get("topico")}
+            embeddings[text] = record.get("embedding") or []
+        self.put_analyses(analyses)
+        self.put_embeddings(embeddings)
+        print(f"INFO: Cache populado com {len(analyses)} comentários já enriquecidos.")
+
+    def report(self) -> str:
+        """Returns a human-readable summary of the hits and misses of this run."""
+        s = self.stats
+        return (f"Cache de análise: {s['analysis_hits']} hits / {s['analysis_misses']} misses | "
+                f"Cache de embedding: {s['embedding_hits']} hits / {s['embedding_misses']} misses")
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,247 @@
+# ===== DEDUPLICAÇÃO DE COMENTÁRIOS ANTES DAS CHAMADAS À API =====
+# Normalização (caixa, acentos, pontuação, espaços) para duplicatas exatas e
+# MinHash + LSH sobre 5-gramas de caracteres para achar candidatas a
+# quase-duplicatas, confirmadas palavra a palavra (uma negação ou palavra de
+# polaridade diferente impede a junção). Só um representante de cada grupo é
+# enriquecido; o resultado vale para o grupo todo.
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+import numpy as np
+
+SHINGLE_SIZE = 5
+
+# Palavras (normalizadas) que mudam o sentimento de uma frase quase igual:
+# dois comentários que diferem nelas nunca são quase-duplicatas
+POLARITY_WORDS = {
+    "nao", "nunca", "jamais", "nem", "nada", "nenhum", "nenhuma", "sem", "pouco", "pouca", "poucos", "poucas",
+    "muito", "muita", "mal", "bem", "mas", "porem", "bom", "boa", "bons", "boas", "otimo", "otima", "excelente",
+    "perfeito", "perfeita", "maravilhoso", "maravilhosa", "incrivel", "adorei", "amei", "gostei", "recomendo",
+    "ruim", "ruins", "pessimo", "pessima", "horrivel", "terrivel", "fraco", "fraca", "frio", "fria", "atrasado",
+    "atrasada", "atrasou", "odiei", "decepcionante", "desastre", "razoavel", "regular", "mediano", "mediana",
+}
+
+_DIGIT = re.compile(r"\d")
+
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_SHIFT = np.uint64(32)
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_comment(text: str) -> str:
+    """
+    Canonical form used to compare comments: lowercase, without accents,
+    punctuation or repeated whitespace. Digits are kept ("nota 2" and
+    "nota 10" are different answers); ids that differ in a few digits are
+    left to the near-duplicate stage.
+    """
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def _word_tokens(normalized: str) -> list[str]:
+    """Words of a normalized comment; tokens with digits (ids, dates) become "0"."""
+    return ["0" if _DIGIT.search(word) else word for word in normalized.split()]
+
+
+def near_duplicate_words(a: list[str], b: list[str], threshold: float) -> bool:
+    """
+    Word-level check of a near-duplicate candidate pair: the word sets must
+    have Jaccard similarity >= threshold and the same polarity/negation words
+    (same counts), so "foi excelente" and "nao foi excelente" never merge.
+
+    :param a: tokens of one comment (see _word_tokens).
+    :param b: tokens of the other comment.
+    :param threshold: minimum word-level Jaccard similarity.
+    """
+    if Counter(w for w in a if w in POLARITY_WORDS) != Counter(w for w in b if w in POLARITY_WORDS):
+        return False
+    words_a, words_b = set(a), set(b)
+    union = words_a | words_b
+    return not union or len(words_a & words_b) / len(union) >= threshold
+
+
+def _shingle_hashes(texts: list[str], k: int = SHINGLE_SIZE) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Hashes of every character k-gram of every text, computed over one
+    concatenated byte buffer (vectorized rolling polynomial hash).
+
+    :return: (hashes of all k-grams, offsets where each text's k-grams start).
+    """
+    # Textos mais curtos que k viram um único k-grama (completado com espaços)
+    encoded = [t.ljust(k).encode("utf-8") for t in texts]
+    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+    buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    text_of_byte = np.repeat(np.arange(len(encoded)), lengths)
+
+    powers = np.uint64(257) ** np.arange(k, dtype=np.uint64)
+    windows = np.lib.stride_tricks.sliding_window_view(buffer, k)
+    hashes = (windows * powers).sum(axis=1, dtype=np.uint64)
+
+    # Mantém só as janelas inteiramente dentro de um texto
+    keep = text_of_byte[:len(hashes)] == text_of_byte[k - 1:]
+    counts = lengths - k + 1
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return hashes[keep], offsets
+
+
+def minhash_signatures(texts: list[str], num_perm: int = 128, seed: int = 1,
+                       chunk_size: int = 5000) -> np.ndarray:
+    """
+    MinHash signatures of the character k-gram sets of the texts.
+
+    :param texts: normalized texts.
+    :param num_perm: number of hash functions (signature length, multiple of 16).
+    :param seed: seed of the hash functions (signatures are only comparable with the same seed).
+    :param chunk_size: texts processed per vectorized step (bounds memory).
+    :return: uint32 matrix (len(texts), num_perm).
+    """
+    # Hash multiply-shift: ((a * h + b) mod 2^64) >> 32, com a ímpar
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, np.iinfo(np.uint64).max, num_perm, dtype=np.uint64, endpoint=True) | np.uint64(1)
+    b = rng.integers(0, np.iinfo(np.uint64).max, num_perm, dtype=np.uint64, endpoint=True)
+
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    for start in range(0, len(texts), chunk_size):
+        hashes, offsets = _shingle_hashes(texts[start:start + chunk_size])
+        hashes = (hashes & _MAX_HASH)[:, None]
+        permuted = np.empty((len(hashes), 16), dtype=np.uint64)
+        for i in range(0, num_perm, 16):
+            np.multiply(hashes, a[i:i + 16], out=permuted)
+            permuted += b[i:i + 16]
+            permuted >>= _SHIFT
+            signatures[start:start + len(offsets), i:i + 16] = np.minimum.reduceat(permuted, offsets, axis=0)
+    return signatures
+
+
+@dataclass
+class DedupResult:
+    """
+    Groups of equivalent comments. cluster[i] is the index (into comments)
+    of the first comment of the group of comments[i].
+    """
+    comments: list[str]
+    cluster: np.ndarray
+    exact_merged: int = 0
+    near_merged: int = 0
+
+    @property
+    def n_clusters(self) -> int:
+        return len(np.unique(self.cluster))
+
+    def representatives(self, known=()) -> dict:
+        """
+        Representative of each comment's group: the first member found in
+        `known` (e.g. already cached), otherwise the first member.
+
+        :param known: comments whose results already exist.
+        :return: {comment: representative comment}.
+        """
+        chosen = {}
+        for i, root in enumerate(self.cluster):
+            if self.comments[i] in known and root not in chosen:
+                chosen[root] = self.comments[i]
+        return {c: chosen.get(root, self.comments[root]) for c, root in zip(self.comments, self.cluster)}
+
+
+def deduplicate(comments: list[str], threshold: float = 0.9, num_perm: int = 128,
+                bands: int = 16) -> DedupResult:
+    """
+    Groups exact duplicates (after normalize_comment) and near-duplicates.
+    Near-duplicate candidates come from LSH over the MinHash signatures
+    (estimated Jaccard similarity of the 5-gram sets >= threshold) and are
+    confirmed word by word (near_duplicate_words). Groups are built around
+    leaders: a comment joins the first earlier leader it matches directly,
+    so similarity never chains (A~B, B~C does not merge A and C).
+
+    :param comments: unique raw comments.
+    :param threshold: minimum similarity to merge two comments (>= 1 disables near-duplicates).
+    :param num_perm: MinHash signature length.
+    :param bands: LSH bands (num_perm / bands rows per band).
+    :return: DedupResult.
+    """
+    n = len(comments)
+    normalized = [normalize_comment(c) for c in comments]
+
+    # 1. Duplicatas exatas após a normalização
+    first_seen, exact_root = {}, np.empty(n, dtype=np.int64)
+    for i, text in enumerate(normalized):
+        exact_root[i] = first_seen.setdefault(text, i)
+    unique_idx = np.fromiter(first_seen.values(), dtype=np.int64, count=len(first_seen))
+    exact_merged = n - len(unique_idx)
+
+    # 2. Quase-duplicatas entre os textos normalizados distintos
+    cluster = exact_root
+    near_merged = 0
+    if threshold < 1 and len(unique_idx) > 1:
+        texts = [normalized[i] for i in unique_idx]
+        edges = _candidate_pairs(minhash_signatures(texts, num_perm), bands, threshold)
+        if len(edges):
+            leader = _leader_clusters(texts, edges, threshold)
+            near_merged = int((leader != np.arange(len(texts))).sum())
+            # Cada grupo é identificado pelo comentário do seu líder (o primeiro do grupo)
+            position = np.empty(n, dtype=np.int64)
+            position[unique_idx] = np.arange(len(unique_idx))
+            cluster = unique_idx[leader][position[exact_root]]
+
+    return DedupResult(comments=list(comments), cluster=cluster, exact_merged=exact_merged,
+                       near_merged=near_merged)
+
+
+def _leader_clusters(texts: list[str], edges: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Leader clustering over the candidate pairs: in order, each text joins the
+    first earlier leader among its candidates that passes the word-level
+    check, otherwise it leads a new group.
+
+    :return: int array with the leader (index into texts) of each text.
+    """
+    neighbors = {}
+    for a, b in edges:
+        neighbors.setdefault(int(max(a, b)), []).append(int(min(a, b)))
+    leader = np.arange(len(texts))
+    tokens = {}
+
+    def words(i):
+        if i not in tokens:
+            tokens[i] = _word_tokens(texts[i])
+        return tokens[i]
+
+    for i in sorted(neighbors):
+        for j in sorted(set(neighbors[i])):
+            if leader[j] == j and near_duplicate_words(words(i), words(j), threshold):
+                leader[i] = j
+                break
+    return leader
+
+
+def _candidate_pairs(signatures: np.ndarray, bands: int, threshold: float) -> np.ndarray:
+    """
+    LSH: texts that share all the rows of at least one band are candidates;
+    each candidate is linked to the first text of its bucket when their
+    estimated similarity reaches the threshold.
+
+    :return: int array (pairs, 2) of row indices into signatures.
+    """
+    rows = signatures.shape[1] // bands
+    pairs = []
+    for band in range(bands):
+        block = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        _, bucket = np.unique(block.view(np.dtype((np.void, block.dtype.itemsize * rows))).ravel(),
+                              return_inverse=True)
+        order = np.argsort(bucket, kind="stable")
+        sorted_bucket = bucket[order]
+        starts = np.flatnonzero(np.r_[True, sorted_bucket[1:] != sorted_bucket[:-1]])
+        leader = np.repeat(order[starts], np.diff(np.r_[starts, len(order)]))
+        candidate = leader != order
+        members, leaders = order[candidate], leader[candidate]
+        for i in range(0, len(members), 50000):
+            m, l = members[i:i + 50000], leaders[i:i + 50000]
+            similar = (signatures[m] == signatures[l]).mean(axis=1) >= threshold
+            pairs.append(np.column_stack((l[similar], m[similar])))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(pairs), axis=0)
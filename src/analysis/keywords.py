@@ -0,0 +1,100 @@
+# === ÍNDICE DE PALAVRAS-CHAVE PARA A NUVEM DE PALAVRAS ===
+# Contagem das palavras da whitelist por tipo de fornecedor, fornecedor e
+# sentimento. Gerado pelo pipeline; a nuvem de palavras é desenhada direto
+# dessas frequências, sem reler os comentários.
+import os
+import re
+import pandas as pd
+from src.analysis.aggregates import SUPPLIER_COLUMNS
+
+KEYWORDS_PATH = "data/processed/data_enriched_keywords.parquet"
+INDEX_COLUMNS = ["supplier_type", "supplier", "sentimento", "palavra", "count"]
+
+# Whitelist de Palavras-chave
+PALAVRAS_CHAVE_FILTRO = [
+    "bom", "ótimo", "excelente", "maravilhoso", "perfeito", "incrível", "sensacional",
+    "gostei", "adorei", "amamos", "elogiaram", "elogio", "rápido", "atenciosos",
+    "profissional", "impecável", "delicioso", "saboroso", "quente", "animado",
+    "animou", "cheia", "legal", "top", "recomendo", "sucesso", "parabéns",
+    "ruim", "péssimo", "horrível", "desastre", "decepcionante", "chato", "fraco",
+    "problema", "erro", "errou", "rude", "grossa", "atrasado", "atraso", "demorou",
+    "frio", "fria", "morna", "vazia", "esquecível", "barulho", "repetitiva",
+    "absurdo", "estressante", "gordurosa", "sumiu", "esqueceu", "faltou", "azedo",
+    "ok", "mediano", "razoável", "normal"
+]
+PALAVRAS_SET = set(PALAVRAS_CHAVE_FILTRO)
+
+# Mesma tokenização de antes (split por espaço + strip de pontuação nas
+# pontas), mas em uma única regex: só os tokens da whitelist são extraídos.
+_PUNCTUATION = re.escape(".,!?:;()[]{}")
+_KEYWORD_PATTERN = (
+    rf"(?:^|(?<=\s))[{_PUNCTUATION}]*"
+    rf"({'|'.join(sorted(map(re.escape, PALAVRAS_CHAVE_FILTRO), key=len, reverse=True))})"
+    rf"[{_PUNCTUATION}]*(?=\s|$)"
+)
+
+
+def build_keyword_index(df_enriched: pd.DataFrame, chunk_size: int = 100_000) -> pd.DataFrame:
+    """
+    Counts whitelist keywords per supplier type, supplier and sentiment.
+    :param df_enriched: Enriched DataFrame (needs Comentario_Cliente and sentimento).
+    :param chunk_size: rows tokenized at a time (bounds peak memory).
+    :return: DataFrame with columns supplier_type, supplier, sentimento, palavra, count.
+    """
+    supplier_columns = [c for c in SUPPLIER_COLUMNS.values() if c in df_enriched.columns]
+    parts = []
+    for start in range(0, len(df_enriched), chunk_size):
+        chunk = df_enriched.iloc[start:start + chunk_size]
+        words = chunk['Comentario_Cliente'].fillna("").astype(str).str.lower().str.findall(_KEYWORD_PATTERN)
+        hits = chunk[supplier_columns + ['sentimento']].assign(palavra=words).explode('palavra')
+        hits = hits.dropna(subset=['palavra'])
+        for supplier_type, col_name in SUPPLIER_COLUMNS.items():
+            if col_name not in supplier_columns:
+                continue
+            counts = hits.groupby([col_name, 'sentimento', 'palavra']).size().reset_index(name='count')
+            counts = counts.rename(columns={col_name: 'supplier'})
+            counts.insert(0, 'supplier_type', supplier_type)
+            parts.append(counts)
+
+    if not parts:
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+    index = pd.concat(parts, ignore_index=True)
+    # Soma os blocos
+    return index.groupby(INDEX_COLUMNS[:-1], as_index=False)['count'].sum()[INDEX_COLUMNS]
+
+
+def save_keyword_index(index: pd.DataFrame, path: str = KEYWORDS_PATH):
+    """
+    Saves the keyword index as Parquet (atomic rename).
+    :param index: Output of build_keyword_index.
+    :param path: Destination file.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    index.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    print(f"INFO: Índice de palavras-chave salvo em {path} ({len(index)} linhas).")
+
+
+def load_keyword_index(path: str = KEYWORDS_PATH) -> pd.DataFrame:
+    """
+    Loads the keyword index written by the pipeline.
+    :raises FileNotFoundError: if the pipeline has not produced it yet.
+    """
+    return pd.read_parquet(path)
+
+
+def keyword_frequencies(index: pd.DataFrame, supplier_type: str, supplier: str,
+                        sentiment: str | None = None) -> dict:
+    """
+    Keyword frequencies of one supplier, optionally for one sentiment.
+    :param index: Keyword index.
+    :param supplier_type: "DJ" or "Buffet".
+    :param supplier: Supplier ID.
+    :param sentiment: Sentiment filter (None = all sentiments).
+    :return: {palavra: count}.
+    """
+    rows = index[(index['supplier_type'] == supplier_type) & (index['supplier'] == supplier)]
+    if sentiment is not None:
+        rows = rows[rows['sentimento'] == sentiment]
+    return {word: int(count) for word, count in rows.groupby('palavra')['count'].sum().items()}
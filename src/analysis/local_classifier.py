@@ -0,0 +1,227 @@
+# ===== CLASSIFICADOR LOCAL (TRIAGEM ANTES DO LLM) =====
+# TF-IDF + regressão logística treinados com as linhas já rotuladas pelo LLM.
+# Comentários com previsão confiável são rotulados localmente (CPU, em lote);
+# os demais seguem para a API de chat.
+import os
+import time
+import numpy as np
+import pandas as pd
+
+# Rótulos que indicam falha da API (não servem para treino)
+INVALID_LABELS = {"Erro", "Falha"}
+
+# Coluna que registra quem rotulou cada linha ("llm" ou "local")
+ORIGIN_COLUMN = "origem_analise"
+
+MODEL_VERSION = 1
+
+
+def training_rows(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rows usable for training: labelled by the LLM (rows labelled by the local
+    tier itself are skipped) and without API failures.
+
+    :param frame: enriched DataFrame (Comentario_Cliente, sentimento, topico).
+    :return: DataFrame with the columns text, sentimento, topico.
+    """
+    rows = frame
+    if ORIGIN_COLUMN in rows.columns:
+        rows = rows[rows[ORIGIN_COLUMN].fillna("llm") != "local"]
+    rows = rows[~rows['sentimento'].isin(INVALID_LABELS) & ~rows['topico'].astype(str).isin(INVALID_LABELS)]
+    return pd.DataFrame({
+        "text": rows['Comentario_Cliente'].astype(str).to_numpy(),
+        "sentimento": rows['sentimento'].astype(str).to_numpy(),
+        "topico": rows['topico'].astype(str).to_numpy(),
+    }).drop_duplicates("text")
+
+
+class LocalClassifier:
+    """
+    Sentiment and topic classifier over character n-gram TF-IDF features.
+    Text features (rather than the stored embeddings) let the triage run
+    before the embedding requests, which are issued concurrently with the
+    analysis. Topics seen fewer than min_topic_support times are not
+    predicted: comments about them get a low topic confidence and escalate.
+    """
+
+    def __init__(self, confidence_threshold: float = 0.9, min_topic_support: int = 5,
+                 max_features: int = 200_000):
+        """
+        :param confidence_threshold: minimum probability (of both the sentiment
+                                     and the topic) to accept a local label.
+        :param min_topic_support: minimum training rows for a topic to be a class.
+        :param max_features: TF-IDF vocabulary cap.
+        """
+        self.confidence_threshold = confidence_threshold
+        self.min_topic_support = min_topic_support
+        self.max_features = max_features
+        self.vectorizer = None
+        self.sentiment_model = None
+        self.topic_model = None
+        self.trained_rows = 0
+
+    def fit(self, texts, sentiments, topics) -> "LocalClassifier":
+        """
+        Trains both models.
+
+        :param texts: comments.
+        :param sentiments: LLM sentiment labels.
+        :param topics: LLM topic labels.
+        :return: self.
+        """
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+
+        texts, sentiments, topics = list(texts), np.asarray(sentiments), np.asarray(topics)
+        self.vectorizer = TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 5), min_df=2,
+                                          sublinear_tf=True, max_features=self.max_features)
+        features = self.vectorizer.fit_transform(texts)
+
+        self.sentiment_model = LogisticRegression(max_iter=1000, C=10.0)
+        self.sentiment_model.fit(features, sentiments)
+
+        # Tópicos raros viram uma classe "outros", que nunca é aceita localmente
+        labels, counts = np.unique(topics, return_counts=True)
+        frequent = set(labels[counts >= self.min_topic_support])
+        topic_targets = np.array([t if t in frequent else "" for t in topics], dtype=object)
+        self.topic_model = None
+        if len(set(topic_targets)) > 1:
+            self.topic_model = LogisticRegression(max_iter=1000, C=10.0)
+            self.topic_model.fit(features, topic_targets)
+        self.trained_rows = len(texts)
+        return self
+
+    def predict(self, texts) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Labels the comments in bulk.
+
+        :param texts: comments.
+        :return: (sentiments, topics, confidence), where confidence is the lower
+                 of the sentiment and topic probabilities.
+        """
+        if self.vectorizer is None:
+            raise RuntimeError("O classificador local não foi treinado.")
+        features = self.vectorizer.transform(list(texts))
+
+        sentiment_proba = self.sentiment_model.predict_proba(features)
+        sentiments = self.sentiment_model.classes_[sentiment_proba.argmax(axis=1)]
+        confidence = sentiment_proba.max(axis=1)
+
+        if self.topic_model is None:
+            return sentiments, np.full(len(sentiments), "", dtype=object), np.zeros(len(sentiments))
+        topic_proba = self.topic_model.predict_proba(features)
+        topics = self.topic_model.classes_[topic_proba.argmax(axis=1)]
+        topic_confidence = np.where(topics == "", 0.0, topic_proba.max(axis=1))
+        return sentiments, topics, np.minimum(confidence, topic_confidence)
+
+    def triage(self, texts: list[str], threshold: float | None = None) -> tuple[dict, list[str]]:
+        """
+        Splits the comments between the local tier and the LLM.
+
+        :param texts: unique comments.
+        :param threshold: confidence threshold (default: self.confidence_threshold).
+        :return: ({comment: {"sentimento", "topico"}} accepted locally,
+                  comments to send to the LLM).
+        """
+        if not texts:
+            return {}, []
+        threshold = self.confidence_threshold if threshold is None else threshold
+        sentiments, topics, confidence = self.predict(texts)
+        accepted, escalated = {}, []
+        for text, sentiment, topic, score in zip(texts, sentiments, topics, confidence):
+            if score >= threshold:
+                accepted[text] = {"sentimento": sentiment, "topico": topic}
+            else:
+                escalated.append(text)
+        return accepted, escalated
+
+    # ===== PERSISTÊNCIA =====
+    def save(self, path: str):
+        """Writes the trained models with joblib (atomic replace)."""
+        import joblib
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        joblib.dump({"version": MODEL_VERSION, "classifier": self}, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, confidence_threshold: float | None = None) -> "LocalClassifier | None":
+        """
+        Loads a classifier saved with save (None if the file does not exist).
+
+        :param path: model file.
+        :param confidence_threshold: overrides the saved threshold.
+        :raises ValueError: if the file was written by an incompatible version.
+        """
+        import joblib
+
+        if not os.path.exists(path):
+            return None
+        payload = joblib.load(path)
+        if payload.get("version") != MODEL_VERSION:
+            raise ValueError(f"Versão do modelo local incompatível: {payload.get('version')}")
+        classifier = payload["classifier"]
+        if confidence_threshold is not None:
+            classifier.confidence_threshold = confidence_threshold
+        return classifier
+
+
+# ===== CONCORDÂNCIA COM O LLM =====
+def agreement_report(classifier: LocalClassifier, texts, sentiments, topics,
+                     thresholds=(0.5, 0.7, 0.8, 0.9, 0.95)) -> dict:
+    """
+    Compares the local predictions with the LLM labels of held-out rows.
+
+    For each threshold: coverage (share labelled locally, i.e. chat calls
+    saved), sentiment/topic agreement on the locally labelled rows and the
+    overall agreement of the tiered output (escalated rows get the LLM label).
+
+    :param classifier: trained LocalClassifier.
+    :param texts: held-out comments.
+    :param sentiments: their LLM sentiment labels.
+    :param topics: their LLM topic labels.
+    :param thresholds: confidence thresholds to evaluate.
+    :return: {"rows", "rows_per_second", "sentiment_agreement", "by_threshold": [...]}.
+    """
+    texts, sentiments, topics = list(texts), np.asarray(sentiments), np.asarray(topics)
+    start = time.perf_counter()
+    predicted_sentiments, predicted_topics, confidence = classifier.predict(texts)
+    elapsed = time.perf_counter() - start
+
+    sentiment_match = predicted_sentiments == sentiments
+    both_match = sentiment_match & (predicted_topics == topics)
+    by_threshold = []
+    for threshold in thresholds:
+        local = confidence >= threshold
+        n_local = int(local.sum())
+        by_threshold.append({
+            "threshold": threshold,
+            "coverage": n_local / len(texts) if texts else 0.0,
+            "sentiment_agreement_local": float(sentiment_match[local].mean()) if n_local else None,
+            "label_agreement_local": float(both_match[local].mean()) if n_local else None,
+            "sentiment_agreement_overall": float((sentiment_match | ~local).mean()) if texts else None,
+        })
+    return {
+        "rows": len(texts),
+        "rows_per_second": len(texts) / elapsed if elapsed > 0 else float("inf"),
+        "sentiment_agreement": float(sentiment_match.mean()) if texts else None,
+        "by_threshold": by_threshold,
+    }
+
+
+def _percent(value: float | None) -> str:
+    return "-" if value is None else f"{value:.1%}"
+
+
+def format_agreement_report(report: dict) -> str:
+    """Human-readable table of agreement_report."""
+    lines = [f"{report['rows']} linhas avaliadas | {report['rows_per_second']:,.0f} linhas/s | "
+             f"concordância de sentimento (sem limiar): {report['sentiment_agreement']:.1%}",
+             f"{'limiar':>7} {'local':>7} {'sent. local':>12} {'sent.+tópico':>13} {'sent. final':>12}"]
+    for row in report["by_threshold"]:
+        lines.append(f"{row['threshold']:>7.2f} {row['coverage']:>7.1%} "
+                     f"{_percent(row['sentiment_agreement_local']):>12} "
+                     f"{_percent(row['label_agreement_local']):>13} "
+                     f"{_percent(row['sentiment_agreement_overall']):>12}")
+    return "\n".join(lines)
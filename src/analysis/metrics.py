@@ -1,27 +1,23 @@
 # === CALCULO DE KPIs PARA DASHBOARDS ===
+import json
+import os
+from collections import Counter
 import pandas as pd
+from src.analysis.aggregates import sentiment_counts, SUPPLIER_COLUMNS, AGGREGATES_PATH
 
-def calculate_kpis(df_enriched: pd.DataFrame) -> dict:
+KPI_STATE_PATH = "data/processed/kpi_state.json"
+
+def kpis_from_counts(counts) -> dict:
     """
-    Computes the main KPIs from the enriched DataFrame and
-    returns a dictionary containing the KPIs.
-    :param df_enriched: Embedding enriched DataFrame.
+    Builds the KPI dictionary from a sentiment -> count mapping.
+    :param counts: Mapping (dict, Counter or Series) of feedback counts per sentiment.
     :return: dict object: KPI dictionary.
     """
-    if df_enriched.empty:
-        return {
-            "total_feedbacks": 0,
-            "count_positivo": 0,
-            "count_negativo": 0,
-            "count_misto": 0,
-            "pct_positivo": 0
-        }
-
     # Computa as contagens
-    total_feedbacks = len(df_enriched)
-    count_positivo = len(df_enriched[df_enriched['sentimento'] == 'Positivo'])
-    count_negativo = len(df_enriched[df_enriched['sentimento'] == 'Negativo'])
-    count_misto = len(df_enriched[df_enriched['sentimento'] == 'Misto'])
+    total_feedbacks = int(sum(counts.values()) if isinstance(counts, dict) else counts.sum())
+    count_positivo = int(counts.get('Positivo', 0))
+    count_negativo = int(counts.get('Negativo', 0))
+    count_misto = int(counts.get('Misto', 0))
 
     # Computa o %
     if total_feedbacks > 0:
@@ -38,3 +34,231 @@ def calculate_kpis(df_enriched: pd.DataFrame) -> dict:
         "pct_positivo": pct_positivo,
     }
 
+def calculate_kpis(cube: pd.DataFrame) -> dict:
+    """
+    Computes the main KPIs from the aggregate cube and
+    returns a dictionary containing the KPIs.
+    :param cube: Aggregate cube (see src/analysis/aggregates.py).
+    :return: dict object: KPI dictionary.
+    """
+    if cube.empty:
+        return kpis_from_counts({})
+
+    # Uma única passada pelo cubo
+    return kpis_from_counts(sentiment_counts(cube))
+
+
+# === ACUMULADOR INCREMENTAL DE KPIs ===
+class KPIAccumulator:
+    """
+    Stateful KPI engine: applies added, updated and removed enriched records
+    in O(1) each and exposes the same dict calculate_kpis returns, plus the
+    same KPIs per supplier under "by_supplier".
+
+    With track_records=False only the counters are kept (memory and state
+    size bounded by the number of suppliers): records can only be added, and
+    a repeated ID_Evento is counted again.
+    """
+
+    STATE_VERSION = 1
+
+    def __init__(self, track_records: bool = True):
+        self.track_records = track_records
+        self.counts = Counter()
+        # {tipo: {fornecedor: Counter(sentimento -> contagem)}}
+        self.supplier_counts = {supplier_type: {} for supplier_type in SUPPLIER_COLUMNS}
+        # ID_Evento -> [sentimento, fornecedor por tipo...] (necessário para update/remove)
+        self.records = {}
+        # Informações do dono do estado salvas junto (ex.: até onde a saída do streaming foi contada)
+        self.meta = {}
+
+    @classmethod
+    def from_frame(cls, df_enriched: pd.DataFrame) -> "KPIAccumulator":
+        """
+        Builds the accumulator from an enriched DataFrame (initial load).
+        :param df_enriched: Enriched DataFrame.
+        """
+        accumulator = cls()
+        if df_enriched.empty:
+            return accumulator
+        # Carga vetorizada (o caminho registro a registro fica para as mudanças)
+        sentiments = df_enriched['sentimento'].fillna("Falha").astype(object)
+        suppliers = [
+            df_enriched[col_name].astype(object).where(df_enriched[col_name].notna(), None)
+            if col_name in df_enriched else pd.Series(None, index=df_enriched.index, dtype=object)
+            for col_name in SUPPLIER_COLUMNS.values()
+        ]
+        keys = df_enriched['ID_Evento'].astype(str)
+        accumulator.records = {key: list(entry) for key, *entry in zip(keys, sentiments, *suppliers)}
+        if len(accumulator.records) < len(df_enriched):
+            # IDs repetidos: a última versão vale (mesma semântica do add)
+            return accumulator._recount()
+        accumulator.counts = Counter({k: int(v) for k, v in sentiments.value_counts().items()})
+        for supplier_type, supplier_column in zip(SUPPLIER_COLUMNS, suppliers):
+            grouped = pd.DataFrame({"s": supplier_column, "v": sentiments}).dropna(subset=["s"])
+            for (supplier, sentiment), count in grouped.groupby(["s", "v"]).size().items():
+                accumulator.supplier_counts[supplier_type].setdefault(supplier, Counter())[sentiment] = int(count)
+        return accumulator
+
+    def _recount(self) -> "KPIAccumulator":
+        """Recomputes the counters from the stored records."""
+        self.counts = Counter()
+        self.supplier_counts = {supplier_type: {} for supplier_type in SUPPLIER_COLUMNS}
+        for entry in self.records.values():
+            self._apply(entry, +1)
+        return self
+
+    @staticmethod
+    def _key(record: dict) -> str:
+        return str(record['ID_Evento'])
+
+    @staticmethod
+    def _entry(record: dict) -> list:
+        suppliers = [record.get(col_name) for col_name in SUPPLIER_COLUMNS.values()]
+        sentiment = record.get('sentimento')
+        # Sem sentimento = falha de análise (mesmo padrão do pipeline)
+        sentiment = "Falha" if sentiment is None or pd.isna(sentiment) else sentiment
+        return [sentiment] + [None if pd.isna(s) else s for s in suppliers]
+
+    def _apply(self, entry: list, delta: int):
+        sentiment = entry[0]
+        self.counts[sentiment] += delta
+        if not self.counts[sentiment]:
+            del self.counts[sentiment]
+        for supplier_type, supplier in zip(SUPPLIER_COLUMNS, entry[1:]):
+            if supplier is None:
+                continue
+            supplier_counter = self.supplier_counts[supplier_type].setdefault(supplier, Counter())
+            supplier_counter[sentiment] += delta
+            if not supplier_counter[sentiment]:
+                del supplier_counter[sentiment]
+            if not supplier_counter:
+                del self.supplier_counts[supplier_type][supplier]
+
+    def add(self, record: dict):
+        """
+        Adds one enriched record. A record whose ID_Evento is already known
+        replaces the previous version (same as update).
+        :param record: dict with ID_Evento, sentimento and the supplier columns.
+        """
+        entry = self._entry(record)
+        if self.track_records:
+            key = self._key(record)
+            if key in self.records:
+                self._apply(self.records[key], -1)
+            self.records[key] = entry
+        self._apply(entry, +1)
+
+    def update(self, record: dict):
+        """
+        Replaces a previously added record (matched by ID_Evento).
+        :param record: new version of the record.
+        :raises ValueError: if the accumulator does not track records.
+        """
+        if not self.track_records:
+            raise ValueError("KPIAccumulator sem registros (track_records=False) só aceita adições.")
+        self.add(record)
+
+    def remove(self, event_id) -> bool:
+        """
+        Removes a record.
+        :param event_id: ID_Evento of the record.
+        :return: False if the record was unknown.
+        :raises ValueError: if the accumulator does not track records.
+        """
+        if not self.track_records:
+            raise ValueError("KPIAccumulator sem registros (track_records=False) só aceita adições.")
+        entry = self.records.pop(str(event_id), None)
+        if entry is None:
+            return False
+        self._apply(entry, -1)
+        return True
+
+    def apply_batch(self, added=None, updated=None, removed=None):
+        """
+        Applies a micro-batch of changes.
+        :param added: records (list of dicts or DataFrame) to add.
+        :param updated: records (list of dicts or DataFrame) to replace.
+        :param removed: ID_Evento values to remove.
+        """
+        for records, apply in ((added, self.add), (updated, self.update)):
+            if records is None:
+                continue
+            if isinstance(records, pd.DataFrame):
+                columns = ['ID_Evento', 'sentimento'] + [c for c in SUPPLIER_COLUMNS.values() if c in records]
+                records = records[columns].to_dict('records')
+            for record in records:
+                apply(record)
+        for event_id in removed or ():
+            self.remove(event_id)
+
+    def kpis(self) -> dict:
+        """
+        :return: calculate_kpis dict + "by_supplier": {tipo: {fornecedor: KPIs}}.
+        """
+        result = kpis_from_counts(self.counts)
+        result["by_supplier"] = {
+            supplier_type: {supplier: kpis_from_counts(counter) for supplier, counter in sorted(suppliers.items())}
+            for supplier_type, suppliers in self.supplier_counts.items()
+        }
+        return result
+
+    def to_dict(self) -> dict:
+        """Serializable (JSON) state."""
+        return {
+            "version": self.STATE_VERSION,
+            "supplier_types": list(SUPPLIER_COLUMNS),
+            "counts": dict(self.counts),
+            "supplier_counts": {t: {s: dict(c) for s, c in suppliers.items()}
+                                for t, suppliers in self.supplier_counts.items()},
+            "track_records": self.track_records,
+            "records": self.records,
+            "meta": self.meta,
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "KPIAccumulator":
+        """
+        Restores an accumulator saved with to_dict (no history replay).
+        :raises ValueError: if the state was written by an incompatible version.
+        """
+        if state.get("version") != cls.STATE_VERSION or state.get("supplier_types") != list(SUPPLIER_COLUMNS):
+            raise ValueError("Estado do KPIAccumulator incompatível com esta versão.")
+        accumulator = cls(track_records=state.get("track_records", True))
+        accumulator.meta = state.get("meta") or {}
+        accumulator.counts = Counter(state["counts"])
+        for supplier_type, suppliers in state["supplier_counts"].items():
+            accumulator.supplier_counts[supplier_type] = {s: Counter(c) for s, c in suppliers.items()}
+        accumulator.records = {key: list(entry) for key, entry in state["records"].items()}
+        return accumulator
+
+    def save(self, path: str):
+        """Writes the state as JSON (atomic rename)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "KPIAccumulator":
+        """Reads a state written by save."""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def load_live_kpis(path: str = KPI_STATE_PATH, aggregates_path: str = AGGREGATES_PATH) -> dict | None:
+    """
+    KPIs of a pipeline run in progress: the accumulator state written by the
+    streaming pipeline, when it is newer than the aggregate cube.
+    :return: KPIAccumulator.kpis() dict, or None when the cube is up to date.
+    """
+    if not os.path.exists(path):
+        return None
+    if os.path.exists(aggregates_path) and os.path.getmtime(aggregates_path) >= os.path.getmtime(path):
+        return None
+    try:
+        return KPIAccumulator.load(path).kpis()
+    except (OSError, ValueError, KeyError):
+        # Arquivo incompatível ou sendo trocado: o dashboard usa o cubo
+        return None
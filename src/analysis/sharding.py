@@ -0,0 +1,229 @@
+# ===== PIPELINE EM SHARDS (VÁRIOS PROCESSOS OU MÁQUINAS) =====
+# O CSV bruto é dividido por um hash estável do ID_Evento em N shards; cada
+# shard é enriquecido por um processo independente (com checkpoint próprio) e
+# os arquivos parciais são intercalados de volta na ordem original, conferindo
+# que nenhuma linha foi perdida ou duplicada.
+import heapq
+import json
+import os
+import zlib
+import pandas as pd
+
+from src.ingestion.data_loader import iter_csv_chunks
+from src.analysis.streaming import run_streaming_pipeline, read_checkpoint
+from src.analysis.cache import EnrichmentCache
+from src.monitoring.instrumentation import load_snapshot
+
+ID_COLUMN = "ID_Evento"
+
+# Posição da linha no CSV original (usada no merge e removida da saída final)
+ROW_COLUMN = "_linha"
+
+MANIFEST_NAME = "manifest.json"
+
+
+# ===== CAMINHOS =====
+def shard_csv_path(shards_dir: str, shard: int) -> str:
+    return os.path.join(shards_dir, f"shard-{shard:03d}.csv")
+
+
+def part_path(shards_dir: str, shard: int) -> str:
+    return os.path.join(shards_dir, f"part-{shard:03d}.jsonl")
+
+
+def done_path(shards_dir: str, shard: int) -> str:
+    return f"{part_path(shards_dir, shard)}.done.json"
+
+
+def log_path(shards_dir: str, shard: int) -> str:
+    return os.path.join(shards_dir, f"shard-{shard:03d}.log")
+
+
+def metrics_path(shards_dir: str, shard: int) -> str:
+    return os.path.join(shards_dir, f"shard-{shard:03d}.metrics.json")
+
+
+def _write_json(path: str, payload: dict):
+    """Atomically replaces a small JSON file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_manifest(shards_dir: str) -> dict | None:
+    path = os.path.join(shards_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _source_version(csv_path: str) -> list:
+    stat = os.stat(csv_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+# ===== DIVISÃO =====
+def shard_of(ids: pd.Series, n_shards: int) -> pd.Series:
+    """
+    Stable shard of each id (CRC32 of its text form), identical across
+    processes, machines and Python/pandas versions.
+
+    :param ids: ID_Evento values.
+    :param n_shards: number of shards.
+    :return: shard index (0..n_shards-1) of each id.
+    """
+    return ids.astype(str).map(lambda value: zlib.crc32(value.encode("utf-8")) % n_shards)
+
+
+def split_csv(csv_path: str, shards_dir: str, n_shards: int, chunk_size: int = 50000) -> dict:
+    """
+    Splits the raw CSV into n_shards CSV files, reading it in chunks. Each
+    row keeps its original position in the ROW_COLUMN column. Any previous
+    shard files, parts and checkpoints in shards_dir are removed.
+
+    :param csv_path: raw CSV path.
+    :param shards_dir: directory of the shard files.
+    :param n_shards: number of shards.
+    :param chunk_size: rows read per chunk.
+    :return: the manifest (also written to shards_dir/manifest.json).
+    """
+    os.makedirs(shards_dir, exist_ok=True)
+    for name in os.listdir(shards_dir):
+        if name.startswith(("shard-", "part-")) or name == MANIFEST_NAME:
+            os.remove(os.path.join(shards_dir, name))
+
+    shard_rows, rows, columns = [0] * n_shards, 0, None
+    for chunk in iter_csv_chunks(csv_path, chunk_size):
+        chunk.insert(0, ROW_COLUMN, range(rows, rows + len(chunk)))
+        columns = list(chunk.columns)
+        rows += len(chunk)
+        for shard, part in chunk.groupby(shard_of(chunk[ID_COLUMN], n_shards), sort=False):
+            path = shard_csv_path(shards_dir, shard)
+            part.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+            shard_rows[shard] += len(part)
+
+    # Shards sem nenhuma linha também ganham um arquivo (só o cabeçalho)
+    for shard in range(n_shards):
+        path = shard_csv_path(shards_dir, shard)
+        if not os.path.exists(path):
+            pd.DataFrame(columns=columns or [ROW_COLUMN]).to_csv(path, index=False)
+
+    manifest = {"source": csv_path, "source_version": _source_version(csv_path), "n_shards": n_shards,
+                "rows": rows, "shard_rows": shard_rows}
+    _write_json(os.path.join(shards_dir, MANIFEST_NAME), manifest)
+    print(f"INFO: {rows} linhas divididas em {n_shards} shards: {shard_rows}")
+    return manifest
+
+
+def manifest_matches(manifest: dict | None, csv_path: str, n_shards: int) -> bool:
+    """True if the shards were split from the current version of csv_path into n_shards."""
+    return (manifest is not None and manifest["n_shards"] == n_shards
+            and manifest["source"] == csv_path and manifest["source_version"] == _source_version(csv_path))
+
+
+# ===== EXECUÇÃO DE UM SHARD =====
+def run_shard(shards_dir: str, shard: int, api_key: str, chunk_size: int,
+              cache: EnrichmentCache | None = None, **pipeline_kwargs) -> int:
+    """
+    Enriches one shard into its part file with the streaming pipeline: a
+    rerun after a failure resumes from the shard's own checkpoint. A done
+    marker is written once the whole shard is in the part file.
+
+    :param shards_dir: directory of the shard files.
+    :param shard: shard index.
+    :param api_key: OpenAI API key.
+    :param chunk_size: rows per chunk.
+    :param cache: optional EnrichmentCache (may be shared by all workers).
+    :param pipeline_kwargs: extra arguments for run_ai_pipeline (engine, base_url, rate_share...).
+    :return: rows in the part file.
+    :raises RuntimeError: if the part file does not hold every row of the shard.
+    """
+    manifest = read_manifest(shards_dir)
+    expected = manifest["shard_rows"][shard]
+    if os.path.exists(done_path(shards_dir, shard)):
+        print(f"INFO: Shard {shard} já concluído.")
+        return expected
+
+    rows = run_streaming_pipeline(shard_csv_path(shards_dir, shard), part_path(shards_dir, shard),
+                                  api_key, chunk_size, cache=cache, **pipeline_kwargs)
+    if rows != expected:
+        raise RuntimeError(f"Shard {shard}: {rows} linhas na saída, {expected} esperadas.")
+    _write_json(done_path(shards_dir, shard), {"rows": rows})
+    return rows
+
+
+def shard_status(shards_dir: str) -> list[dict]:
+    """
+    Progress of every shard, read from the done markers and checkpoints
+    (works while the workers are running, from any process).
+
+    :return: [{"shard", "rows", "rows_done", "done"}].
+    """
+    manifest = read_manifest(shards_dir)
+    if manifest is None:
+        return []
+    status = []
+    for shard, rows in enumerate(manifest["shard_rows"]):
+        done = os.path.exists(done_path(shards_dir, shard))
+        checkpoint = None if done else read_checkpoint(part_path(shards_dir, shard))
+        rows_done = rows if done else (checkpoint["rows_done"] if checkpoint else 0)
+        status.append({"shard": shard, "rows": rows, "rows_done": rows_done, "done": done})
+    return status
+
+
+def shard_metrics(shards_dir: str) -> list[dict]:
+    """Metrics snapshots saved by the shard workers (one per shard that has started)."""
+    manifest = read_manifest(shards_dir)
+    if manifest is None:
+        return []
+    snapshots = (load_snapshot(metrics_path(shards_dir, shard)) for shard in range(manifest["n_shards"]))
+    return [snapshot for snapshot in snapshots if snapshot is not None]
+
+
+# ===== MERGE =====
+def _part_records(path: str):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record[ROW_COLUMN], record
+
+
+def merge_parts(shards_dir: str, output_path: str) -> int:
+    """
+    Interleaves the part files back into the original row order (k-way
+    merge, constant memory) and writes the final JSONL output without the
+    ROW_COLUMN column. The output only replaces output_path if every row
+    of the source appears exactly once.
+
+    :param shards_dir: directory of the shard files.
+    :param output_path: final JSONL path.
+    :return: rows written.
+    :raises RuntimeError: if a shard is not finished or rows are missing/duplicated.
+    """
+    manifest = read_manifest(shards_dir)
+    pending = [s["shard"] for s in shard_status(shards_dir) if not s["done"]]
+    if pending:
+        raise RuntimeError(f"Shards não concluídos: {pending}")
+
+    parts = [_part_records(part_path(shards_dir, shard)) for shard in range(manifest["n_shards"])]
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    expected = 0
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        for row, record in heapq.merge(*parts, key=lambda item: item[0]):
+            if row != expected:
+                os.remove(tmp_path)
+                problem = "duplicada" if row < expected else f"ausente (próxima encontrada: {row})"
+                raise RuntimeError(f"Merge inválido: linha {min(row, expected)} {problem}.")
+            del record[ROW_COLUMN]
+            out.write(json.dumps(record, ensure_ascii=True, separators=(",", ":")) + "\n")
+            expected += 1
+    if expected != manifest["rows"]:
+        os.remove(tmp_path)
+        raise RuntimeError(f"Merge inválido: {expected} linhas nos shards, {manifest['rows']} no CSV.")
+    os.replace(tmp_path, output_path)
+    print(f"INFO: {expected} linhas de {manifest['n_shards']} shards intercaladas em {output_path}.")
+    return expected
@@ -0,0 +1,140 @@
+# ===== PIPELINE EM STREAMING (MEMÓRIA CONSTANTE E RETOMÁVEL) =====
+import io
+import json
+import os
+import pandas as pd
+
+from src.ingestion.data_loader import iter_csv_chunks
+from src.analysis.analyzer import run_ai_pipeline, build_async_engine, PIPELINE_ENGINE
+from src.analysis.cache import EnrichmentCache
+from src.analysis.metrics import KPIAccumulator
+
+
+def checkpoint_path_for(output_path: str) -> str:
+    return f"{output_path}.checkpoint.json"
+
+
+def read_checkpoint(output_path: str) -> dict | None:
+    """
+    Reads the checkpoint of a previous streaming run.
+
+    :param output_path: JSONL output path.
+    :return: {"rows_done", "output_bytes"} or None if there is no checkpoint.
+    """
+    path = checkpoint_path_for(output_path)
+    if not os.path.exists(path) or not os.path.exists(output_path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def write_checkpoint(output_path: str, rows_done: int, output_bytes: int):
+    """Atomically replaces the checkpoint file."""
+    path = checkpoint_path_for(output_path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"rows_done": rows_done, "output_bytes": output_bytes}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _count_output(kpis: KPIAccumulator, output_path: str, start: int, end: int, chunk_size: int):
+    """Adds the JSONL records between two byte offsets of the output to the accumulator."""
+    if end <= start:
+        return
+    with open(output_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    for chunk in pd.read_json(io.BytesIO(data), lines=True, chunksize=chunk_size):
+        kpis.apply_batch(added=chunk)
+
+
+def open_streaming_kpis(kpi_state_path: str, output_path: str, output_bytes: int, resume: bool,
+                        chunk_size: int) -> KPIAccumulator:
+    """
+    Opens the counts-only KPI state of a streaming run. The state records how
+    many bytes of the output it has counted; on resume, the rows written after
+    that (at most the last chunk, when the process died between the
+    checkpoint and the state) are counted from the output.
+    """
+    kpis, counted = KPIAccumulator(track_records=False), 0
+    if resume and os.path.exists(kpi_state_path):
+        try:
+            state = KPIAccumulator.load(kpi_state_path)
+            if state.meta.get("output_path") == output_path and state.meta.get("output_bytes", -1) <= output_bytes:
+                kpis, counted = state, state.meta["output_bytes"]
+        except (ValueError, KeyError):
+            pass
+    _count_output(kpis, output_path, counted, output_bytes, chunk_size)
+    return kpis
+
+
+def run_streaming_pipeline(csv_path: str, output_path: str, api_key: str, chunk_size: int,
+                           cache: EnrichmentCache | None = None, restart: bool = False,
+                           kpi_state_path: str | None = None, **pipeline_kwargs) -> int:
+    """
+    Enriches the CSV chunk by chunk, appending each finished chunk to the
+    JSONL output in the original order and checkpointing after every chunk.
+    Peak memory is bounded by the chunk size. A rerun resumes after the
+    last checkpointed row, discarding any partially written chunk.
+
+    :param csv_path: raw CSV path.
+    :param output_path: JSONL output path.
+    :param api_key: OpenAI API key.
+    :param chunk_size: rows per chunk.
+    :param cache: optional EnrichmentCache.
+    :param restart: ignore an existing checkpoint and start from scratch.
+    :param kpi_state_path: optional KPIAccumulator state file with the live
+                           KPIs, updated after every chunk (counters only, so
+                           saving it costs the same at any size; a final exact
+                           state is built from the full output afterwards).
+    :param pipeline_kwargs: extra arguments for run_ai_pipeline (engine, base_url, rate_share...).
+                            With the async engine, one engine is shared by all
+                            chunks so the requests/tokens per minute limits
+                            hold over the whole run.
+    :return: total number of rows in the output.
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    if pipeline_kwargs.get("engine", PIPELINE_ENGINE) == "async" and pipeline_kwargs.get("async_engine") is None:
+        pipeline_kwargs["async_engine"] = build_async_engine(api_key, pipeline_kwargs.get("base_url"),
+                                                             pipeline_kwargs.get("rate_share", 1.0))
+
+    checkpoint = None if restart else read_checkpoint(output_path)
+    rows_done = checkpoint["rows_done"] if checkpoint else 0
+    output_bytes = checkpoint["output_bytes"] if checkpoint else 0
+
+    if checkpoint:
+        print(f"INFO: Retomando do checkpoint: {rows_done} linhas já processadas.")
+
+    # Descarta o que foi escrito depois do último checkpoint
+    with open(output_path, 'a+b') as out:
+        out.truncate(output_bytes)
+
+    kpis = None
+    if kpi_state_path:
+        kpis = open_streaming_kpis(kpi_state_path, output_path, output_bytes, bool(checkpoint), chunk_size)
+
+    for chunk in iter_csv_chunks(csv_path, chunk_size, skip_rows=rows_done):
+        print(f"INFO: Processando linhas {rows_done} a {rows_done + len(chunk) - 1}...")
+        df_enriched = run_ai_pipeline(chunk, api_key, cache=cache, **pipeline_kwargs)
+
+        lines = df_enriched.to_json(orient='records', lines=True, force_ascii=True)
+        if not lines.endswith("\n"):
+            lines += "\n"
+        with open(output_path, 'ab') as out:
+            out.write(lines.encode("utf-8"))
+            out.flush()
+            os.fsync(out.fileno())
+            output_bytes = out.tell()
+
+        rows_done += len(chunk)
+        write_checkpoint(output_path, rows_done, output_bytes)
+        if kpis is not None:
+            # Depois do checkpoint: se o processo cair antes, o bloco é contado na retomada
+            kpis.apply_batch(added=df_enriched)
+            kpis.meta = {"output_path": output_path, "output_bytes": output_bytes}
+            kpis.save(kpi_state_path)
+
+    print(f"INFO: Streaming concluído. {rows_done} linhas em {output_path}.")
+    return rows_done
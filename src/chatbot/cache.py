@@ -0,0 +1,114 @@
+# src/chatbot/cache.py
+# Caches do ManualRAGBot:
+# 1. LRU exato (texto da pergunta -> embedding)
+# 2. cache semântico de respostas (perguntas com embedding próximo reutilizam a resposta)
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    """Chave do cache exato: minúsculas e espaços colapsados."""
+    return " ".join(query.lower().split())
+
+
+class TTLLRUCache:
+    """LRU com tamanho máximo e tempo de vida (TTL) por entrada. Thread-safe."""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time.monotonic() - entry[1] > self.ttl_seconds:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SemanticAnswerCache:
+    """
+    Cache de respostas indexado pelo embedding da pergunta. Uma pergunta nova
+    reutiliza a resposta de uma pergunta anterior se a similaridade de cosseno
+    for >= threshold e os filtros extraídos (fornecedor/sentimento) forem os
+    mesmos. LRU com tamanho máximo e TTL. Thread-safe.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, threshold: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        # chave -> (embedding normalizado, chave do filtro, resposta, timestamp)
+        self._entries = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def get(self, embedding, filter_key: str = ""):
+        """
+        :return: (resposta, similaridade) da entrada mais próxima, ou None.
+        """
+        query = self._normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, e in self._entries.items() if now - e[3] > self.ttl_seconds]
+            for k in expired:
+                del self._entries[k]
+
+            candidates = [(k, e) for k, e in self._entries.items() if e[1] == filter_key]
+            if candidates:
+                scores = np.stack([e[0] for _, e in candidates]) @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[2], float(scores[best])
+            self.misses += 1
+            return None
+
+    def put(self, embedding, answer: str, filter_key: str = ""):
+        with self._lock:
+            self._entries[self._next_key] = (self._normalize(embedding), filter_key, answer, time.monotonic())
+            self._next_key += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
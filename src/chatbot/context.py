@@ -0,0 +1,156 @@
+# src/chatbot/context.py
+# Montagem do contexto do prompt do RAG: dos candidatos recuperados, escolhe
+# trechos relevantes e diferentes entre si (MMR, com quase-duplicatas
+# descartadas) até um orçamento de tokens, cada um com fornecedores e data
+# em um prefixo curto. Os tokens são contados localmente (tiktoken, se
+# instalado; senão a estimativa de ~4 caracteres por token do pipeline).
+from dataclasses import dataclass, field
+from functools import lru_cache
+from src.analysis.batching import estimate_tokens
+from src.analysis.dedup import normalize_comment, SHINGLE_SIZE
+
+# Metadados que entram no prefixo de cada trecho, na ordem
+METADATA_COLUMNS = ("ID_Fornecedor_DJ", "ID_Fornecedor_Buffet", "Data_Evento")
+
+TRUNCATION_MARK = "…"
+
+
+@lru_cache(maxsize=None)
+def _encoder(model: str):
+    """Codificador do tiktoken para o modelo (None se o tiktoken não estiver disponível)."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # Sem acesso aos arquivos do tokenizador (ex.: máquina offline)
+        return None
+
+
+def count_tokens(text: str, model: str = "") -> int:
+    """Tokens do texto: exatos com o tiktoken, senão estimados."""
+    encoder = _encoder(model)
+    if encoder is None:
+        return estimate_tokens(text)
+    return len(encoder.encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "") -> str:
+    """Corta o texto em max_tokens tokens (no fim de uma palavra, quando estimado)."""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    encoder = _encoder(model)
+    if encoder is not None:
+        return encoder.decode(encoder.encode(text)[:max(0, max_tokens - 1)]).rstrip() + TRUNCATION_MARK
+    cut = text[:max(0, (max_tokens - 1) * 4)]
+    if " " in cut:
+        cut = cut[:cut.rindex(" ")]
+    return cut.rstrip() + TRUNCATION_MARK
+
+
+def _shingles(text: str) -> set:
+    text = normalize_comment(text)
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def format_metadata(metadata: dict) -> str:
+    """Prefixo compacto do trecho: "[DJ C · Buffet X · 2024-03-05] "."""
+    values = []
+    for col in METADATA_COLUMNS:
+        value = metadata.get(col)
+        if value is None or value != value:  # None ou NaN
+            continue
+        value = str(value)
+        values.append(value[:10] if col == "Data_Evento" else value.replace("_", " "))
+    return f"[{' · '.join(values)}] " if values else ""
+
+
+@dataclass
+class ContextPack:
+    """
+    Trechos escolhidos para o prompt. duplicates conta os candidatos
+    descartados como quase-duplicatas; dropped, os que não couberam no
+    orçamento ou no limite de trechos.
+    """
+    snippets: list[str] = field(default_factory=list)
+    tokens: int = 0
+    candidates: int = 0
+    duplicates: int = 0
+    dropped: int = 0
+    truncated: int = 0
+
+
+def build_context(hits: list[dict], token_budget: int, max_snippets: int = 6, mmr_lambda: float = 0.7,
+                  duplicate_threshold: float = 0.8, min_snippet_tokens: int = 30, max_snippet_tokens: int = 120,
+                  with_metadata: bool = True, model: str = "") -> ContextPack:
+    """
+    Escolhe os trechos do contexto por Maximal Marginal Relevance: a cada
+    passo, o candidato com maior mmr_lambda * relevância - (1 - mmr_lambda) *
+    similaridade com os já escolhidos. Candidatos com similaridade >=
+    duplicate_threshold com um escolhido são descartados. Cada trecho tem no
+    máximo max_snippet_tokens tokens e eles entram enquanto couberem no
+    orçamento; o último é cortado se sobrarem ao menos min_snippet_tokens.
+
+    :param hits: candidatos recuperados ({"document", "metadata", "score"}), do melhor para o pior.
+    :param token_budget: máximo de tokens do contexto (os trechos juntos).
+    :param max_snippets: máximo de trechos.
+    :param mmr_lambda: peso da relevância frente à diversidade (1 = só relevância).
+    :param duplicate_threshold: similaridade (Jaccard de 5-gramas) a partir da qual é duplicata.
+    :param min_snippet_tokens: menor trecho cortado que vale a pena incluir.
+    :param max_snippet_tokens: tamanho máximo de um trecho (comentários longos são cortados).
+    :param with_metadata: prefixa cada trecho com fornecedores e data.
+    :param model: modelo de chat (escolhe o tokenizador do tiktoken).
+    :return: ContextPack.
+    """
+    pack = ContextPack(candidates=len(hits))
+    if not hits:
+        return pack
+
+    # Relevância normalizada em [0, 1] (os backends usam escalas diferentes de score)
+    scores = [float(hit.get("score", 0.0)) for hit in hits]
+    low, high = min(scores), max(scores)
+    if high > low:
+        relevance = [(s - low) / (high - low) for s in scores]
+    else:
+        relevance = [1 - i / len(hits) for i in range(len(hits))]
+    shingles = [_shingles(hit["document"]) for hit in hits]
+
+    remaining = list(range(len(hits)))
+    max_similarity = [0.0] * len(hits)
+    while remaining and len(pack.snippets) < max_snippets:
+        best = max(remaining, key=lambda i: mmr_lambda * relevance[i] - (1 - mmr_lambda) * max_similarity[i])
+        remaining.remove(best)
+        if max_similarity[best] >= duplicate_threshold:
+            pack.duplicates += 1
+            continue
+
+        prefix = format_metadata(hits[best].get("metadata") or {}) if with_metadata else ""
+        snippet = prefix + hits[best]["document"]
+        available = min(max_snippet_tokens, token_budget - pack.tokens - (2 if pack.snippets else 0))  # "\n\n"
+        tokens = count_tokens(snippet, model)
+        if tokens > available:
+            if available < min_snippet_tokens:
+                pack.dropped += 1
+                continue
+            snippet = truncate_to_tokens(snippet, available, model)
+            tokens = count_tokens(snippet, model)
+            pack.truncated += 1
+
+        pack.snippets.append(snippet)
+        pack.tokens += tokens + (2 if len(pack.snippets) > 1 else 0)
+        for i in remaining:
+            max_similarity[i] = max(max_similarity[i], _jaccard(shingles[i], shingles[best]))
+
+    # Os que sobraram (limite de trechos) também ficaram fora do contexto
+    pack.dropped += len(remaining)
+    return pack
@@ -0,0 +1,190 @@
+# src/chatbot/lexical.py
+# Índice invertido BM25 sobre os comentários, para perguntas que são buscas
+# por palavra ("atrasado", "buffet frio"): respondidas localmente, sem a ida à
+# API de embeddings. Os documentos entram em segmentos (matrizes esparsas de
+# frequência) e o peso BM25 é calculado na consulta, então adicionar
+# documentos não exige reconstruir o índice.
+import re
+import unicodedata
+import numpy as np
+
+# Palavras sem conteúdo (sem acento, minúsculas), ignoradas no índice e na consulta
+STOPWORDS = {
+    "a", "ao", "aos", "as", "com", "da", "das", "de", "do", "dos", "e", "ela", "ele", "em", "essa", "esse",
+    "esta", "este", "eu", "foi", "ja", "la", "lhe", "mais", "mas", "me", "meu", "minha", "muito", "na", "nas",
+    "nem", "no", "nos", "num", "numa", "o", "os", "ou", "para", "pela", "pelo", "por", "pra", "que", "se",
+    "sem", "ser", "seu", "sua", "tambem", "tem", "um", "uma", "voce", "era", "estava", "foram", "sao",
+}
+
+# Começos que indicam uma pergunta aberta (melhor respondida pela busca vetorial)
+QUESTION_WORDS = {
+    "como", "porque", "qual", "quais", "quando", "onde", "quem", "quanto", "quantos", "quantas", "que",
+    "resuma", "resumo", "liste", "compare", "explique", "descreva", "existe", "existem", "ha", "houve",
+    "mostre", "me", "por",
+}
+QUESTION_PREFIXES = {("o", "que"), ("os", "que")}
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Termos indexados de um texto: minúsculas, sem acentos, sem stopwords e
+    palavras de uma letra; plural simples reduzido ("atrasados" -> "atrasado").
+    """
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    terms = []
+    for word in _TOKEN.findall(text):
+        if len(word) < 2 or word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s"):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+def is_keyword_query(query: str, max_terms: int = 3, exclude_terms=()) -> bool:
+    """
+    Heurística para perguntas que são buscas por palavra: sem "?", no máximo
+    max_terms termos de conteúdo (e poucas palavras no total) e sem começar
+    com uma palavra interrogativa.
+
+    :param exclude_terms: termos (já tokenizados) que não contam como conteúdo,
+        ex.: o nome de um fornecedor que virou filtro. Uma pergunta só com
+        esses termos não é uma busca por palavra.
+    """
+    if "?" in query:
+        return False
+    words = _TOKEN.findall(unicodedata.normalize("NFKD", query.lower()).encode("ascii", "ignore").decode())
+    if not words or len(words) > max_terms + 2:
+        return False
+    if words[0] in QUESTION_WORDS or tuple(words[:2]) in QUESTION_PREFIXES:
+        return False
+    terms = tokenize(query)
+    if not set(terms) - set(exclude_terms):
+        return False
+    return len(terms) <= max_terms
+
+
+class BM25Index:
+    """
+    Índice BM25 (Okapi) sobre posições de documentos 0..n-1, na ordem em
+    que foram adicionados.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_segments: int = 8):
+        """
+        :param k1: saturação da frequência do termo.
+        :param b: normalização pelo tamanho do documento.
+        :param max_segments: segmentos acumulados por add() antes de serem fundidos em um.
+        """
+        self.k1 = k1
+        self.b = b
+        self.max_segments = max_segments
+        self.vocabulary: dict[str, int] = {}
+        self.doc_freq = np.zeros(0, dtype=np.int64)
+        self.doc_lengths = np.zeros(0, dtype=np.float32)
+        # (posição do primeiro documento, matriz CSC documentos x termos com as frequências)
+        self._segments = []
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, texts) -> int:
+        """
+        Indexa novos documentos (posições len(self) em diante).
+
+        :param texts: textos dos documentos.
+        :return: número de documentos adicionados.
+        """
+        from scipy.sparse import coo_matrix
+
+        rows, cols, lengths = [], [], []
+        for i, text in enumerate(texts):
+            terms = [self.vocabulary.setdefault(term, len(self.vocabulary)) for term in tokenize(text)]
+            rows.extend([i] * len(terms))
+            cols.extend(terms)
+            lengths.append(len(terms))
+        if not lengths:
+            return 0
+
+        # Frequência de cada termo em cada documento (duplicatas somadas pelo COO -> CSC)
+        segment = coo_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                             shape=(len(lengths), len(self.vocabulary))).tocsc()
+        segment.sum_duplicates()
+        doc_freq = np.zeros(len(self.vocabulary), dtype=np.int64)
+        doc_freq[:len(self.doc_freq)] = self.doc_freq
+        doc_freq += np.diff(segment.indptr)
+        self.doc_freq = doc_freq
+
+        self._segments.append((len(self), segment))
+        self.doc_lengths = np.concatenate((self.doc_lengths, np.asarray(lengths, dtype=np.float32)))
+        if len(self._segments) > self.max_segments:
+            self._merge_segments()
+        return len(lengths)
+
+    def _merge_segments(self):
+        from scipy.sparse import vstack
+
+        width = len(self.vocabulary)
+        matrices = []
+        for _, segment in self._segments:
+            segment = segment.copy()
+            segment.resize((segment.shape[0], width))
+            matrices.append(segment)
+        self._segments = [(0, vstack(matrices, format="csc"))]
+
+    def idf(self, term_ids: np.ndarray) -> np.ndarray:
+        df = self.doc_freq[term_ids]
+        return np.log1p((len(self) - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+    def scores(self, query: str) -> np.ndarray:
+        """
+        Score BM25 de cada documento para a consulta (0 = nenhum termo em comum).
+
+        :return: float32 (len(self),).
+        """
+        scores = np.zeros(len(self), dtype=np.float32)
+        term_ids = np.array(sorted({self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary}),
+                            dtype=np.int64)
+        if len(term_ids) == 0 or len(self) == 0:
+            return scores
+
+        idf = self.idf(term_ids)
+        average_length = float(self.doc_lengths.mean()) or 1.0
+        for start, segment in self._segments:
+            known = term_ids < segment.shape[1]
+            columns = segment[:, term_ids[known]]
+            for j, weight in enumerate(idf[known]):
+                begin, end = columns.indptr[j], columns.indptr[j + 1]
+                docs = columns.indices[begin:end] + start
+                tf = columns.data[begin:end]
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / average_length)
+                scores[docs] += weight * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes das postagens e dos arrays por documento (sem o vocabulário)."""
+        postings = sum(s.data.nbytes + s.indices.nbytes + s.indptr.nbytes for _, s in self._segments)
+        return postings + self.doc_lengths.nbytes + self.doc_freq.nbytes
+
+
+def reciprocal_rank_fusion(rankings: list[list[dict]], k: int, rrf_k: int = 60) -> list[dict]:
+    """
+    Funde listas de hits ({"id", ...}) pela soma de 1 / (rrf_k + posição) em
+    cada lista. O hit devolvido é o da primeira lista em que o id aparece,
+    com o score trocado pelo da fusão.
+
+    :param rankings: listas de hits, cada uma do melhor para o pior.
+    :param k: hits devolvidos.
+    :param rrf_k: constante do RRF (amortece a diferença entre as primeiras posições).
+    """
+    fused, hits = {}, {}
+    for ranking in rankings:
+        for position, hit in enumerate(ranking):
+            fused[hit["id"]] = fused.get(hit["id"], 0.0) + 1.0 / (rrf_k + position + 1)
+            hits.setdefault(hit["id"], hit)
+    best = sorted(fused, key=fused.get, reverse=True)[:k]
+    return [{**hits[doc_id], "score": fused[doc_id]} for doc_id in best]
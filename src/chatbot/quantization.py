@@ -0,0 +1,176 @@
+# src/chatbot/quantization.py
+# Códigos compactos dos embeddings para a busca em memória: float16, int8 com
+# escala por vetor ou 1 bit por dimensão (sinal, comparado por distância de
+# Hamming). A busca roda sobre os códigos e só uma lista curta de candidatos é
+# reordenada com os vetores float32 originais (lidos do memory-map sob demanda).
+import os
+from dataclasses import dataclass
+import numpy as np
+
+QUANTIZATION_MODES = ("none", "float16", "int8", "binary")
+
+
+@dataclass
+class QuantizedCodes:
+    """
+    Códigos compactos das linhas válidas de uma matriz de embeddings.
+
+    rows[i] é a linha da matriz original codificada em codes[i] e norms[i] a
+    sua norma (usada no reordenamento em precisão total). scales só existe
+    no modo int8 (um float32 por vetor).
+    """
+    mode: str
+    codes: np.ndarray
+    rows: np.ndarray
+    norms: np.ndarray
+    scales: np.ndarray | None = None
+    dim: int = 0
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes ocupados em memória pelos códigos (incluindo rows, norms e scales)."""
+        extra = self.scales.nbytes if self.scales is not None else 0
+        return self.codes.nbytes + self.rows.nbytes + self.norms.nbytes + extra
+
+    def encode_query(self, query: np.ndarray) -> np.ndarray:
+        """Pergunta no formato comparado com os códigos (bits empacotados no modo binário)."""
+        if self.mode == "binary":
+            return _pack_signs(query[None, :])[0]
+        return query.astype(np.float32)
+
+    def approximate_scores(self, query: np.ndarray, positions: np.ndarray | None = None,
+                           block: int = 1024) -> np.ndarray:
+        """
+        Similaridade aproximada da pergunta com cada código (maior = mais
+        próximo): cosseno no float16/int8, menos a distância de Hamming no binário.
+
+        :param query: embedding da pergunta, normalizado (float32).
+        :param positions: posições dos códigos avaliados (padrão: todos).
+        :param block: códigos convertidos para float32 por vez (blocos pequenos
+                      mantêm a conversão no cache da CPU).
+        """
+        encoded = self.encode_query(query)
+        n = len(self) if positions is None else len(positions)
+        if self.mode == "binary":
+            codes = self.codes if positions is None else self.codes[positions]
+            return -np.bitwise_count(codes ^ encoded).sum(axis=1, dtype=np.int32)
+
+        scores = np.empty(n, dtype=np.float32)
+        buffer = np.empty((min(block, n), self.codes.shape[1]), dtype=np.float32)
+        for start in range(0, n, block):
+            idx = slice(start, start + block) if positions is None else positions[start:start + block]
+            converted = buffer[:len(scores[start:start + block])]
+            np.copyto(converted, self.codes[idx], casting="unsafe")
+            scores[start:start + block] = converted @ encoded
+        if self.mode == "int8":
+            scores *= self.scales if positions is None else self.scales[positions]
+        return scores
+
+    def save(self, path: str, source_version=None):
+        """Salva os códigos em um .npz, marcados com a versão da matriz de origem."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        arrays = {"codes": self.codes, "rows": self.rows, "norms": self.norms,
+                  "meta": np.array([self.mode, str(self.dim), repr(source_version)])}
+        if self.scales is not None:
+            arrays["scales"] = self.scales
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, source_version=None) -> "QuantizedCodes | None":
+        """Lê os códigos salvos por save(); None se não existirem ou forem de outra versão da matriz."""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            mode, dim, version = data["meta"].tolist()
+            if version != repr(source_version):
+                return None
+            return cls(mode=mode, codes=data["codes"], rows=data["rows"], norms=data["norms"],
+                       scales=data["scales"] if "scales" in data else None, dim=int(dim))
+
+
+def _pack_signs(matrix: np.ndarray) -> np.ndarray:
+    """1 bit por dimensão (positivo = 1), empacotado em palavras uint64."""
+    bits = np.packbits(matrix > 0, axis=1)
+    padding = -bits.shape[1] % 8
+    if padding:
+        bits = np.pad(bits, ((0, 0), (0, padding)))
+    return bits.view(np.uint64)
+
+
+def quantize(embeddings: np.ndarray, mode: str, block: int = 65536) -> QuantizedCodes:
+    """
+    Codifica as linhas válidas (finitas e não nulas) da matriz, um bloco por
+    vez, sem carregar inteira uma matriz em memory-map.
+
+    :param embeddings: matriz float (n, dim).
+    :param mode: "float16", "int8" (escala por vetor) ou "binary" (bits de sinal).
+    :param block: linhas codificadas por vez.
+    :return: QuantizedCodes (códigos dos vetores normalizados).
+    """
+    if mode not in QUANTIZATION_MODES[1:]:
+        raise ValueError(f"Modo de quantização desconhecido: {mode}")
+    n, dim = embeddings.shape
+    rows, norms, codes, scales = [], [], [], []
+    for start in range(0, n, block):
+        chunk = np.asarray(embeddings[start:start + block], dtype=np.float32)
+        chunk_norms = np.linalg.norm(np.nan_to_num(chunk), axis=1)
+        valid = np.isfinite(chunk).all(axis=1) & (chunk_norms > 0)
+        chunk = chunk[valid] / chunk_norms[valid, None]
+        rows.append(np.flatnonzero(valid) + start)
+        norms.append(chunk_norms[valid])
+        if mode == "float16":
+            codes.append(chunk.astype(np.float16))
+        elif mode == "int8":
+            chunk_scales = np.abs(chunk).max(axis=1) / 127
+            codes.append(np.rint(chunk / chunk_scales[:, None]).astype(np.int8))
+            scales.append(chunk_scales.astype(np.float32))
+        else:
+            codes.append(_pack_signs(chunk))
+
+    width = {"float16": dim, "int8": dim, "binary": (dim + 63) // 64}[mode]
+    code_dtype = {"float16": np.float16, "int8": np.int8, "binary": np.uint64}[mode]
+    return QuantizedCodes(
+        mode=mode,
+        codes=np.concatenate(codes) if codes else np.empty((0, width), dtype=code_dtype),
+        rows=np.concatenate(rows).astype(np.int64) if rows else np.empty(0, dtype=np.int64),
+        norms=np.concatenate(norms).astype(np.float32) if norms else np.empty(0, dtype=np.float32),
+        scales=(np.concatenate(scales) if scales else np.empty(0, dtype=np.float32)) if mode == "int8" else None,
+        dim=dim,
+    )
+
+
+def codes_path(embeddings_path: str, mode: str) -> str:
+    """Arquivo dos códigos ao lado da matriz .npy (ex.: data_enriched_embeddings.int8.npz)."""
+    return f"{os.path.splitext(embeddings_path)[0]}.{mode}.npz"
+
+
+def load_or_quantize(embeddings, mode: str, embeddings_path: str | None = None) -> QuantizedCodes:
+    """
+    Códigos da matriz: lidos do arquivo ao lado de embeddings_path quando
+    foram gerados a partir da versão atual dele; senão, calculados agora (e
+    salvos, se embeddings_path existir).
+
+    :param embeddings: matriz float (n, dim), normalmente o memory-map de embeddings_path,
+                       ou função que a devolve (só chamada se os códigos não estiverem salvos).
+    :param mode: modo de quantização.
+    :param embeddings_path: .npy de onde a matriz foi lida (None desativa o cache em disco).
+    """
+    source_version = None
+    if embeddings_path and os.path.exists(embeddings_path):
+        stat = os.stat(embeddings_path)
+        source_version = (stat.st_size, stat.st_mtime_ns)
+        cached = QuantizedCodes.load(codes_path(embeddings_path, mode), source_version)
+        if cached is not None:
+            print(f"INFO: Códigos {mode} carregados de {codes_path(embeddings_path, mode)}.")
+            return cached
+
+    quantized = quantize(embeddings() if callable(embeddings) else embeddings, mode)
+    print(f"INFO: {len(quantized)} embeddings quantizados ({mode}, {quantized.nbytes / 2**20:.1f} MiB).")
+    if source_version is not None:
+        quantized.save(codes_path(embeddings_path, mode), source_version)
+    return quantized
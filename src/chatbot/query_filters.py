@@ -0,0 +1,99 @@
+# src/chatbot/query_filters.py
+# Detecta fornecedores e sentimentos citados na pergunta e monta o filtro
+# 'where' (formato do ChromaDB) que é aplicado antes da busca por similaridade.
+import re
+import unicodedata
+import pandas as pd
+
+FILTER_COLUMNS = ["ID_Fornecedor_DJ", "ID_Fornecedor_Buffet", "sentimento"]
+
+# Palavras (sem acento, minúsculas) que pedem explicitamente um sentimento.
+# Só pedidos inequívocos viram filtro: "bom", "boa tarde", "qual é melhor?" ou
+# "algum problema?" perguntam sobre o fornecedor e precisam das duas polaridades.
+SENTIMENT_KEYWORDS = {
+    "Negativo": ["negativo", "negativos", "negativa", "negativas", "piores", "reclamacao", "reclamacoes",
+                 "criticas"],
+    "Positivo": ["positivo", "positivos", "positiva", "positivas", "elogio", "elogios"],
+    "Misto": ["misto", "mistos", "mista", "mistas", "neutro", "neutros"],
+}
+
+# Palavras de polaridade ambíguas: não filtram sozinhas, mas ao lado de um
+# pedido do sentimento oposto ("melhores e piores") indicam que a pergunta quer os dois lados
+SENTIMENT_HINTS = {
+    "Negativo": ["pior", "ruim", "ruins", "problema", "problemas"],
+    "Positivo": ["melhor", "melhores", "bom", "bons", "boa", "boas"],
+}
+
+# Palavras de uma letra do português que podem seguir "DJ"/"Buffet" na frase
+SINGLE_LETTER_WORDS = {"a", "e", "o"}
+
+
+def _strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def extract_known_values(df_enriched: pd.DataFrame) -> dict:
+    """
+    Lê os valores existentes das colunas filtráveis.
+
+    :param df_enriched: DataFrame enriquecido.
+    :return: {coluna: [valores únicos]}.
+    """
+    return {
+        col: sorted(str(v) for v in df_enriched[col].dropna().unique())
+        for col in FILTER_COLUMNS if col in df_enriched.columns
+    }
+
+
+def _supplier_pattern(value: str) -> re.Pattern:
+    """
+    'DJ_C' casa com 'DJ C', 'dj_c', 'DJ-C'. Sufixos que também são palavras
+    de uma letra ('a', 'e', 'o') precisam estar em maiúscula: 'do DJ a pista'
+    não é o DJ A.
+    """
+    prefix, _, suffix = value.partition("_")
+    if not suffix:
+        return re.compile(rf"\b{re.escape(value)}\b", re.IGNORECASE)
+    case_sensitive = suffix.lower() in SINGLE_LETTER_WORDS
+    suffix_pattern = re.escape(suffix) if case_sensitive else f"(?i:{re.escape(suffix)})"
+    return re.compile(rf"(?i:\b{re.escape(prefix)})[\s_-]*{suffix_pattern}\b")
+
+
+def extract_filters(query: str, known_values: dict) -> dict:
+    """
+    Detecta as restrições da pergunta.
+
+    :param query: pergunta do usuário.
+    :param known_values: {coluna: [valores]} (ver extract_known_values).
+    :return: {coluna: [valores citados]} (vazio se nada for detectado).
+    """
+    filters = {}
+    for col in ("ID_Fornecedor_DJ", "ID_Fornecedor_Buffet"):
+        found = [v for v in known_values.get(col, []) if _supplier_pattern(v).search(query)]
+        if found:
+            filters[col] = found
+
+    words = set(re.findall(r"\w+", _strip_accents(query.lower())))
+    known_sentiments = set(known_values.get("sentimento", []))
+    sentiments = [s for s, keywords in SENTIMENT_KEYWORDS.items()
+                  if s in known_sentiments and words & set(keywords)]
+    hinted = {s for s, hints in SENTIMENT_HINTS.items() if words & set(hints)}
+    # Sentimentos opostos na mesma pergunta (ex.: "melhores e piores") = sem filtro
+    if len(sentiments) == 1 and not hinted - set(sentiments):
+        filters["sentimento"] = sentiments
+    return filters
+
+
+def to_where(filters: dict) -> dict | None:
+    """
+    Converte {coluna: [valores]} no filtro 'where' do ChromaDB.
+    """
+    conditions = [
+        {col: values[0]} if len(values) == 1 else {col: {"$in": values}}
+        for col, values in filters.items()
+    ]
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
@@ -1,23 +1,63 @@
 # src/chatbot/rag_chain.py
+import time
+from typing import Iterator
+from typing import TYPE_CHECKING
 import streamlit as st
-import yaml
-import chromadb
-from openai import OpenAI
+from src.config import load_config, load_prompts
+from src.chatbot.retrievers import ChromaRetriever
+from src.chatbot.query_filters import extract_filters, to_where
+from src.chatbot.cache import TTLLRUCache, SemanticAnswerCache, normalize_query
+from src.chatbot.lexical import is_keyword_query, reciprocal_rank_fusion, tokenize
+from src.chatbot.context import build_context, count_tokens
+from src.monitoring.instrumentation import METRICS
+
+if TYPE_CHECKING:
+    import chromadb
 
 # Carrega configs e prompts
 try:
-    with open("config/config.yaml", 'r') as f:
-        config = yaml.safe_load(f)
-    with open("config/prompts.yaml", 'r') as f:
-        prompts = yaml.safe_load(f)
+    config = load_config()
+    prompts = load_prompts()
 
     RAG_PROMPT_TEMPLATE = prompts['rag_prompt_template']
     CHAT_MODEL = config['openai']['chat_model']
     EMBEDDING_MODEL = config['openai']['embedding_model']
+    RETRIEVAL_BACKEND = config.get('retrieval', {}).get('backend', "chroma")
+    TOP_K = config.get('retrieval', {}).get('top_k', 5)
+    QUANTIZATION = config.get('retrieval', {}).get('quantization', "none")
+    RESCORE_CANDIDATES = config.get('retrieval', {}).get('rescore_candidates', 100)
+    RETRIEVAL_MODE = config.get('retrieval', {}).get('mode', "vector")
+    KEYWORD_SHORTCUT = config.get('retrieval', {}).get('keyword_shortcut', True)
+    KEYWORD_QUERY_MAX_TERMS = config.get('retrieval', {}).get('keyword_query_max_terms', 3)
+    FUSION_CANDIDATES = config.get('retrieval', {}).get('fusion_candidates', 20)
+    RRF_K = config.get('retrieval', {}).get('rrf_k', 60)
+    CHATBOT_CACHE_CONFIG = config.get('chatbot_cache', {})
+    RAG_CONTEXT_CONFIG = config.get('rag_context', {})
 except FileNotFoundError as e:
     st.error(f"ERRO CRÍTICO: Arquivo de configuração não encontrado. {e}")
     st.stop()
 
+CHATBOT_CACHE_ENABLED = CHATBOT_CACHE_CONFIG.get('enabled', True)
+EMBEDDING_CACHE_SIZE = CHATBOT_CACHE_CONFIG.get('embedding_cache_size', 1000)
+EMBEDDING_CACHE_TTL = CHATBOT_CACHE_CONFIG.get('embedding_ttl_seconds', 86400)
+ANSWER_CACHE_SIZE = CHATBOT_CACHE_CONFIG.get('answer_cache_size', 500)
+ANSWER_CACHE_TTL = CHATBOT_CACHE_CONFIG.get('answer_ttl_seconds', 3600)
+ANSWER_SIMILARITY_THRESHOLD = CHATBOT_CACHE_CONFIG.get('similarity_threshold', 0.95)
+
+CONTEXT_ENABLED = RAG_CONTEXT_CONFIG.get('enabled', True)
+# Candidatos recuperados: com a seleção de contexto, mais que os TOP_K que iam direto ao prompt
+CONTEXT_CANDIDATES = max(TOP_K, RAG_CONTEXT_CONFIG.get('candidates', 20)) if CONTEXT_ENABLED else TOP_K
+CONTEXT_TOKEN_BUDGET = RAG_CONTEXT_CONFIG.get('token_budget', 400)
+CONTEXT_MAX_SNIPPETS = RAG_CONTEXT_CONFIG.get('max_snippets', 6)
+CONTEXT_MMR_LAMBDA = RAG_CONTEXT_CONFIG.get('mmr_lambda', 0.7)
+CONTEXT_DUPLICATE_THRESHOLD = RAG_CONTEXT_CONFIG.get('duplicate_threshold', 0.8)
+CONTEXT_MIN_SNIPPET_TOKENS = RAG_CONTEXT_CONFIG.get('min_snippet_tokens', 30)
+CONTEXT_MAX_SNIPPET_TOKENS = RAG_CONTEXT_CONFIG.get('max_snippet_tokens', 120)
+CONTEXT_METADATA = RAG_CONTEXT_CONFIG.get('metadata', True)
+
+NO_CONTEXT_MESSAGE = "Desculpe, não encontrei nenhuma informação relevante sobre isso nos feedbacks."
+GENERATION_ERROR_MESSAGE = "Desculpe, ocorreu um erro ao gerar a resposta."
+
 
 class ManualRAGBot:
     """
@@ -25,11 +65,46 @@ class ManualRAGBot:
     Ela gerencia o RAG manualmente.
     """
 
-    def __init__(self, collection: chromadb.Collection):
+    def __init__(self, collection: "chromadb.Collection | None" = None, retriever=None,
+                 known_values: dict | None = None, data_version=None,
+                 api_key: str | None = None, base_url: str | None = None, lexical=None,
+                 retrieval_mode: str = RETRIEVAL_MODE, keyword_shortcut: bool = KEYWORD_SHORTCUT):
+        """
+        :param collection: coleção do ChromaDB (usada se nenhum retriever for passado).
+        :param retriever: backend de recuperação (ver src/chatbot/retrievers.py).
+        :param lexical: LexicalRetriever (BM25) opcional, usado nos modos "lexical"
+                        e "hybrid" e no atalho para perguntas por palavra-chave.
+        :param retrieval_mode: "vector", "lexical" ou "hybrid" (fusão RRF das duas buscas).
+        :param keyword_shortcut: perguntas curtas por palavra-chave usam só o BM25,
+                                 sem a chamada de embedding.
+        :param known_values: valores existentes de fornecedores/sentimentos
+                             (ver query_filters.extract_known_values), usados
+                             para filtrar a busca pelo que a pergunta cita.
+        :param data_version: versão dos dados indexados (ver enriched_store.data_version);
+                             quando muda, o cache de respostas é descartado.
+        :param api_key: chave da OpenAI (padrão: st.secrets["OPENAI_API_KEY"]).
+        :param base_url: endpoint compatível com a API da OpenAI (ex.: servidor local dos benchmarks).
+        """
+        # Importado só quando o bot é criado (não pesa no carregamento das páginas)
+        from openai import OpenAI
+
         try:
-            self.api_key = st.secrets["OPENAI_API_KEY"]
-            self.client = OpenAI(api_key=self.api_key)
+            self.api_key = api_key or st.secrets["OPENAI_API_KEY"]
+            self.client = OpenAI(api_key=self.api_key, base_url=base_url)
             self.collection = collection
+            self.retriever = retriever or ChromaRetriever(collection)
+            self.known_values = known_values or {}
+            self.lexical = lexical
+            self.retrieval_mode = retrieval_mode
+            self.keyword_shortcut = keyword_shortcut
+            # Cache de 2 níveis: pergunta -> embedding (exato) e embedding -> resposta (semântico)
+            self.embedding_cache = TTLLRUCache(EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL)
+            self.answer_cache = SemanticAnswerCache(ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL,
+                                                    ANSWER_SIMILARITY_THRESHOLD)
+            # Respostas da busca por palavras (sem embedding): cache exato pelo texto + filtro
+            self.lexical_answer_cache = TTLLRUCache(ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL)
+            self.data_version = data_version
+            self._answer_cache_version = self._collection_version()
             print("INFO: RAGBot Manual inicializado com sucesso.")
         except KeyError:
             st.error("ERRO: Chave 'OPENAI_API_KEY' não encontrada.")
@@ -38,68 +113,382 @@ class ManualRAGBot:
             st.error(f"ERRO ao inicializar o RAGBot: {e}")
             st.stop()
 
-    def _get_relevant_documents(self, query: str) -> list[str]:
+    def _embed_query(self, query: str) -> list[float]:
         """
-        Passo 1: Gera embedding para a query e busca no ChromaDB.
+        Gera o embedding da pergunta, reaproveitando o cache exato
+        (mesmo texto, ignorando maiúsculas e espaços).
         """
+        key = normalize_query(query)
+        if CHATBOT_CACHE_ENABLED:
+            cached = self.embedding_cache.get(key)
+            if cached is not None:
+                METRICS.inc("cache_hits_total", cache="query_embedding")
+                return cached
+            METRICS.inc("cache_misses_total", cache="query_embedding")
+
+        METRICS.inc("api_requests_total", endpoint="embeddings")
         try:
-            # 1. Gera o embedding para a pergunta
-            response = self.client.embeddings.create(
-                model=EMBEDDING_MODEL,
-                input=query
-            )
-            query_embedding = response.data[0].embedding
-
-            # 2. Busca no ChromaDB usando o embedding
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=5,
-                include=["documents"]
-            )
-
-            return results['documents'][0]  # Retorna a lista de textos
+            with METRICS.timer(stage="query_embedding"), METRICS.timer("api_request_seconds", endpoint="embeddings"):
+                response = self.client.embeddings.create(
+                    model=EMBEDDING_MODEL,
+                    input=query
+                )
+        except Exception:
+            METRICS.inc("api_errors_total", endpoint="embeddings")
+            raise
+        METRICS.record_usage(response.usage, "embeddings")
+        query_embedding = response.data[0].embedding
+        if CHATBOT_CACHE_ENABLED:
+            self.embedding_cache.put(key, query_embedding)
+        return query_embedding
+
+    def _lexical_only(self, query: str, filters: dict | None = None) -> bool:
+        """
+        A pergunta é respondida só pelo índice BM25 (sem embedding)?
+        O nome de um fornecedor citado já vira filtro e não conta como termo
+        de busca: "DJ C" sozinho segue pela busca vetorial.
+        """
+        if self.lexical is None:
+            return False
+        if self.retrieval_mode == "lexical":
+            return True
+        if not self.keyword_shortcut:
+            return False
+        if filters is None:
+            filters = extract_filters(query, self.known_values)
+        supplier_terms = {term for col, values in filters.items() if col != "sentimento"
+                          for value in values for term in tokenize(str(value).replace("_", " "))}
+        return is_keyword_query(query, KEYWORD_QUERY_MAX_TERMS, supplier_terms)
+
+    def _get_relevant_documents(self, query: str, query_embedding=None, filters: dict | None = None,
+                                lexical_only: bool | None = None, report: dict | None = None) -> list[str]:
+        """
+        Passo 1: Gera embedding para a query e busca no backend de recuperação
+        (ChromaDB ou índice NumPy em memória), no índice BM25 ou nos dois.
+        Perguntas por palavra-chave vão só ao BM25, sem chamada à API.
+        Dos candidatos, a seleção de contexto escolhe os trechos do prompt.
+
+        :param report: dict opcional preenchido com prompt_tokens, prompt_tokens_unpacked
+                       (o prompt com os TOP_K documentos inteiros, como antes da seleção)
+                       e context_candidates/context_snippets/context_duplicates.
+        """
+        try:
+            if filters is None:
+                filters = extract_filters(query, self.known_values)
+            if lexical_only is None:
+                lexical_only = self._lexical_only(query, filters)
+            # 1. Gera o embedding para a pergunta (ou usa o já calculado)
+            if query_embedding is None and not lexical_only:
+                query_embedding = self._embed_query(query)
+
+            # 2. Busca no backend de recuperação, filtrando pelos fornecedores/sentimentos citados.
+            # Pelo atalho de palavra-chave o fornecedor nunca é relaxado: sem resultados,
+            # a pergunta segue pela busca vetorial com o mesmo filtro
+            relax_supplier = not lexical_only or self.retrieval_mode == "lexical"
+            hits = self._search(query, None if lexical_only else query_embedding, filters, relax_supplier)
+
+            return self._select_context(query, hits, report)  # Retorna a lista de textos
 
         except Exception as e:
             print(f"ERRO no Retrieval: {e}")
             return []
 
-    def _generate_answer(self, query: str, context: list[str]) -> str:
+    def _search(self, query: str, query_embedding, filters: dict, relax_supplier: bool = True) -> list[dict]:
         """
-        Passo 2: Monta o prompt e chama o LLM da OpenAI.
+        Busca com o filtro 'where' montado a partir da pergunta. Se nada for
+        encontrado, relaxa primeiro o sentimento e depois o fornecedor.
+        Sem embedding, a busca é só por palavras (BM25).
+
+        :param relax_supplier: se False, o filtro de fornecedor é mantido em todas as tentativas.
         """
+        attempts = [filters]
+        if "sentimento" in filters and len(filters) > 1:
+            attempts.append({k: v for k, v in filters.items() if k != "sentimento"})
+        if filters and (relax_supplier or list(filters) == ["sentimento"]):
+            attempts.append({})
+
+        with METRICS.timer(stage="retrieval"):
+            for attempt in attempts:
+                where = to_where(attempt)
+                if where:
+                    print(f"INFO: Filtro de metadados aplicado: {where}")
+                hits = self._retrieve(query, query_embedding, where)
+                if hits:
+                    return hits
+        return []
+
+    def _retrieve(self, query: str, query_embedding, where: dict | None) -> list[dict]:
+        """Uma busca: BM25 (sem embedding), vetorial ou a fusão RRF das duas ("hybrid")."""
+        if query_embedding is None:
+            return self.lexical.search(query, k=CONTEXT_CANDIDATES, where=where)
+        if self.lexical is None or self.retrieval_mode != "hybrid":
+            return self.retriever.search(query_embedding, k=CONTEXT_CANDIDATES, where=where)
+        fusion_candidates = max(FUSION_CANDIDATES, CONTEXT_CANDIDATES)
+        vector_hits = self.retriever.search(query_embedding, k=fusion_candidates, where=where)
+        lexical_hits = self.lexical.search(query, k=fusion_candidates, where=where)
+        return reciprocal_rank_fusion([vector_hits, lexical_hits], CONTEXT_CANDIDATES, RRF_K)
+
+    def _select_context(self, query: str, hits: list[dict], report: dict | None = None) -> list[str]:
+        """
+        Trechos do prompt: os candidatos mais relevantes e diferentes entre si
+        (MMR), com fornecedores e data, dentro do orçamento de tokens
+        (ver src/chatbot/context.py). Sem a seleção, os TOP_K documentos inteiros.
+        """
+        unpacked = [hit['document'] for hit in hits[:TOP_K]]
+        if not CONTEXT_ENABLED or not hits:
+            documents = unpacked
+        else:
+            with METRICS.timer(stage="context"):
+                pack = build_context(hits, CONTEXT_TOKEN_BUDGET, CONTEXT_MAX_SNIPPETS, CONTEXT_MMR_LAMBDA,
+                                     CONTEXT_DUPLICATE_THRESHOLD, CONTEXT_MIN_SNIPPET_TOKENS,
+                                     CONTEXT_MAX_SNIPPET_TOKENS, CONTEXT_METADATA, CHAT_MODEL)
+            documents = pack.snippets
+            METRICS.inc("rag_context_snippets_total", len(pack.snippets), outcome="included")
+            METRICS.inc("rag_context_snippets_total", pack.duplicates, outcome="duplicate")
+            METRICS.inc("rag_context_snippets_total", pack.dropped, outcome="dropped")
+            if report is not None:
+                report.update(context_candidates=pack.candidates, context_snippets=len(pack.snippets),
+                              context_duplicates=pack.duplicates)
+
+        if documents:
+            prompt_tokens = count_tokens(self._build_prompt(query, documents), CHAT_MODEL)
+            unpacked_tokens = count_tokens(self._build_prompt(query, unpacked), CHAT_MODEL)
+            METRICS.inc("rag_prompts_total")
+            METRICS.inc("rag_prompt_tokens_total", prompt_tokens, context="packed")
+            METRICS.inc("rag_prompt_tokens_total", unpacked_tokens, context="unpacked")
+            if report is not None:
+                report.update(prompt_tokens=prompt_tokens, prompt_tokens_unpacked=unpacked_tokens)
+        return documents
+
+    def _build_prompt(self, query: str, context: list[str]) -> str:
+        """Monta o prompt final a partir dos documentos recuperados."""
         # Junta os documentos em um único bloco de texto
         context_str = "\n\n".join(context)
-
-        # Monta o prompt final
-        final_prompt = RAG_PROMPT_TEMPLATE.format(
+        return RAG_PROMPT_TEMPLATE.format(
             context=context_str,
             question=query
         )
 
+    def _generate_answer(self, query: str, context: list[str]) -> str:
+        """
+        Passo 2: Monta o prompt e chama o LLM da OpenAI.
+        """
+        final_prompt = self._build_prompt(query, context)
+
+        METRICS.inc("api_requests_total", endpoint="chat")
         try:
             # 3. Chama o Chat da OpenAI
-            response = self.client.chat.completions.create(
-                model=CHAT_MODEL,
-                messages=[
-                    {"role": "user", "content": final_prompt}
-                ],
-                temperature=0.3
-            )
+            with METRICS.timer(stage="generation"), METRICS.timer("api_request_seconds", endpoint="chat"):
+                response = self.client.chat.completions.create(
+                    model=CHAT_MODEL,
+                    messages=[
+                        {"role": "user", "content": final_prompt}
+                    ],
+                    temperature=0.3
+                )
+            METRICS.record_usage(response.usage, "chat")
             return response.choices[0].message.content
         except Exception as e:
+            METRICS.inc("api_errors_total", endpoint="chat")
             print(f"ERRO na Geração: {e}")
-            return "Desculpe, ocorreu um erro ao gerar a resposta."
+            return GENERATION_ERROR_MESSAGE
 
-    def ask(self, query: str) -> str:
+    def _stream_answer(self, query: str, context: list[str]) -> Iterator[str]:
         """
-        Função principal que executa o pipeline RAG.
+        Passo 2 (streaming): igual ao _generate_answer, mas devolve os tokens
+        à medida que chegam da API. O uso de tokens vem no último pedaço
+        (stream_options.include_usage), quando o servidor o envia.
+        """
+        METRICS.inc("api_requests_total", endpoint="chat")
+        stream = self.client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=[
+                {"role": "user", "content": self._build_prompt(query, context)}
+            ],
+            temperature=0.3,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        for chunk in stream:
+            METRICS.record_usage(getattr(chunk, "usage", None), "chat")
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def _collection_version(self):
+        """Versão dos dados indexados: a versão informada + o total de itens do backend."""
+        try:
+            size = len(self.retriever)
+        except Exception:
+            size = None
+        return self.data_version, size
+
+    def set_data_version(self, data_version):
+        """Informa a versão atual dos dados (ex.: após o pipeline regravar os arquivos)."""
+        self.data_version = data_version
+
+    def clear_cache(self):
+        """Descarta os dois níveis de cache."""
+        self.embedding_cache.clear()
+        self.answer_cache.clear()
+        self.lexical_answer_cache.clear()
+
+    def _check_answer_cache_version(self):
+        """Descarta as respostas em cache se a coleção mudou desde que foram geradas."""
+        version = self._collection_version()
+        if version != self._answer_cache_version:
+            print("INFO: Coleção alterada. Cache de respostas descartado.")
+            self.answer_cache.clear()
+            self.lexical_answer_cache.clear()
+            self._answer_cache_version = version
+
+    def _prepare(self, query: str, timings: dict) -> tuple:
+        """
+        Passo 1 (comum a ask e ask_stream): embedding, cache de respostas e recuperação.
+
+        :return: (resposta pronta ou None, embedding, chave do filtro, documentos).
         """
+        start = time.perf_counter()
+        timings["cached"] = False
+        filters = extract_filters(query, self.known_values)
+        filter_key = repr(sorted(filters.items()))
+        if self._lexical_only(query, filters):
+            prepared = self._prepare_lexical(query, filters, filter_key, timings, start)
+            if prepared is not None:
+                return prepared
+
+        timings["route"] = "hybrid" if self.lexical is not None and self.retrieval_mode == "hybrid" else "vector"
+        METRICS.inc("retrieval_route_total", route=timings["route"])
+        try:
+            query_embedding = self._embed_query(query)
+        except Exception as e:
+            print(f"ERRO no Retrieval: {e}")
+            timings["retrieval_ms"] = (time.perf_counter() - start) * 1000
+            return NO_CONTEXT_MESSAGE, None, filter_key, []
+
+        if CHATBOT_CACHE_ENABLED:
+            self._check_answer_cache_version()
+            cached = self.answer_cache.get(query_embedding, filter_key)
+            if cached is not None:
+                METRICS.inc("cache_hits_total", cache="answer")
+                answer, similarity = cached
+                print(f"INFO: Resposta servida pelo cache (similaridade {similarity:.3f}).")
+                timings["cached"] = True
+                timings["retrieval_ms"] = (time.perf_counter() - start) * 1000
+                return answer, query_embedding, filter_key, []
+            METRICS.inc("cache_misses_total", cache="answer")
+
         # PASSO 1: RECUPERAÇÃO (Retrieval)
-        relevant_documents = self._get_relevant_documents(query)
+        relevant_documents = self._get_relevant_documents(query, query_embedding, filters, lexical_only=False,
+                                                          report=timings)
+        timings["retrieval_ms"] = (time.perf_counter() - start) * 1000
 
         if not relevant_documents:
-            return "Desculpe, não encontrei nenhuma informação relevante sobre isso nos feedbacks."
+            return NO_CONTEXT_MESSAGE, query_embedding, filter_key, []
+        return None, query_embedding, filter_key, relevant_documents
+
+    def _prepare_lexical(self, query: str, filters: dict, filter_key: str, timings: dict, start: float):
+        """
+        Passo 1 só com o índice BM25, sem chamadas à API. Devolve None se nada
+        for encontrado e a pergunta puder seguir pela busca vetorial.
+        """
+        timings["route"] = "lexical"
+        cache_key = (normalize_query(query), filter_key)
+        if CHATBOT_CACHE_ENABLED:
+            self._check_answer_cache_version()
+            cached = self.lexical_answer_cache.get(cache_key)
+            if cached is not None:
+                METRICS.inc("retrieval_route_total", route="lexical")
+                METRICS.inc("cache_hits_total", cache="answer")
+                print("INFO: Resposta servida pelo cache (busca por palavra-chave).")
+                timings["cached"] = True
+                timings["retrieval_ms"] = (time.perf_counter() - start) * 1000
+                return cached, None, filter_key, []
+
+        relevant_documents = self._get_relevant_documents(query, None, filters, lexical_only=True, report=timings)
+        timings["retrieval_ms"] = (time.perf_counter() - start) * 1000
+        if not relevant_documents and self.retrieval_mode != "lexical":
+            print("INFO: Nada encontrado por palavra-chave. Usando a busca vetorial.")
+            return None
+
+        METRICS.inc("retrieval_route_total", route="lexical")
+        if CHATBOT_CACHE_ENABLED:
+            METRICS.inc("cache_misses_total", cache="answer")
+        if not relevant_documents:
+            return NO_CONTEXT_MESSAGE, None, filter_key, []
+        return None, None, filter_key, relevant_documents
+
+    def _cache_answer(self, query: str, query_embedding, filter_key: str, answer: str):
+        """Guarda a resposta no cache semântico ou, sem embedding (busca por palavras), no cache exato."""
+        if query_embedding is None:
+            self.lexical_answer_cache.put((normalize_query(query), filter_key), answer)
+        else:
+            self.answer_cache.put(query_embedding, answer, filter_key)
+
+    def ask(self, query: str, timings: dict | None = None) -> str:
+        """
+        Função principal que executa o pipeline RAG.
+        Perguntas repetidas (ou quase idênticas, com os mesmos filtros) são
+        respondidas pelo cache, sem chamadas à API.
+
+        :param timings: dict opcional preenchido com retrieval_ms, generation_ms,
+                        total_ms, cached, route (lexical, vector ou hybrid) e, quando o
+                        prompt é montado, prompt_tokens e prompt_tokens_unpacked.
+        """
+        timings = {} if timings is None else timings
+        start = time.perf_counter()
+        answer, query_embedding, filter_key, relevant_documents = self._prepare(query, timings)
+
+        if answer is None:
+            # PASSO 2: GERAÇÃO (Generation)
+            generation_start = time.perf_counter()
+            answer = self._generate_answer(query, relevant_documents)
+            timings["generation_ms"] = (time.perf_counter() - generation_start) * 1000
+            if CHATBOT_CACHE_ENABLED and answer != GENERATION_ERROR_MESSAGE:
+                self._cache_answer(query, query_embedding, filter_key, answer)
+
+        timings["total_ms"] = (time.perf_counter() - start) * 1000
+        return answer
+
+    def ask_stream(self, query: str, timings: dict | None = None) -> Iterator[str]:
+        """
+        Variante de ask que devolve a resposta em pedaços, à medida que os
+        tokens chegam da API. A resposta completa só entra no cache se o
+        stream terminar sem erro.
+
+        :param timings: dict opcional preenchido com retrieval_ms, first_token_ms
+                        (desde o início da pergunta), generation_ms, total_ms, cached, route,
+                        prompt_tokens e prompt_tokens_unpacked.
+        """
+        timings = {} if timings is None else timings
+        start = time.perf_counter()
+        answer, query_embedding, filter_key, relevant_documents = self._prepare(query, timings)
+
+        if answer is not None:
+            timings["first_token_ms"] = timings["total_ms"] = (time.perf_counter() - start) * 1000
+            yield answer
+            return
+
+        # PASSO 2: GERAÇÃO (Generation) em streaming
+        generation_start = time.perf_counter()
+        parts = []
+        failed = False
+        try:
+            for token in self._stream_answer(query, relevant_documents):
+                if not parts:
+                    timings["first_token_ms"] = (time.perf_counter() - start) * 1000
+                parts.append(token)
+                yield token
+        except Exception as e:
+            print(f"ERRO na Geração: {e}")
+            METRICS.inc("api_errors_total", endpoint="chat")
+            failed = True
+            yield ("\n\n" if parts else "") + GENERATION_ERROR_MESSAGE
 
-        # PASSO 2: GERAÇÃO (Generation)
-        answer = self._generate_answer(query, relevant_documents)
-        return answer
\ No newline at end of file
+        timings["generation_ms"] = (time.perf_counter() - generation_start) * 1000
+        METRICS.observe("stage_seconds", timings["generation_ms"] / 1000, stage="generation")
+        METRICS.observe("api_request_seconds", timings["generation_ms"] / 1000, endpoint="chat")
+        timings["total_ms"] = (time.perf_counter() - start) * 1000
+        print(f"INFO: Recuperação {timings['retrieval_ms']:.0f} ms | primeiro token "
+              f"{timings.get('first_token_ms', 0):.0f} ms | geração {timings['generation_ms']:.0f} ms")
+        if CHATBOT_CACHE_ENABLED and parts and not failed:
+            self._cache_answer(query, query_embedding, filter_key, "".join(parts))
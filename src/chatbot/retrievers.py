@@ -0,0 +1,318 @@
+# src/chatbot/retrievers.py
+# Backends de recuperação usados pelo ManualRAGBot.
+# Todos expõem search(query_embedding, k, where) -> lista de hits
+# {"id", "document", "metadata", "score"}, do mais para o menos similar.
+# O LexicalRetriever (BM25) recebe o texto da pergunta no lugar do embedding.
+import threading
+import numpy as np
+import pandas as pd
+
+# Colunas que não vão para os metadados dos hits
+_NON_METADATA_COLUMNS = ('Comentario_Cliente', 'embedding')
+
+
+class ChromaRetriever:
+    """Busca por similaridade na coleção do ChromaDB."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __len__(self) -> int:
+        return self.collection.count()
+
+    def search(self, query_embedding, k: int, where: dict | None = None) -> list[dict]:
+        results = self.collection.query(
+            query_embeddings=[np.asarray(query_embedding, dtype=np.float32)],
+            n_results=k,
+            where=where or None,
+            include=["documents", "metadatas", "distances"]
+        )
+        return [
+            {"id": doc_id, "document": document, "metadata": metadata or {}, "score": -distance}
+            for doc_id, document, metadata, distance in zip(
+                results['ids'][0], results['documents'][0], results['metadatas'][0], results['distances'][0]
+            )
+        ]
+
+
+class _FrameIndex:
+    """
+    Metadados das linhas indexadas em arrays NumPy: filtros 'where' do
+    Chroma viram máscaras booleanas e os hits são montados por posição.
+    """
+
+    def _set_frame(self, frame: pd.DataFrame, rows: np.ndarray):
+        """Guarda os metadados das linhas indexadas (posição i = linha i do índice)."""
+        frame = frame.iloc[rows].reset_index(drop=True)
+        self.ids = frame['ID_Evento'].astype(str).to_numpy()
+        self.documents = frame['Comentario_Cliente'].astype(str).to_numpy()
+        # Metadados como arrays NumPy (máscaras de filtro e montagem dos hits)
+        self._columns = {col: frame[col].to_numpy() for col in frame.columns if col not in _NON_METADATA_COLUMNS}
+
+    def _append_frame(self, frame: pd.DataFrame):
+        """Acrescenta linhas ao final do índice (colunas ausentes de um lado viram None)."""
+        frame = frame.reset_index(drop=True)
+        previous = len(self)
+        self.ids = np.concatenate((self.ids, frame['ID_Evento'].astype(str).to_numpy()))
+        self.documents = np.concatenate((self.documents, frame['Comentario_Cliente'].astype(str).to_numpy()))
+        for col in set(self._columns) | {c for c in frame.columns if c not in _NON_METADATA_COLUMNS}:
+            old = self._columns.get(col, np.full(previous, None, dtype=object))
+            new = frame[col].to_numpy() if col in frame.columns else np.full(len(frame), None, dtype=object)
+            self._columns[col] = np.concatenate((old, new))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _mask(self, where: dict | None) -> np.ndarray | None:
+        """Converte um filtro no formato 'where' do Chroma em uma máscara booleana."""
+        if not where:
+            return None
+        masks = []
+        for key, condition in where.items():
+            if key == "$and":
+                masks.append(np.logical_and.reduce([self._mask(c) for c in condition]))
+            elif key == "$or":
+                masks.append(np.logical_or.reduce([self._mask(c) for c in condition]))
+            else:
+                column = self._columns.get(key)
+                if column is None:
+                    masks.append(np.zeros(len(self), dtype=bool))
+                elif isinstance(condition, dict):
+                    op, value = next(iter(condition.items()))
+                    if op == "$in":
+                        masks.append(np.isin(column, value))
+                    elif op == "$nin":
+                        masks.append(~np.isin(column, value))
+                    elif op == "$ne":
+                        masks.append(column != value)
+                    else:
+                        masks.append(column == value)
+                else:
+                    masks.append(column == condition)
+        return np.logical_and.reduce(masks)
+
+    def _hits(self, positions, scores) -> list[dict]:
+        return [
+            {"id": self.ids[p], "document": self.documents[p], "metadata": self._row_metadata(p), "score": float(s)}
+            for p, s in zip(positions, scores)
+        ]
+
+    def _row_metadata(self, position: int) -> dict:
+        metadata = {}
+        for col, values in self._columns.items():
+            value = values[position]
+            metadata[col] = value.item() if isinstance(value, np.generic) else value
+        return metadata
+
+
+class NumpyRetriever(_FrameIndex):
+    """
+    Índice vetorial exato em memória: uma única matriz float32 com as linhas
+    normalizadas, top-k por um produto matriz-vetor + argpartition e
+    pré-filtragem por máscara booleana nos metadados.
+    """
+
+    def __init__(self, frame: pd.DataFrame, embeddings: np.ndarray, block: int = 65536):
+        """
+        :param frame: metadados enriquecidos (linha i corresponde à linha i da matriz).
+        :param embeddings: matriz (n, dim) de embeddings; linhas com NaN são ignoradas.
+        :param block: linhas processadas por vez ao validar/normalizar a matriz.
+        """
+        valid = np.empty(len(embeddings), dtype=bool)
+        norms = np.empty(len(embeddings), dtype=np.float32)
+        for start in range(0, len(embeddings), block):
+            chunk = np.asarray(embeddings[start:start + block], dtype=np.float32)
+            valid[start:start + block] = np.isfinite(chunk).all(axis=1)
+            norms[start:start + block] = np.linalg.norm(np.nan_to_num(chunk), axis=1)
+        valid &= norms > 0
+        rows = np.flatnonzero(valid)
+
+        # Embeddings da OpenAI já vêm normalizados: nesse caso usa a matriz
+        # original (ex.: memory-map) sem copiar.
+        if len(rows) == len(embeddings) and np.allclose(norms, 1.0, atol=1e-3) and embeddings.dtype == np.float32:
+            self.matrix = embeddings
+        else:
+            self.matrix = np.empty((len(rows), embeddings.shape[1]), dtype=np.float32)
+            for start in range(0, len(rows), block):
+                idx = rows[start:start + block]
+                self.matrix[start:start + block] = embeddings[idx] / norms[idx, None]
+
+        self._set_frame(frame, rows)
+
+    def search(self, query_embedding, k: int, where: dict | None = None) -> list[dict]:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        mask = self._mask(where)
+        candidates = None if mask is None else np.flatnonzero(mask)
+        if candidates is not None and len(candidates) == 0:
+            return []
+        k = min(k, len(self) if candidates is None else len(candidates))
+        if k <= 0:
+            return []
+        positions, scores = self._rank(query, candidates, k)
+        return self._hits(positions, scores)
+
+    def _rank(self, query: np.ndarray, candidates: np.ndarray | None, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k entre os candidatos (todas as linhas se None), do melhor para o pior.
+
+        :return: (posições, scores).
+        """
+        scores = self.matrix @ query if candidates is None else self.matrix[candidates] @ query
+        top = _top_k(scores, k)
+        return (top if candidates is None else candidates[top]), scores[top]
+
+
+class QuantizedRetriever(NumpyRetriever):
+    """
+    Índice em memória sobre códigos compactos (float16, int8 ou binário, ver
+    src/chatbot/quantization.py): a busca percorre só os códigos e as
+    rescore_candidates melhores linhas são reordenadas com o produto exato
+    contra os vetores float32 originais, lidos sob demanda (ex.: memory-map).
+    """
+
+    def __init__(self, frame: pd.DataFrame, embeddings, mode: str = "int8", rescore_candidates: int = 100,
+                 codes=None, embeddings_path: str | None = None):
+        """
+        :param frame: metadados enriquecidos (linha i corresponde à linha i da matriz).
+        :param embeddings: matriz (n, dim) original, ou função que a devolve (chamada só no
+                           primeiro reordenamento e se os códigos vierem do cache).
+        :param mode: "float16", "int8" ou "binary".
+        :param rescore_candidates: tamanho da lista curta reordenada em precisão total
+                                   (0 desativa o reordenamento).
+        :param codes: QuantizedCodes já calculados (senão são lidos do cache ou calculados).
+        :param embeddings_path: .npy da matriz, usado para cachear os códigos em disco.
+        """
+        from src.chatbot.quantization import load_or_quantize
+
+        self._embeddings = embeddings
+        self.codes = codes or load_or_quantize(lambda: self.full_precision, mode, embeddings_path)
+        self.mode = self.codes.mode
+        self.rescore_candidates = rescore_candidates
+        self._set_frame(frame, self.codes.rows)
+
+    @property
+    def full_precision(self) -> np.ndarray:
+        """Matriz original em precisão total, resolvida no primeiro uso."""
+        if callable(self._embeddings):
+            self._embeddings = self._embeddings()
+        return self._embeddings
+
+    def _rank(self, query: np.ndarray, candidates: np.ndarray | None, k: int) -> tuple[np.ndarray, np.ndarray]:
+        # 1. Pré-busca nos códigos compactos
+        approximate = self.codes.approximate_scores(query, candidates)
+        top = _top_k(approximate, max(k, min(self.rescore_candidates, len(approximate))))
+        shortlist = top if candidates is None else candidates[top]
+        if self.rescore_candidates <= 0:
+            return shortlist[:k], approximate[top[:k]]
+
+        # 2. Reordena a lista curta com os vetores originais (linhas em ordem crescente
+        # para ler o memory-map sequencialmente)
+        shortlist = np.sort(shortlist)
+        vectors = np.asarray(self.full_precision[self.codes.rows[shortlist]], dtype=np.float32)
+        scores = (vectors @ query) / self.codes.norms[shortlist]
+        top = _top_k(scores, k)
+        return shortlist[top], scores[top]
+
+
+class LexicalRetriever(_FrameIndex):
+    """
+    Busca por palavras (BM25, ver src/chatbot/lexical.py) sobre os
+    comentários, com os mesmos filtros de metadados dos outros backends.
+    Não precisa do embedding da pergunta.
+    """
+
+    def __init__(self, frame: pd.DataFrame, k1: float = 1.2, b: float = 0.75):
+        """
+        :param frame: metadados enriquecidos (precisa de ID_Evento e Comentario_Cliente).
+        :param k1: saturação da frequência do termo.
+        :param b: normalização pelo tamanho do comentário.
+        """
+        from src.chatbot.lexical import BM25Index
+
+        self.index = BM25Index(k1, b)
+        self._set_frame(frame, np.arange(len(frame)))
+        self._indexed = set(self.ids)
+        self.index.add(self.documents)
+        # add() troca os arrays do índice enquanto outras sessões podem estar buscando
+        self._lock = threading.Lock()
+
+    def extends(self, frame: pd.DataFrame) -> bool:
+        """
+        Diz se o frame começa pelas linhas já indexadas, na mesma ordem e com
+        os mesmos comentários e metadados (ex.: uma nova versão dos dados em
+        que o pipeline só acrescentou feedbacks). Nesse caso basta add(); se
+        alguma linha antiga mudou (ex.: reenriquecida), o índice é reconstruído.
+        """
+        n = len(self)
+        if len(frame) < n:
+            return False
+        head = frame.iloc[:n]
+        columns = [c for c in frame.columns if c not in _NON_METADATA_COLUMNS]
+        if set(columns) != set(self._columns):
+            return False
+        if not (np.array_equal(head['ID_Evento'].astype(str).to_numpy(), self.ids)
+                and np.array_equal(head['Comentario_Cliente'].astype(str).to_numpy(), self.documents)):
+            return False
+        # Series.equals considera NaN == NaN (np.array_equal não, em colunas object)
+        return all(pd.Series(head[col].to_numpy()).equals(pd.Series(self._columns[col])) for col in columns)
+
+    def add(self, frame: pd.DataFrame) -> int:
+        """
+        Indexa as linhas do frame cujo ID_Evento ainda não está no índice
+        (ex.: depois que o pipeline acrescenta feedbacks novos).
+
+        :return: linhas adicionadas.
+        """
+        ids = frame['ID_Evento'].astype(str).tolist()
+        new = frame[[doc_id not in self._indexed for doc_id in ids]]
+        if new.empty:
+            return 0
+        with self._lock:
+            self._indexed.update(new['ID_Evento'].astype(str))
+            self._append_frame(new)
+            return self.index.add(new['Comentario_Cliente'].astype(str))
+
+    def search(self, query: str, k: int, where: dict | None = None) -> list[dict]:
+        with self._lock:
+            scores = self.index.scores(query)
+            mask = self._mask(where)
+        if mask is not None:
+            scores[~mask] = 0
+        matches = np.flatnonzero(scores)
+        k = min(k, len(matches))
+        if k <= 0:
+            return []
+        top = matches[_top_k(scores[matches], k)]
+        return self._hits(top, scores[top])
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Índices dos k maiores scores, do maior para o menor."""
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def build_retriever(backend: str, collection=None, frame: pd.DataFrame | None = None,
+                    embeddings: np.ndarray | None = None, quantization: str = "none",
+                    rescore_candidates: int = 100, embeddings_path: str | None = None):
+    """
+    Cria o backend de recuperação configurado.
+
+    :param backend: "chroma" ou "numpy".
+    :param collection: coleção do ChromaDB (backend "chroma").
+    :param frame: metadados enriquecidos (backend "numpy").
+    :param embeddings: matriz de embeddings alinhada ao frame (backend "numpy").
+    :param quantization: "none" (float32) ou o modo dos códigos compactos do backend "numpy".
+    :param rescore_candidates: lista curta reordenada em precisão total (códigos compactos).
+    :param embeddings_path: .npy da matriz, onde os códigos compactos são cacheados.
+    """
+    if backend == "numpy" and quantization != "none":
+        return QuantizedRetriever(frame, embeddings, quantization, rescore_candidates,
+                                  embeddings_path=embeddings_path)
+    if backend == "numpy":
+        return NumpyRetriever(frame, embeddings)
+    if backend == "chroma":
+        return ChromaRetriever(collection)
+    raise ValueError(f"Backend de recuperação desconhecido: {backend}")
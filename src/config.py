@@ -0,0 +1,33 @@
+# src/config.py
+# Leitura única (em cache) dos arquivos YAML de configuração e prompts.
+# Os módulos chamam load_config()/load_prompts() em vez de abrir os arquivos.
+from functools import lru_cache
+import yaml
+
+CONFIG_PATH = "config/config.yaml"
+PROMPTS_PATH = "config/prompts.yaml"
+
+
+@lru_cache(maxsize=None)
+def _load_yaml(path: str) -> dict:
+    with open(path, 'r') as f:
+        return yaml.safe_load(f) or {}
+
+
+def load_config(path: str = CONFIG_PATH) -> dict:
+    """
+    Parsed config.yaml, read once per process. The returned dict is shared:
+    callers must not modify it.
+    :raises FileNotFoundError: if the file does not exist.
+    """
+    return _load_yaml(path)
+
+
+def load_prompts(path: str = PROMPTS_PATH) -> dict:
+    """
+    Parsed prompts.yaml, read once per process. The returned dict is shared:
+    callers must not modify it.
+    :raises FileNotFoundError: if the file does not exist.
+    """
+    return _load_yaml(path)
+
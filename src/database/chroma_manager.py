@@ -1,52 +1,264 @@
 # src/database/chroma_manager.py
-import chromadb
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
 import pandas as pd
-import yaml
+from src.config import load_config
+from src.database.enriched_store import embeddings_to_matrix
+from src.monitoring.instrumentation import METRICS
 
 # 1. Carrega o nome da coleção via config.yaml
 try:
-    with open("config/config.yaml", 'r') as f:
-        config = yaml.safe_load(f)
+    config = load_config()
     COLLECTION_NAME = config['chroma']['collection_name']
+    CHROMA_MODE = config['chroma'].get('mode', "memory")
+    PERSIST_DIRECTORY = config['chroma'].get('persist_directory', "data/chroma")
+    BULK_BATCH_SIZE = config['chroma'].get('bulk_batch_size', 5000)
+    BULK_WORKERS = config['chroma'].get('bulk_workers', 1)
 except FileNotFoundError as e:
     print(f"ERRO: 'config/config.yaml' não encontrado. {e}")
     COLLECTION_NAME = "voc_pulse_default"
+    CHROMA_MODE = "memory"
+    PERSIST_DIRECTORY = "data/chroma"
+    BULK_BATCH_SIZE = 5000
+    BULK_WORKERS = 1
+
+# Chave de metadado com o hash do conteúdo de cada linha
+HASH_KEY = "_hash"
+
+# Tamanho de página ao ler os ids/hashes já gravados
+_GET_PAGE_SIZE = 10000
+
+
+def _valid_row_mask(matrix: np.ndarray, block: int = 65536) -> np.ndarray:
+    """
+    Máscara vetorizada das linhas com embedding válido (sem NaN), calculada
+    em blocos para não materializar uma cópia booleana da matriz inteira.
+    """
+    if matrix.ndim != 2 or matrix.shape[1] == 0:
+        return np.zeros(len(matrix), dtype=bool)
+    mask = np.empty(len(matrix), dtype=bool)
+    for start in range(0, len(matrix), block):
+        mask[start:start + block] = np.isfinite(matrix[start:start + block]).all(axis=1)
+    return mask
+
+
+def prepare_rows(df_enriched: pd.DataFrame, embeddings: np.ndarray | None = None):
+    """
+    Separa os metadados da matriz de embeddings e encontra as linhas válidas
+    sem percorrer o DataFrame linha a linha em Python.
+
+    :param df_enriched: DataFrame enriquecido.
+    :param embeddings: matriz float32 alinhada ao DataFrame (formato colunar).
+                       Se None, é montada a partir da coluna 'embedding'.
+    :return: (metadados sem a coluna 'embedding', matriz, posições das linhas válidas)
+    """
+    matrix = embeddings if embeddings is not None else embeddings_to_matrix(df_enriched['embedding'])
+    rows = np.flatnonzero(_valid_row_mask(matrix))
+
+    if len(rows) < len(df_enriched):
+        print(f"INFO: {len(df_enriched) - len(rows)} linhas descartadas por falha no embedding.")
+
+    frame = df_enriched.drop(columns=['embedding'], errors='ignore').reset_index(drop=True)
+
+    # Converte a coluna 'topico' (que pode ser uma lista) para string
+    if 'topico' in frame.columns and frame['topico'].dtype == object:
+        is_list = frame['topico'].map(type).eq(list)
+        if is_list.any():
+            frame['topico'] = frame['topico'].where(~is_list, frame['topico'].str.join(', '))
+    return frame, matrix, rows
+
+
+def _row_hash(document: str, metadata: dict, embedding) -> str:
+    """Hash do conteúdo (documento + metadados + vetor) de uma linha."""
+    h = hashlib.sha1()
+    h.update(str(document).encode("utf-8"))
+    h.update(repr(sorted(metadata.items())).encode("utf-8"))
+    h.update(np.asarray(embedding, dtype=np.float32).tobytes())
+    return h.hexdigest()
+
+
+def _batch_payload(frame: pd.DataFrame, matrix: np.ndarray, positions: np.ndarray, with_hash: bool = False) -> dict:
+    """Monta ids/embeddings/documentos/metadados de um lote de linhas."""
+    batch = frame.iloc[positions]
+    documents = batch['Comentario_Cliente'].astype(str).tolist()
+    metadatas = batch.drop(columns=['Comentario_Cliente']).to_dict('records')
+    embeddings = np.ascontiguousarray(matrix[positions], dtype=np.float32)
+    if with_hash:
+        for document, metadata, embedding in zip(documents, metadatas, embeddings):
+            metadata[HASH_KEY] = _row_hash(document, metadata, embedding)
+    return {
+        "ids": batch['ID_Evento'].astype(str).tolist(),
+        "embeddings": embeddings,
+        "documents": documents,
+        "metadatas": metadatas,
+    }
+
+
+def bulk_load(write, frame: pd.DataFrame, matrix: np.ndarray, rows: np.ndarray, batch_size: int,
+              workers: int = 1) -> int:
+    """
+    Envia as linhas para a coleção em lotes de no máximo batch_size linhas,
+    opcionalmente em paralelo. Cada lote é montado só na hora do envio, então
+    no máximo 2 * workers lotes ficam em memória ao mesmo tempo.
+
+    :param write: collection.add ou collection.upsert.
+    :param frame: metadados (sem a coluna 'embedding').
+    :param matrix: matriz de embeddings alinhada ao frame.
+    :param rows: posições das linhas a enviar.
+    :param batch_size: máximo de linhas por chamada.
+    :param workers: número de threads enviando lotes.
+    :return: número de linhas enviadas.
+    """
+    start_time = time.perf_counter()
+    batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+
+    if workers <= 1:
+        for positions in batches:
+            write(**_batch_payload(frame, matrix, positions))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            in_flight = set()
+            for positions in batches:
+                if len(in_flight) >= 2 * workers:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                in_flight.add(executor.submit(lambda p: write(**_batch_payload(frame, matrix, p)), positions))
+            for future in in_flight:
+                future.result()
+
+    elapsed = time.perf_counter() - start_time
+    METRICS.observe("stage_seconds", elapsed, stage="vector_store_load")
+    METRICS.inc("stage_rows_total", len(rows), stage="vector_store_load")
+    rate = len(rows) / elapsed if elapsed > 0 else float('inf')
+    print(f"INFO: {len(rows)} linhas enviadas em {len(batches)} lotes "
+          f"({elapsed:.2f}s, {rate:,.0f} linhas/s).")
+    return len(rows)
+
+
+def _batch_size_for(client) -> int:
+    return max(1, min(BULK_BATCH_SIZE, client.get_max_batch_size()))
+
+
+def _drop_old_collections(client, keep: int):
+    """
+    Apaga as coleções em memória de cargas anteriores, mantendo as `keep` mais
+    recentes (sessões abertas usam a anterior até trocarem de versão).
+    """
+    names = [getattr(c, "name", c) for c in client.list_collections()]
+    # O sufixo hexadecimal do time_ns tem tamanho fixo: a ordem dos nomes é a ordem das cargas
+    loads = sorted(name for name in names if name.startswith(f"{COLLECTION_NAME}-"))
+    for name in loads[:-keep]:
+        client.delete_collection(name)
 
 
 # 2. Inicializa o ChromaDB
-def initialize_chromadb(df_enriched: pd.DataFrame):
+def initialize_chromadb(df_enriched: pd.DataFrame, embeddings: np.ndarray | None = None,
+                        workers: int | None = None):
     """
     Inicializa o ChromaDB em memória. Esta é a versão
     SIMPLES, sem nenhuma dependência do LangChain.
+    As linhas são validadas de forma vetorizada e carregadas em lotes.
     """
+    import chromadb
+
     print("INFO: Inicializando ChromaDB em memória (modo simples)")
     client = chromadb.Client()
 
-    # Simplesmente cria a coleção.
-    collection = client.get_or_create_collection(name=COLLECTION_NAME)
+    # Uma coleção nova a cada carga: o cliente em memória é do processo inteiro e
+    # 'add' ignora ids já existentes, então reaproveitar a coleção de uma versão
+    # anterior manteria textos antigos e linhas removidas
+    collection = client.create_collection(name=f"{COLLECTION_NAME}-{time.time_ns():x}")
+    _drop_old_collections(client, keep=2)
 
-    # 2. Remove as linhas em que a geração de embeddings falhou
-    df_valid = df_enriched[df_enriched['embedding'].apply(lambda x: isinstance(x, list) and len(x) > 0)].copy()
-
-    # 3. Imprime um aviso para cada linha descartada
-    if len(df_valid) < len(df_enriched):
-        print(f"INFO: {len(df_enriched) - len(df_valid)} linhas descartadas por falha no embedding.")
-
-    # 4. Converte a coluna 'topico' (que pode ser uma lista) para string
-    if 'topico' in df_valid.columns:
-        df_valid['topico'] = df_valid['topico'].apply(
-            lambda x: ', '.join(x) if isinstance(x, list) else x
-        )
-
-    # 5. Prepara metadados
-    metadatas = df_valid.drop(columns=['Comentario_Cliente', 'embedding']).to_dict('records')
-
-    # 6. Populando a coleção
-    collection.add(
-        embeddings=df_valid['embedding'].tolist(),
-        documents=df_valid['Comentario_Cliente'].tolist(),
-        metadatas=metadatas,
-        ids=[str(i) for i in df_valid['ID_Evento']]
-    )
+    # 2. Separa metadados e embeddings, descartando as linhas em que a geração de embeddings falhou
+    frame, matrix, rows = prepare_rows(df_enriched, embeddings)
+
+    # 3. Populando a coleção em lotes
+    bulk_load(collection.add, frame, matrix, rows, _batch_size_for(client), workers or BULK_WORKERS)
     print(f"SUCESSO: {collection.count()} documentos carregados na coleção.")
     return collection
+
+
+# 3. Coleção persistente em disco
+def open_persistent_collection(persist_directory: str = PERSIST_DIRECTORY):
+    """
+    Abre (ou cria) a coleção persistente em disco, sem carregar nenhum dado.
+    """
+    import chromadb
+
+    client = chromadb.PersistentClient(path=persist_directory)
+    return client.get_or_create_collection(name=COLLECTION_NAME)
+
+
+def _stored_hashes(collection) -> dict:
+    """Lê {id: hash} de todas as linhas já gravadas na coleção, paginando."""
+    hashes = {}
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=_GET_PAGE_SIZE, offset=offset)
+        for doc_id, metadata in zip(page['ids'], page['metadatas']):
+            hashes[doc_id] = (metadata or {}).get(HASH_KEY)
+        if len(page['ids']) < _GET_PAGE_SIZE:
+            return hashes
+        offset += _GET_PAGE_SIZE
+
+
+def sync_chromadb(df_enriched: pd.DataFrame, persist_directory: str = PERSIST_DIRECTORY,
+                  embeddings: np.ndarray | None = None, workers: int | None = None):
+    """
+    Sincroniza a coleção persistente com o DataFrame enriquecido, usando
+    ID_Evento como chave: insere as linhas novas, faz upsert das alteradas
+    (detectadas pelo hash do conteúdo) e remove as que sumiram.
+    Linhas sem alteração não são tocadas.
+    """
+    import chromadb
+
+    client = chromadb.PersistentClient(path=persist_directory)
+    collection = client.get_or_create_collection(name=COLLECTION_NAME)
+    batch_size = _batch_size_for(client)
+
+    frame, matrix, rows = prepare_rows(df_enriched, embeddings)
+    ids = frame['ID_Evento'].astype(str).to_numpy()
+    stored = _stored_hashes(collection)
+
+    # 1. Hash do conteúdo de cada linha válida (calculado lote a lote)
+    hashes = []
+    for start in range(0, len(rows), batch_size):
+        payload = _batch_payload(frame, matrix, rows[start:start + batch_size], with_hash=True)
+        hashes.extend(metadata[HASH_KEY] for metadata in payload['metadatas'])
+    frame[HASH_KEY] = None
+    frame.loc[rows, HASH_KEY] = hashes
+
+    # 2. Upsert apenas das linhas novas ou alteradas
+    changed = rows[np.array([stored.get(doc_id) != h for doc_id, h in zip(ids[rows], hashes)], dtype=bool)]
+    bulk_load(collection.upsert, frame, matrix, changed, batch_size, workers or BULK_WORKERS)
+
+    # 3. Linhas removidas
+    removed = list(set(stored) - set(ids[rows]))
+    for start in range(0, len(removed), batch_size):
+        collection.delete(ids=removed[start:start + batch_size])
+
+    n_new = sum(1 for doc_id in ids[changed] if doc_id not in stored)
+    print(f"SUCESSO: Coleção persistente sincronizada: {n_new} novas, "
+          f"{len(changed) - n_new} alteradas, {len(removed)} removidas, "
+          f"{len(rows) - len(changed)} sem alteração. Total: {collection.count()}.")
+    return collection
+
+
+def load_collection(df_enriched: pd.DataFrame, embeddings: np.ndarray | None = None):
+    """
+    Retorna a coleção conforme o modo configurado: em memória (reconstruída
+    a partir do DataFrame) ou persistente (apenas aberta; sincronizada a
+    partir do DataFrame só se ainda estiver vazia).
+    """
+    if CHROMA_MODE == "persistent":
+        print(f"INFO: Abrindo coleção persistente em '{PERSIST_DIRECTORY}'")
+        collection = open_persistent_collection()
+        if collection.count() == 0:
+            print("INFO: Coleção persistente vazia. Sincronizando a partir dos dados enriquecidos...")
+            collection = sync_chromadb(df_enriched, embeddings=embeddings)
+        return collection
+    return initialize_chromadb(df_enriched, embeddings)
@@ -0,0 +1,279 @@
+# src/database/enriched_store.py
+# Armazenamento colunar dos dados enriquecidos:
+# metadados em Parquet + embeddings em uma matriz float32 contígua (.npy).
+# Os dois arquivos são publicados como um par: um manifesto, gravado por
+# último, registra quais arquivos (inode, tamanho, mtime) formam a versão atual.
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from src.config import load_config
+
+try:
+    config = load_config()
+    STORAGE_FORMAT = config.get('storage', {}).get('format', "columnar")
+except FileNotFoundError as e:
+    print(f"ERRO: 'config/config.yaml' não encontrado. {e}")
+    STORAGE_FORMAT = "columnar"
+
+PARQUET_PATH = "data/processed/data_enriched.parquet"
+EMBEDDINGS_PATH = "data/processed/data_enriched_embeddings.npy"
+JSON_PATH = "data/processed/data_enriched.json"
+
+
+def _normalize_topics(frame: pd.DataFrame) -> pd.DataFrame:
+    """Parquet needs one type per column: lists of topics become strings."""
+    if 'topico' in frame.columns:
+        frame['topico'] = frame['topico'].apply(lambda x: ', '.join(x) if isinstance(x, list) else x)
+    return frame
+
+
+def embeddings_to_matrix(embeddings, dim: int | None = None) -> np.ndarray:
+    """
+    Stacks a sequence of embeddings into a float32 (n, dim) matrix.
+    Missing/empty embeddings (failed rows) become rows of NaN.
+
+    :param embeddings: iterable of lists/arrays (possibly empty).
+    :param dim: embedding dimension (inferred from the first valid row if None).
+    :return: float32 matrix.
+    """
+    embeddings = list(embeddings)
+    if dim is None:
+        dim = next((len(e) for e in embeddings if e is not None and len(e) > 0), 0)
+    matrix = np.full((len(embeddings), dim), np.nan, dtype=np.float32)
+    for i, e in enumerate(embeddings):
+        if e is not None and len(e) == dim:
+            matrix[i] = e
+    return matrix
+
+
+def _tmp_paths(parquet_path: str, embeddings_path: str) -> tuple[str, str]:
+    # np.save acrescenta ".npy" a nomes sem essa extensão
+    return f"{parquet_path}.tmp", f"{embeddings_path}.tmp.npy"
+
+
+def manifest_path(parquet_path: str = PARQUET_PATH) -> str:
+    return f"{os.path.splitext(parquet_path)[0]}.manifest.json"
+
+
+def _file_id(path: str) -> list:
+    # os.replace mantém inode, tamanho e mtime: o id do .tmp é o do arquivo publicado
+    stat = os.stat(path)
+    return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+
+def _publish_columnar(parquet_tmp: str, embeddings_tmp: str, parquet_path: str, embeddings_path: str):
+    """
+    Moves fully written temp files into place (readers never see a
+    half-written file), then records the pair in the manifest. Until the
+    manifest is replaced, readers see a mismatch and keep the old version.
+    """
+    manifest = {"parquet": _file_id(parquet_tmp), "embeddings": _file_id(embeddings_tmp)}
+    os.replace(embeddings_tmp, embeddings_path)
+    os.replace(parquet_tmp, parquet_path)
+    path = manifest_path(parquet_path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def save_columnar(df_enriched: pd.DataFrame, parquet_path: str = PARQUET_PATH,
+                  embeddings_path: str = EMBEDDINGS_PATH):
+    """
+    Writes the enriched DataFrame as Parquet (metadata) + .npy (embeddings).
+    Row i of the matrix belongs to row i of the Parquet file.
+
+    :param df_enriched: enriched DataFrame with an 'embedding' column.
+    :param parquet_path: metadata output path.
+    :param embeddings_path: embedding matrix output path.
+    """
+    os.makedirs(os.path.dirname(parquet_path) or ".", exist_ok=True)
+    frame = _normalize_topics(df_enriched.drop(columns=['embedding']).reset_index(drop=True))
+    parquet_tmp, embeddings_tmp = _tmp_paths(parquet_path, embeddings_path)
+    frame.to_parquet(parquet_tmp, index=False)
+    np.save(embeddings_tmp, embeddings_to_matrix(df_enriched['embedding']))
+    _publish_columnar(parquet_tmp, embeddings_tmp, parquet_path, embeddings_path)
+    print(f"INFO: Dados colunares salvos em {parquet_path} e {embeddings_path}.")
+
+
+def convert_json_to_columnar(json_path: str = JSON_PATH, parquet_path: str = PARQUET_PATH,
+                             embeddings_path: str = EMBEDDINGS_PATH, chunk_size: int = 10000):
+    """
+    Converts a JSONL export into the columnar format chunk by chunk, writing
+    the embeddings straight into a memory-mapped .npy file (bounded memory).
+    The embedding dimension comes from the first valid embedding anywhere in
+    the file, so leading rows without embeddings (e.g. an API outage) do not
+    shrink the matrix. Both files are written under temporary names and
+    only replace the published ones when complete.
+
+    :param json_path: JSONL input path.
+    :param parquet_path: metadata output path.
+    :param embeddings_path: embedding matrix output path.
+    :param chunk_size: rows per chunk.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # 1ª passada: número de linhas e dimensão do primeiro embedding válido
+    n_rows, dim = 0, None
+    with open(json_path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            n_rows += 1
+            if dim is None:
+                embedding = json.loads(line).get('embedding')
+                if embedding:
+                    dim = len(embedding)
+
+    parquet_tmp, embeddings_tmp = _tmp_paths(parquet_path, embeddings_path)
+    matrix, writer, row = None, None, 0
+    try:
+        for chunk in pd.read_json(json_path, lines=True, chunksize=chunk_size):
+            chunk_matrix = embeddings_to_matrix(chunk['embedding'], dim or 0)
+            if matrix is None:
+                matrix = np.lib.format.open_memmap(embeddings_tmp, mode='w+', dtype=np.float32,
+                                                   shape=(n_rows, chunk_matrix.shape[1]))
+            matrix[row:row + len(chunk)] = chunk_matrix
+            row += len(chunk)
+
+            table = pa.Table.from_pandas(_normalize_topics(chunk.drop(columns=['embedding'])),
+                                         preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(parquet_tmp, table.schema)
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+        if matrix is not None:
+            matrix.flush()
+            del matrix
+    if row:
+        _publish_columnar(parquet_tmp, embeddings_tmp, parquet_path, embeddings_path)
+    print(f"INFO: {row} linhas convertidas de {json_path} para o formato colunar.")
+
+
+def columnar_exists(parquet_path: str = PARQUET_PATH, embeddings_path: str = EMBEDDINGS_PATH) -> bool:
+    return os.path.exists(parquet_path) and os.path.exists(embeddings_path)
+
+
+def _published_pair(parquet_path: str, embeddings_path: str) -> list | None:
+    """
+    Ids of the columnar files if they are the pair recorded in the manifest;
+    None if either is missing or a publish is half done. Files written
+    before the manifest existed are accepted as they are.
+    """
+    try:
+        pair = [_file_id(parquet_path), _file_id(embeddings_path)]
+    except FileNotFoundError:
+        return None
+    path = manifest_path(parquet_path)
+    if not os.path.exists(path):
+        return pair
+    with open(path) as f:
+        manifest = json.load(f)
+    return pair if pair == [manifest['parquet'], manifest['embeddings']] else None
+
+
+def load_columnar(parquet_path: str = PARQUET_PATH,
+                  embeddings_path: str = EMBEDDINGS_PATH) -> tuple[pd.DataFrame, np.ndarray] | None:
+    """
+    Loads the metadata frame and the memory-mapped matrix as one published
+    pair. Returns None while a publish is in progress, including one that
+    replaced either file during the read.
+    """
+    pair = _published_pair(parquet_path, embeddings_path)
+    if pair is None:
+        return None
+    frame = pd.read_parquet(parquet_path)
+    embeddings = np.load(embeddings_path, mmap_mode='r')
+    if _published_pair(parquet_path, embeddings_path) != pair:
+        return None
+    return frame, embeddings
+
+
+def data_version(parquet_path: str = PARQUET_PATH, embeddings_path: str = EMBEDDINGS_PATH,
+                 json_path: str = JSON_PATH) -> tuple:
+    """
+    Identifica a versão dos dados enriquecidos em disco (mtime e tamanho de
+    cada arquivo existente). Muda sempre que o pipeline regrava os dados.
+    """
+    version = []
+    for path in (parquet_path, embeddings_path, manifest_path(parquet_path), json_path):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            version.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(version)
+
+
+def load_frame(parquet_path: str = PARQUET_PATH, embeddings_path: str = EMBEDDINGS_PATH,
+               json_path: str = JSON_PATH) -> pd.DataFrame:
+    """
+    Loads the enriched metadata (without embeddings), from Parquet when the
+    columnar files are available, otherwise from the JSON export.
+    """
+    if columnar_exists(parquet_path, embeddings_path):
+        return pd.read_parquet(parquet_path)
+    return pd.read_json(json_path, lines=True).drop(columns=['embedding'])
+
+
+def load_embeddings(parquet_path: str = PARQUET_PATH, embeddings_path: str = EMBEDDINGS_PATH,
+                    json_path: str = JSON_PATH, mmap: bool = True) -> np.ndarray:
+    """
+    Loads the float32 embedding matrix, memory-mapped (read-only) when the
+    columnar files are available, otherwise stacked from the JSON export.
+    """
+    if columnar_exists(parquet_path, embeddings_path):
+        return np.load(embeddings_path, mmap_mode='r' if mmap else None)
+    return embeddings_to_matrix(pd.read_json(json_path, lines=True)['embedding'])
+
+
+def attach_embeddings(frame: pd.DataFrame, embeddings: np.ndarray) -> pd.DataFrame:
+    """
+    Returns a copy of the frame with an 'embedding' column whose values are
+    row views of the matrix (no vector data is copied).
+    """
+    df = frame.copy()
+    df['embedding'] = list(embeddings)
+    return df
+
+
+def publish_json(source_path: str, json_path: str = JSON_PATH):
+    """
+    Publishes a finished JSONL file (e.g. the streaming work file, which is
+    kept for the next resumable run) as the JSON export, atomically.
+    """
+    tmp_path = f"{json_path}.tmp"
+    shutil.copyfile(source_path, tmp_path)
+    os.replace(tmp_path, json_path)
+
+
+def remove_columnar(parquet_path: str = PARQUET_PATH, embeddings_path: str = EMBEDDINGS_PATH):
+    """Removes stale columnar files so the app does not prefer them over a newer JSON."""
+    for path in (parquet_path, embeddings_path, manifest_path(parquet_path)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def save_enriched(df_enriched: pd.DataFrame, fmt: str = "columnar", json_path: str = JSON_PATH,
+                  parquet_path: str = PARQUET_PATH, embeddings_path: str = EMBEDDINGS_PATH):
+    """
+    Saves the enriched DataFrame in the requested format.
+
+    :param df_enriched: enriched DataFrame with an 'embedding' column.
+    :param fmt: "columnar" (Parquet + .npy), "json" (JSONL export) or "both".
+    """
+    if fmt not in ("columnar", "json", "both"):
+        raise ValueError(f"Formato de saída desconhecido: {fmt}")
+    os.makedirs(os.path.dirname(json_path) or ".", exist_ok=True)
+    if fmt in ("json", "both"):
+        tmp_path = f"{json_path}.tmp"
+        df_enriched.to_json(tmp_path, orient='records', lines=True)
+        os.replace(tmp_path, json_path)
+        print(f"INFO: Dados enriquecidos exportados em JSON: {json_path}")
+    if fmt in ("columnar", "both"):
+        save_columnar(df_enriched, parquet_path, embeddings_path)
+    else:
+        remove_columnar(parquet_path, embeddings_path)
@@ -0,0 +1,127 @@
+# src/database/shared_dataset.py
+# Dados enriquecidos compartilhados por todas as sessões do processo: um único
+# frame de metadados e uma única matriz de embeddings (memory-map), lidos por
+# referência em vez de uma cópia por sessão. Cada carga tem uma versão (a dos
+# arquivos em disco); quando o pipeline publica uma saída nova, a próxima
+# leitura carrega a nova versão e a antiga é liberada com as referências.
+import threading
+import time
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from src.database.enriched_store import load_frame, load_embeddings, load_columnar, columnar_exists, \
+    data_version, PARQUET_PATH, EMBEDDINGS_PATH, JSON_PATH
+
+# Tentativas de ler um par publicado enquanto o pipeline troca os arquivos colunares
+PUBLISH_RETRIES = 5
+PUBLISH_RETRY_SECONDS = 0.1
+
+
+@dataclass(frozen=True)
+class SharedDataset:
+    """
+    One immutable snapshot of the enriched data. Row i of the matrix belongs
+    to row i of the frame. Shared by reference: callers must not modify the
+    frame in place (derived frames are copy-on-write) and the matrix is
+    read-only. The pipeline never rewrites the mapped file in place (new
+    versions replace it), so a snapshot keeps its data after a publish.
+    """
+    version: tuple
+    frame: pd.DataFrame
+    embeddings: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of the frame plus the matrix (the matrix is mapped from disk when columnar)."""
+        return int(self.frame.memory_usage(index=True, deep=True).sum()) + self.embeddings.nbytes
+
+
+def load_dataset(parquet_path: str = PARQUET_PATH, embeddings_path: str = EMBEDDINGS_PATH,
+                 json_path: str = JSON_PATH) -> SharedDataset:
+    """
+    Loads a snapshot of the enriched data (Parquet + memory-mapped .npy, or
+    the JSON export), tagged with the on-disk version read before loading.
+    The columnar files are only read as the pair recorded in their manifest;
+    during a publish, the read is retried.
+
+    :raises ValueError: the columnar files stay mismatched (a publish that
+        did not finish) or are not aligned.
+    """
+    for _ in range(PUBLISH_RETRIES):
+        version = data_version(parquet_path, embeddings_path, json_path)
+        if not columnar_exists(parquet_path, embeddings_path):
+            frame = load_frame(parquet_path, embeddings_path, json_path)
+            embeddings = load_embeddings(parquet_path, embeddings_path, json_path)
+            break
+        pair = load_columnar(parquet_path, embeddings_path)
+        if pair is not None:
+            frame, embeddings = pair
+            break
+        time.sleep(PUBLISH_RETRY_SECONDS)
+    else:
+        raise ValueError("Os arquivos colunares em disco não formam o par registrado no manifesto "
+                         "(publicação em andamento ou interrompida).")
+    if len(embeddings) != len(frame):
+        raise ValueError(f"Embeddings ({len(embeddings)} linhas) e metadados ({len(frame)} linhas) "
+                         f"não estão alinhados.")
+    if embeddings.flags.writeable:
+        embeddings.setflags(write=False)
+    return SharedDataset(version, frame, embeddings)
+
+
+class SharedDatasetHandle:
+    """
+    Thread-safe, process-wide holder of the current SharedDataset. get()
+    compares the on-disk version (a few os.stat calls) and reloads when the
+    pipeline has published new output.
+    """
+
+    def __init__(self, parquet_path: str = PARQUET_PATH, embeddings_path: str = EMBEDDINGS_PATH,
+                 json_path: str = JSON_PATH):
+        self.paths = (parquet_path, embeddings_path, json_path)
+        self._current: SharedDataset | None = None
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    @property
+    def current(self) -> SharedDataset | None:
+        """The loaded snapshot, without checking the disk (None before the first get())."""
+        return self._current
+
+    def get(self) -> SharedDataset:
+        """
+        Returns the current snapshot, loading it on first use or when the
+        files on disk have a new version.
+
+        :raises FileNotFoundError: no enriched data on disk.
+        """
+        version = data_version(*self.paths)
+        current = self._current
+        if current is not None and current.version == version:
+            return current
+        with self._lock:
+            # Outra sessão pode ter carregado a nova versão enquanto esperávamos o lock
+            if self._current is None or self._current.version != data_version(*self.paths):
+                try:
+                    self._current = load_dataset(*self.paths)
+                except ValueError as e:
+                    if self._current is None:
+                        raise
+                    print(f"AVISO: {e} Mantendo a versão carregada.")
+                    return self._current
+                self.loads += 1
+                print(f"INFO: Dados compartilhados carregados ({len(self._current)} linhas, "
+                      f"versão {hash(self._current.version) & 0xffffffff:08x}).")
+            return self._current
+
+    def clear(self):
+        """Drops the snapshot (the next get() reloads from disk)."""
+        with self._lock:
+            self._current = None
+
+
+# Instância única do processo (compartilhada entre as sessões do Streamlit)
+SHARED_DATASET = SharedDatasetHandle()
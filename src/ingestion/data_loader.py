@@ -1,11 +1,38 @@
 # ===== PIPELINE DE INGESTÃO DE DADOS =====
+import time
 import pandas as pd
+from src.monitoring.instrumentation import METRICS
+
 def load_csv(csv_path:str) -> pd.DataFrame:
     """Carrega o CSV bruto."""
     try:
-        df = pd.read_csv(csv_path)
+        with METRICS.timer(stage="ingestion"):
+            df = pd.read_csv(csv_path)
+        METRICS.inc("stage_rows_total", len(df), stage="ingestion")
         print(f"INFO: CSV '{csv_path}' carregado. {len(df)} linhas.")
         return df
     except FileNotFoundError:
         print(f"ERRO: Arquivo '{csv_path}' não encontrado.")
         return pd.DataFrame()
+
+def iter_csv_chunks(csv_path:str, chunk_size:int, skip_rows:int = 0):
+    """
+    Lê o CSV bruto em blocos de chunk_size linhas, pulando as skip_rows
+    primeiras linhas de dados (o cabeçalho é mantido).
+    """
+    try:
+        reader = pd.read_csv(
+            csv_path,
+            chunksize=chunk_size,
+            skiprows=range(1, skip_rows + 1) if skip_rows else None
+        )
+        while True:
+            start = time.perf_counter()
+            chunk = next(reader, None)
+            if chunk is None:
+                break
+            METRICS.observe("stage_seconds", time.perf_counter() - start, stage="ingestion")
+            METRICS.inc("stage_rows_total", len(chunk), stage="ingestion")
+            yield chunk
+    except FileNotFoundError:
+        print(f"ERRO: Arquivo '{csv_path}' não encontrado.")
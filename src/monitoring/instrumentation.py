@@ -0,0 +1,260 @@
+# src/monitoring/instrumentation.py
+# Métricas do pipeline e do RAG: contadores e histogramas de latência por
+# estágio (ingestão, análise, embeddings, montagem, carga do vector store,
+# recuperação e geração), uso de tokens da API e exportação em texto Prometheus.
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Limites (em segundos) dos buckets dos histogramas de latência
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+METRIC_PREFIX = "vocpulse_"
+
+# Descrições usadas no # HELP do formato Prometheus
+METRIC_HELP = {
+    "stage_seconds": "Duração de cada estágio do pipeline/RAG.",
+    "stage_rows_total": "Linhas processadas por estágio.",
+    "api_requests_total": "Requisições enviadas à API da OpenAI.",
+    "api_request_seconds": "Latência das requisições à API da OpenAI.",
+    "api_retries_total": "Retentativas de requisições à API.",
+    "api_throttled_total": "Respostas 429 (rate limit) da API.",
+    "api_errors_total": "Requisições que falharam após as retentativas.",
+    "api_tokens_total": "Tokens informados no campo usage das respostas.",
+    "cache_hits_total": "Acertos de cache.",
+    "cache_misses_total": "Faltas de cache.",
+    "dedup_saved_total": "Comentários não enviados à API por serem (quase) duplicatas de outro.",
+    "local_classifier_total": "Comentários rotulados pelo classificador local ou enviados ao LLM.",
+    "retrieval_route_total": "Perguntas do chatbot por rota de recuperação (lexical, vector ou hybrid).",
+    "rag_prompts_total": "Prompts do chatbot montados para o LLM.",
+    "rag_prompt_tokens_total": "Tokens dos prompts do chatbot, com (packed) e sem (unpacked) a seleção de contexto.",
+    "rag_context_snippets_total": "Candidatos incluídos no contexto, descartados como duplicata ou fora do orçamento.",
+}
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    """Contadores e histogramas com rótulos, seguros entre threads."""
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}    # (nome, rótulos) -> valor
+        self._histograms = {}  # (nome, rótulos) -> {"buckets": [...], "sum", "count"}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Soma value ao contador name{labels}."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Registra uma observação no histograma name{labels}."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram["buckets"][i] += 1
+                    break
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    @contextmanager
+    def timer(self, name: str = "stage_seconds", **labels):
+        """Mede o bloco e registra a duração no histograma name{labels}."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def record_usage(self, usage, endpoint: str):
+        """
+        Soma os tokens do campo usage de uma resposta da API.
+        :param usage: objeto/dict usage (prompt_tokens, completion_tokens); None é ignorado.
+        :param endpoint: "chat" ou "embeddings".
+        """
+        if usage is None:
+            return
+        for kind in ("prompt_tokens", "completion_tokens"):
+            value = usage.get(kind) if isinstance(usage, dict) else getattr(usage, kind, None)
+            if value:
+                self.inc("api_tokens_total", value, endpoint=endpoint, kind=kind.replace("_tokens", ""))
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started_at = time.time()
+
+    # ===== EXPORTAÇÃO =====
+    def snapshot(self) -> dict:
+        """Cópia serializável (JSON) de todas as métricas."""
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "buckets": list(self.buckets),
+                "counters": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in self._counters.items()],
+                "histograms": [{"name": n, "labels": dict(l), "buckets": list(h["buckets"]),
+                                "sum": h["sum"], "count": h["count"]}
+                               for (n, l), h in self._histograms.items()],
+            }
+
+    def save(self, path: str, prom_path: str | None = None):
+        """Grava o snapshot em JSON e, opcionalmente, em texto Prometheus (troca atômica)."""
+        save_snapshot(self.snapshot(), path, prom_path)
+
+    def to_prometheus(self) -> str:
+        """Métricas no formato de texto do Prometheus."""
+        return snapshot_to_prometheus(self.snapshot())
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict, extra: dict | None = None) -> str:
+    items = {**labels, **(extra or {})}
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(items.items())) + "}"
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if math.isinf(value) else repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def snapshot_to_prometheus(snapshot: dict) -> str:
+    """Converte um snapshot (MetricsRegistry.snapshot ou arquivo salvo) em texto Prometheus."""
+    lines, declared = [], set()
+
+    def declare(name: str, kind: str):
+        if name not in declared:
+            declared.add(name)
+            base = name[len(METRIC_PREFIX):]
+            lines.append(f"# HELP {name} {METRIC_HELP.get(base, base)}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for counter in sorted(snapshot["counters"], key=lambda c: (c["name"], sorted(c["labels"].items()))):
+        name = METRIC_PREFIX + counter["name"]
+        declare(name, "counter")
+        lines.append(f"{name}{_format_labels(counter['labels'])} {_format_value(counter['value'])}")
+
+    bounds = snapshot["buckets"]
+    for histogram in sorted(snapshot["histograms"], key=lambda h: (h["name"], sorted(h["labels"].items()))):
+        name = METRIC_PREFIX + histogram["name"]
+        declare(name, "histogram")
+        cumulative = 0
+        for bound, count in zip(bounds, histogram["buckets"]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(histogram['labels'], {'le': _format_value(bound)})} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(histogram['labels'], {'le': '+Inf'})} {histogram['count']}")
+        lines.append(f"{name}_sum{_format_labels(histogram['labels'])} {_format_value(histogram['sum'])}")
+        lines.append(f"{name}_count{_format_labels(histogram['labels'])} {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def histogram_quantile(histogram: dict, bounds: list, q: float) -> float | None:
+    """
+    Estimativa de um quantil a partir dos buckets (interpolação linear, como
+    o histogram_quantile do Prometheus).
+    """
+    total = histogram["count"]
+    if not total:
+        return None
+    rank = q * total
+    cumulative, lower = 0, 0.0
+    for bound, count in zip(bounds, histogram["buckets"]):
+        if cumulative + count >= rank and count:
+            return lower + (bound - lower) * (rank - cumulative) / count
+        cumulative += count
+        lower = bound
+    return lower  # acima do maior bucket
+
+
+def _write_atomic(path: str, text: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def merge_snapshots(snapshots: list[dict]) -> dict:
+    """
+    Soma snapshots de vários processos (ex.: os workers de um pipeline em
+    shards): contadores e histogramas com o mesmo nome e rótulos são somados.
+    Todos precisam usar os mesmos buckets.
+    """
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        if list(snapshot["buckets"]) != list(snapshots[0]["buckets"]):
+            raise ValueError("Snapshots com buckets diferentes não podem ser somados.")
+        for counter in snapshot["counters"]:
+            key = (counter["name"], _label_key(counter["labels"]))
+            counters[key] = counters.get(key, 0) + counter["value"]
+        for histogram in snapshot["histograms"]:
+            key = (histogram["name"], _label_key(histogram["labels"]))
+            merged = histograms.setdefault(key, {"buckets": [0] * len(histogram["buckets"]), "sum": 0.0, "count": 0})
+            merged["buckets"] = [a + b for a, b in zip(merged["buckets"], histogram["buckets"])]
+            merged["sum"] += histogram["sum"]
+            merged["count"] += histogram["count"]
+    return {
+        "started_at": min((s["started_at"] for s in snapshots), default=time.time()),
+        "buckets": list(snapshots[0]["buckets"]) if snapshots else list(DEFAULT_BUCKETS),
+        "counters": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in counters.items()],
+        "histograms": [{"name": n, "labels": dict(l), **h} for (n, l), h in histograms.items()],
+    }
+
+
+def save_snapshot(snapshot: dict, path: str, prom_path: str | None = None):
+    """Grava um snapshot em JSON e, opcionalmente, em texto Prometheus (troca atômica)."""
+    _write_atomic(path, json.dumps(snapshot, ensure_ascii=False))
+    if prom_path:
+        _write_atomic(prom_path, snapshot_to_prometheus(snapshot))
+
+
+@contextmanager
+def run_periodically(function, interval: float):
+    """
+    Chama function() a cada interval segundos, em uma thread de fundo,
+    enquanto o bloco roda (ex.: salvar o snapshot de uma execução longa).
+    """
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            try:
+                function()
+            except Exception as e:
+                print(f"AVISO: Falha na tarefa periódica: {e}")
+
+    thread = threading.Thread(target=loop, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def load_snapshot(path: str) -> dict | None:
+    """Lê um snapshot salvo com MetricsRegistry.save (None se não existir)."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# Registro único do processo (pipeline ou app Streamlit)
+METRICS = MetricsRegistry()
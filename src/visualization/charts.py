@@ -1,34 +1,35 @@
 # === VISUALIZAÇÕES ===
+# matplotlib, seaborn, plotly e wordcloud são importados dentro de cada gráfico:
+# só pesam no primeiro uso, e não em toda página que importa este módulo.
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import plotly.express as px
-import seaborn as sns
-from wordcloud import WordCloud, STOPWORDS
+from src.analysis.aggregates import list_suppliers, monthly_sentiment_scores, sentiment_counts
+from src.analysis.keywords import keyword_frequencies
+from src.visualization.render_cache import RENDER_CACHE, figure_to_png
+
+# --- RENDERIZAÇÃO (com cache compartilhado) ---
+def _show_figure(render, key: tuple | None):
+    """
+    Shows a matplotlib chart. With a key (data version + widget selections)
+    the PNG comes from the shared render cache; the figure is always closed.
+    """
+    png = RENDER_CACHE.get_or_render(key, render) if key is not None else figure_to_png(render())
+    st.image(png)
 
 # --- MAPA DE CORES ---
 COLOR_MAP = {'Positivo': '#28a745', 'Negativo':'#dc3545', 'Misto':'#ffc107', 'Erro':'#6c757d'}
 
 # --- GRÁFICO DE PERFORMANCE SOBRE TEMPO ---
-def plot_performance_over_time(df_enriched: pd.DataFrame):
+def plot_performance_over_time(cube: pd.DataFrame):
     """
     Generates a plot of the supplier performance over time based on
     the historic mean .
-    :param df_enriched:
+    :param cube: Aggregate cube (see src/analysis/aggregates.py).
     :return: line plot of supplier performance over time:
     """
     st.subheader("Tendência de Performance do Fornecedor (Plotly)")
     st.markdown("Veja como o sentimento dos clientes mudou ao longo do tempo.")
 
-    # Mapeamento de Sentimentos
-    score_map = {'Positivo': 1, "Misto": 0, "Negativo": -1}
-
-    # Manipulação de Dados
-    df = df_enriched.copy()
-    df = df[df['sentimento'] != 'Erro'] # Ignora erros
-    df['score_sentimento'] = df['sentimento'].map(score_map)
-    df['Data_Evento'] = pd.to_datetime(df['Data_Evento'])
-
     # Seleção de Categoria de Fornecedor
     tipo_fornecedor = st.selectbox(
         "Escolha a Categoria de Fornecedor:",
@@ -37,30 +38,26 @@ def plot_performance_over_time(df_enriched: pd.DataFrame):
     )
 
     if tipo_fornecedor == 'DJ':
-        col_name = "ID_Fornecedor_DJ"
         titulo = "Performance Média de DJs ao Longo do Tempo"
     else:
-        col_name = "ID_Fornecedor_Buffet"
         titulo = "Performance Média de Buffets ao Longo do Tempo"
 
-    # Agrupamento de Dados
-    df_trend = df.groupby([
-        pd.Grouper(key='Data_Evento', freq='M'), # Agrupa por mês
-        col_name
-    ]).agg(score_medio=('score_sentimento', 'mean') # Calcula a média
-          ).reset_index()
+    # Score médio mensal por fornecedor, já agregado pelo pipeline
+    df_trend = monthly_sentiment_scores(cube, tipo_fornecedor)
 
     if df_trend.empty:
         st.warning("Não há dados para plotar a tendência.")
         return
 
+    import plotly.express as px
+
     # Cria e Plota o Gráfico
     fig = px.line(
-        df_trend, x='Data_Evento', y='score_medio', color=col_name,
+        df_trend, x='month', y='score_medio', color='supplier',
         title= titulo, markers=True,
         labels = {
             'score_medio': 'Score de Sentimento (de -1 a 1)',
-            'Data_Evento': 'Mês', col_name: 'Fornecedor'
+            'month': 'Mês', 'supplier': 'Fornecedor'
         }
     )
 
@@ -69,35 +66,43 @@ def plot_performance_over_time(df_enriched: pd.DataFrame):
     st.plotly_chart(fig, use_container_width=True)
 
 # --- GRÁFICO DE DISTRIBUIÇÃO GERAL ---
-def plot_sentiment_distribution(df_enriched: pd.DataFrame):
+def plot_sentiment_distribution(cube: pd.DataFrame, version=None):
     """Generates a general sentiment distribution barplot
-    :param: df_enriched:
+    :param: cube: Aggregate cube.
+    :param: version: Data version (render cache key; None disables the cache).
     :returns: Sentiment distribution barplot:
     """
     st.subheader("Distribuição Geral de Sentimentos por Fornecedor")
 
-    # Define as cores das barras (com base nos sentimentos)
-    colors = COLOR_MAP
-    sentiment_counts = df_enriched['sentimento'].value_counts()
-    bar_colors = [colors.get(s, '#6c757d') for s in sentiment_counts.index]
-
-    # Cria a figura
-    fig, ax = plt.subplots(figsize=(10, 5)) # fig = figura inteira, ax = eixo
-    sns.barplot(
-        x=sentiment_counts.index,
-        y=sentiment_counts.values,
-        palette=bar_colors,
-        ax=ax
-    )
-    ax.set_title("Contagem Total de Feedbacks por Sentimento")
-    ax.set_ylabel("Contagem")
-    st.pyplot(fig)
+    def render():
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        # Define as cores das barras (com base nos sentimentos)
+        colors = COLOR_MAP
+        contagem = sentiment_counts(cube)
+        bar_colors = [colors.get(s, '#6c757d') for s in contagem.index]
+
+        # Cria a figura
+        fig, ax = plt.subplots(figsize=(10, 5)) # fig = figura inteira, ax = eixo
+        sns.barplot(
+            x=contagem.index,
+            y=contagem.values,
+            palette=bar_colors,
+            ax=ax
+        )
+        ax.set_title("Contagem Total de Feedbacks por Sentimento")
+        ax.set_ylabel("Contagem")
+        return fig
+
+    _show_figure(render, None if version is None else ("sentiment_distribution", version))
 
 # --- GRÁFICO DE DISTRIBUIÇÃO SEMÂNTICA INDIVIDUAL ---
-def plot_semantic_pie_chart(df_enriched: pd.DataFrame):
+def plot_semantic_pie_chart(cube: pd.DataFrame, version=None):
     """
     Generates a semantic pie chart with sentiments for each supplier.
-    :param df_enriched:
+    :param cube: Aggregate cube.
+    :param version: Data version (render cache key; None disables the cache).
     :return Semantic pie plot:
     """
     st.subheader("Análise Semântica por Fornecedor")
@@ -113,10 +118,7 @@ def plot_semantic_pie_chart(df_enriched: pd.DataFrame):
             ["DJ", "Buffet"],
             key='pie_cat') # Escolhe entre DJ e Buffet
 
-    if tipo_fornecedor == "DJ": col_name = "ID_Fornecedor_DJ"
-    else: col_name = "ID_Fornecedor_Buffet"
-
-    lista_fornecedores = df_enriched[col_name].unique()
+    lista_fornecedores = list_suppliers(cube, tipo_fornecedor)
 
     #  Coluna de Seleção de Fornecedor Individual
     with col2:
@@ -127,43 +129,36 @@ def plot_semantic_pie_chart(df_enriched: pd.DataFrame):
 
     # Exibe o gráfico se houver um fornecedor selecionado
     if fornecedor_selecionado:
-        df_filtrado = df_enriched[df_enriched[col_name] == fornecedor_selecionado]
-        contagem_sentimentos = df_filtrado['sentimento'].value_counts()
-        pie_colors = [colors.get(s, '#6c757d') for s in contagem_sentimentos.index]
-        fig, ax = plt.subplots(figsize=(10, 5))
-        ax.pie(
-            contagem_sentimentos,
-            labels = contagem_sentimentos.index,
-            autopct='%1.1f%%',
-            colors=pie_colors,
-            startangle=90
-        )
-        ax.set_title(f"Distribuição de Sentimento para: {fornecedor_selecionado}")
-        ax.axis('equal')
-        st.pyplot(fig)
+        def render():
+            import matplotlib.pyplot as plt
+
+            contagem_sentimentos = sentiment_counts(cube, tipo_fornecedor, fornecedor_selecionado)
+            pie_colors = [colors.get(s, '#6c757d') for s in contagem_sentimentos.index]
+            fig, ax = plt.subplots(figsize=(10, 5))
+            ax.pie(
+                contagem_sentimentos,
+                labels = contagem_sentimentos.index,
+                autopct='%1.1f%%',
+                colors=pie_colors,
+                startangle=90
+            )
+            ax.set_title(f"Distribuição de Sentimento para: {fornecedor_selecionado}")
+            ax.axis('equal')
+            return fig
+
+        key = ("semantic_pie", version, tipo_fornecedor, fornecedor_selecionado)
+        _show_figure(render, None if version is None else key)
     else:
         st.warning(f"Não há dados de sentimento para {fornecedor_selecionado}.")
 
 # --- GRÁFICO DE NUVEM DE PALAVRAS ---
-# Whitelist de Palavras-chave
-PALAVRAS_CHAVE_FILTRO = [
-    "bom", "ótimo", "excelente", "maravilhoso", "perfeito", "incrível", "sensacional",
-    "gostei", "adorei", "amamos", "elogiaram", "elogio", "rápido", "atenciosos",
-    "profissional", "impecável", "delicioso", "saboroso", "quente", "animado",
-    "animou", "cheia", "legal", "top", "recomendo", "sucesso", "parabéns",
-    "ruim", "péssimo", "horrível", "desastre", "decepcionante", "chato", "fraco",
-    "problema", "erro", "errou", "rude", "grossa", "atrasado", "atraso", "demorou",
-    "frio", "fria", "morna", "vazia", "esquecível", "barulho", "repetitiva",
-    "absurdo", "estressante", "gordurosa", "sumiu", "esqueceu", "faltou", "azedo",
-    "ok", "mediano", "razoável", "normal"
-]
-PALAVRAS_SET = set(PALAVRAS_CHAVE_FILTRO)
-
 # Função de WordCloud
-def plot_wordcloud_for_supplier(df_enriched: pd.DataFrame):
+def plot_wordcloud_for_supplier(keyword_index: pd.DataFrame, cube: pd.DataFrame, version=None):
     """
     Generates a semantic wordcloud per supplier.
-    :param df_enriched:
+    :param keyword_index: Keyword frequency index (see src/analysis/keywords.py).
+    :param cube: Aggregate cube (supplier list).
+    :param version: Data version (render cache key; None disables the cache).
     :return Semantic Word Cloud:
     """
     st.subheader("Análise Semântica por Fornecedor")
@@ -171,12 +166,8 @@ def plot_wordcloud_for_supplier(df_enriched: pd.DataFrame):
 
     with col1:
         tipo_fornecedor_wc = st.selectbox("Categoria:", ['DJ', 'Buffet'], key="wc_cat")
-        if tipo_fornecedor_wc == "DJ":
-            col_name_wc = "ID_Fornecedor_DJ"
-        else:
-            col_name_wc = "ID_Fornecedor_Buffet"
 
-    lista_fornecedores_wc = df_enriched[col_name_wc].unique()
+    lista_fornecedores_wc = list_suppliers(cube, tipo_fornecedor_wc)
 
     with col2:
         fornecedor_selecionado_wc = st.selectbox(
@@ -192,45 +183,38 @@ def plot_wordcloud_for_supplier(df_enriched: pd.DataFrame):
             horizontal=True
         )
 
-    # Lógica de filtragem
+    # Frequências já contadas pelo pipeline (não relê os comentários)
     if fornecedor_selecionado_wc:
-        # Filtra por fornecedor
-        df_filtrado_wc = df_enriched[df_enriched[col_name_wc] == fornecedor_selecionado_wc]
-
-        # Filtra por sentimento
-        if sentiment_filter != "Todos":
-            df_filtrado_wc = df_filtrado_wc[df_filtrado_wc['sentimento'] == sentiment_filter]
-
-        # Enriquece o comentário
-        text = " ".join(comentario for comentario in df_filtrado_wc.Comentario_Cliente)
-
-        # Filtra com base na Whitelist
-        palavras_filtradas = []
-        for palavra in text.lower().split():
-            palavra_limpa = palavra.strip(".,!?:;()[]{}") # Limpa pontuação
-            if palavra_limpa in PALAVRAS_SET:
-                palavras_filtradas.append(palavra_limpa)
-        texto_filtrado = " ".join(palavras_filtradas)
+        frequencias = keyword_frequencies(
+            keyword_index, tipo_fornecedor_wc, fornecedor_selecionado_wc,
+            None if sentiment_filter == "Todos" else sentiment_filter
+        )
 
         # Geração do Gráfico
-        if not texto_filtrado.strip():
+        if not frequencias:
             st.warning(f"Nenhuma palavra-chave encontrada para '{sentiment_filter}' em {fornecedor_selecionado_wc}")
         else:
-            try:
+            def render():
+                import matplotlib.pyplot as plt
+                from wordcloud import WordCloud
+
                 wordcloud = WordCloud(
                     width=800,
                     height=400,
                     background_color='white',
                     collocations=False,
                     min_font_size=10
-                ).generate(texto_filtrado) # Usa texto filtrado
+                ).generate_from_frequencies(frequencias) # Usa as frequências do índice
 
                 # Plotagem
                 fig, ax = plt.subplots(figsize=(10, 5))
                 ax.imshow(wordcloud, interpolation='bilinear')
                 ax.set_title(f"Palavras-Chave (Sent: {sentiment_filter}) para {fornecedor_selecionado_wc}")
                 ax.axis('off')
-                st.pyplot(fig)
+                return fig
+
+            try:
+                key = ("wordcloud", version, tipo_fornecedor_wc, fornecedor_selecionado_wc, sentiment_filter)
+                _show_figure(render, None if version is None else key)
             except Exception as e:
                 st.error(f"Erro ao gerar o Word Cloud: {e}")
-
@@ -0,0 +1,86 @@
+# === CACHE DE RENDERIZAÇÃO DOS GRÁFICOS ===
+# PNGs já renderizados, compartilhados por todas as sessões do processo,
+# indexados pela versão dos dados + seleções dos widgets (LRU limitado).
+import io
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+import pandas as pd
+from src.config import load_config
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
+try:
+    config = load_config()
+    RENDER_CACHE_MAX_ENTRIES = config.get('render_cache', {}).get('max_entries', 256)
+except FileNotFoundError as e:
+    print(f"ERRO: 'config/config.yaml' não encontrado. {e}")
+    RENDER_CACHE_MAX_ENTRIES = 256
+
+
+def frame_version(*frames: pd.DataFrame) -> int:
+    """
+    Content hash of the (small) frames a chart reads from, e.g. the aggregate
+    cube and the keyword index. Changes whenever the data changes.
+    """
+    return hash(tuple(int(pd.util.hash_pandas_object(frame, index=False).sum()) for frame in frames))
+
+
+def figure_to_png(fig: "Figure") -> bytes:
+    """Renders a figure to PNG bytes and releases it."""
+    import matplotlib.pyplot as plt
+
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', bbox_inches='tight')
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+class RenderCache:
+    """Thread-safe LRU of rendered charts (PNG bytes)."""
+
+    def __init__(self, max_entries: int = RENDER_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key: tuple, render) -> bytes:
+        """
+        Returns the cached PNG for key, rendering it on a miss.
+        :param key: hashable key (chart name, data version, widget selections).
+        :param render: function returning a matplotlib Figure; the figure is
+                       closed after being converted to PNG.
+        :return: PNG bytes.
+        """
+        with self._lock:
+            png = self._entries.get(key)
+            if png is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return png
+            self.misses += 1
+
+        # Renderiza fora do lock (duas sessões podem renderizar a mesma chave; o resultado é igual)
+        png = figure_to_png(render())
+        with self._lock:
+            self._entries[key] = png
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return png
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Instância única do processo (compartilhada entre as sessões do Streamlit)
+RENDER_CACHE = RenderCache()